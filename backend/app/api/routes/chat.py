@@ -1,11 +1,20 @@
 from fastapi import APIRouter, HTTPException
+import logging
 from pydantic import BaseModel
 from typing import List, Optional
+from functools import lru_cache
 from app.services.groq_service import GroqService
 from app.models.chat_models import ChatRequest, ChatResponse, TranscriptItem
+from app.core.responses import FastJSONResponse
+from app.services.groq_scheduler import UpstreamBusyError, upstream_busy
 
 router = APIRouter()
-groq_service = GroqService()
+logger = logging.getLogger(__name__)
+
+@lru_cache()
+def get_groq_service() -> GroqService:
+    """Create the Groq service on first use rather than at import"""
+    return GroqService()
 
 @router.post("/", response_model=ChatResponse)
 async def chat_with_ai(request: ChatRequest):
@@ -20,17 +29,22 @@ async def chat_with_ai(request: ChatRequest):
             )
 
         # Get AI response from Groq service
-        response = await groq_service.generate_response(
+        response = await get_groq_service().generate_response(
             message=request.message,
             transcript=request.transcript,
             current_time=request.current_time,
             video_duration=request.video_duration
         )
 
-        return ChatResponse(response=response)
+        return FastJSONResponse(ChatResponse(response=response))
 
+    except HTTPException:
+        raise
+    except UpstreamBusyError as e:
+        logger.warning("Chat request shed: %s", e)
+        raise upstream_busy(e)
     except Exception as e:
-        print(f"Error in chat endpoint: {str(e)}")
+        logger.error("Error in chat endpoint: %s", e)
         raise HTTPException(
             status_code=500,
             detail=f"Failed to process chat request: {str(e)}"
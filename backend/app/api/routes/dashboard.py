@@ -0,0 +1,26 @@
+from fastapi import APIRouter, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from app.services.engagement_service import engagement_aggregates
+
+router = APIRouter()
+
+@router.get("/aggregates")
+async def get_aggregates():
+    """
+    Engagement counters for the doctor dashboard: videos by status, unread
+    prescriptions and last activity, in total and per patient
+    """
+    try:
+        return await run_in_threadpool(engagement_aggregates.summary)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/aggregates/{patient_id}")
+async def get_patient_aggregates(patient_id: int):
+    """
+    Engagement counters for a single patient
+    """
+    try:
+        return await run_in_threadpool(engagement_aggregates.patient, str(patient_id))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
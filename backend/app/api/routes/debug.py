@@ -0,0 +1,36 @@
+import secrets
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import PlainTextResponse
+from typing import Optional
+from app.core.config import settings
+from app.core.tracing import trace_log, render_tree
+
+def require_debug_token(x_debug_token: str = Header("")):
+    """Traces expose request paths and timings, so every debug route needs the token"""
+    if not settings.DEBUG_TOKEN or not secrets.compare_digest(x_debug_token, settings.DEBUG_TOKEN):
+        raise HTTPException(status_code=403, detail="Invalid debug token")
+
+router = APIRouter(dependencies=[Depends(require_debug_token)])
+
+@router.get("/traces")
+async def slowest_traces(
+    limit: int = Query(20, ge=1, le=200),
+    route: Optional[str] = None,
+    format: str = Query("json", pattern="^(json|text)$")
+):
+    """
+    The slowest recent requests with their span trees. `route` narrows to
+    one route template (e.g. `/api/chat/`); `format=text` renders the trees
+    as indented text.
+    """
+    traces = await run_in_threadpool(trace_log.slowest, limit, route)
+    if format == "json":
+        return {"traces": traces}
+
+    lines = []
+    for trace in traces:
+        lines.append(f"{trace['trace_id']}  {trace['status']}  {trace['duration_ms']:.1f} ms")
+        lines.extend(render_tree(trace["root"], 1))
+        lines.append("")
+    return PlainTextResponse("\n".join(lines))
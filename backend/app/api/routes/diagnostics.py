@@ -1,19 +1,25 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request
 from typing import List
 from app.models.diagnostic_models import Diagnostic, DiagnosticHistory
 from app.services.diagnostic_service import DiagnosticService
+from app.core.response_cache import response_cache
+from app.core.responses import FastJSONResponse
 
 router = APIRouter()
 diagnostic_service = DiagnosticService()
 
 @router.get("/history", response_model=DiagnosticHistory)
-async def get_diagnostic_history():
+async def get_diagnostic_history(request: Request):
     """
     Get all diagnostic history for a patient
     """
-    try:
+    async def build():
         history = await diagnostic_service.get_diagnostic_history()
         return DiagnosticHistory(diagnostics=history)
+
+    try:
+        # Diagnostic history is static, so the encoded body is built once
+        return await response_cache.respond(request, "diagnostics", build)
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -32,7 +38,7 @@ async def get_diagnostic_by_id(diagnostic_id: int):
                 status_code=404,
                 detail=f"Diagnostic with ID {diagnostic_id} not found"
             )
-        return diagnostic
+        return FastJSONResponse(diagnostic)
     except HTTPException:
         raise
     except Exception as e:
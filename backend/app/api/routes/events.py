@@ -0,0 +1,92 @@
+from fastapi import APIRouter, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from typing import List, Optional
+import asyncio
+import json
+from app.core.config import settings
+from app.core.store import store
+from app.services.change_feed import ChangeFeed
+
+router = APIRouter()
+
+change_feed = ChangeFeed(
+    store,
+    settings.EVENTS_POLL_INTERVAL_SECONDS,
+    settings.EVENTS_QUEUE_SIZE,
+    settings.EVENTS_CATCHUP_LIMIT
+)
+
+# Background tasks started by startup() and cancelled by shutdown()
+background_tasks: List[asyncio.Task] = []
+
+async def startup():
+    """Start watching the store for changes to push"""
+    background_tasks.append(asyncio.create_task(change_feed.run()))
+
+async def shutdown():
+    for task in background_tasks:
+        task.cancel()
+    await asyncio.gather(*background_tasks, return_exceptions=True)
+    background_tasks.clear()
+
+def format_event(event: dict) -> str:
+    return f"id: {event['seq']}\nevent: {event['event']}\ndata: {json.dumps(event['data'])}\n\n"
+
+def visible_to(event: dict, patient_id: Optional[int]) -> bool:
+    """Patients see their own records and unassigned ones; doctors (no patient_id) see everything"""
+    if patient_id is None:
+        return True
+    owner = event["data"].get("patient_id")
+    return owner is None or owner == patient_id
+
+@router.get("/stream")
+async def stream_events(
+    request: Request,
+    patient_id: Optional[int] = None,
+    since: Optional[int] = Query(None, ge=0)
+):
+    """
+    Server-sent events for new prescriptions, new videos and status changes.
+    Reconnecting clients resume from `since` or the Last-Event-ID header;
+    a `reset` event means changes were missed and lists should be reloaded.
+    """
+    last_event_id = request.headers.get("last-event-id")
+    if since is None and last_event_id and last_event_id.isdigit():
+        since = int(last_event_id)
+
+    # Subscribe before reading the backlog so nothing falls in between
+    queue = change_feed.subscribe()
+
+    async def generate():
+        try:
+            sent = since if since is not None else store.sequence()
+            yield f"retry: 3000\nid: {sent}\n\n"
+
+            if since is not None:
+                for event in await run_in_threadpool(change_feed.events_since, since):
+                    if visible_to(event, patient_id):
+                        yield format_event(event)
+                    sent = max(sent, event["seq"])
+
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=settings.EVENTS_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    # Comment line keeps proxies from closing an idle stream
+                    yield ": keep-alive\n\n"
+                    continue
+                if event is None:
+                    break
+                if event["seq"] <= sent or not visible_to(event, patient_id):
+                    continue
+                sent = event["seq"]
+                yield format_event(event)
+        finally:
+            change_feed.unsubscribe(queue)
+
+    return StreamingResponse(
+        generate(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
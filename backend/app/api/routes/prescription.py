@@ -1,42 +1,107 @@
-from fastapi import APIRouter, HTTPException
-from fastapi.responses import JSONResponse
-from pydantic import BaseModel
-from typing import List, Dict, Any, Optional
-from groq import Groq
+from fastapi import APIRouter, HTTPException, Request, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, ValidationError
+from typing import List, Dict, Any, Optional, Tuple, Callable
 from app.core.config import settings
+from app.core.metrics import cache_requests, track_upstream
+from app.core.response_cache import response_cache
+from app.core.responses import FastJSONResponse, dumps
+from app.core.store import store
+from app.core.tracing import span
+from app.services.analysis_cache import AnalysisCache, analysis_key
+from app.services.groq_scheduler import (
+    Priority, UpstreamBusyError, estimate_tokens, get_async_groq_client, groq_scheduler, upstream_busy
+)
+from app.services.json_stream import IncrementalJSONParser, repair_json
+from app.services.risk_rules import classify_risk, alternatives_for, low_risk_recommendation, local_recommendation
+import asyncio
+import base64
 import json
+import logging
 import uuid
 from datetime import datetime
 from pathlib import Path
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
 
-# Create prescriptions directory if it doesn't exist
+# Prescriptions directory, created at startup if it doesn't exist
 PRESCRIPTIONS_DIR = Path("prescriptions_data")
-PRESCRIPTIONS_DIR.mkdir(exist_ok=True)
 
 # JSON file for persisting prescription data
 PRESCRIPTIONS_FILE = PRESCRIPTIONS_DIR / "prescriptions.json"
 
-# Load existing prescriptions or initialize empty storage
-def load_prescriptions():
-    """Load prescriptions from JSON file"""
+def load_legacy_prescriptions():
+    """Load prescriptions from the JSON file used before the shared store"""
     if PRESCRIPTIONS_FILE.exists():
         try:
             with open(PRESCRIPTIONS_FILE, 'r') as f:
                 return json.load(f)
         except Exception as e:
-            print(f"Error loading prescriptions: {e}")
+            logger.error("Error loading prescriptions: %s", e)
             return []
     return []
 
-def save_prescriptions(prescriptions):
-    """Save prescriptions to JSON file"""
+# Largest page /list returns when a limit is given
+MAX_PAGE_SIZE = 500
+
+# Bump whenever the analysis prompt changes, so cached analyses from the old prompt are not reused
+ANALYSIS_PROMPT_VERSION = "1"
+
+analysis_cache = AnalysisCache(
+    store,
+    ttl_seconds=settings.ANALYSIS_CACHE_TTL_SECONDS,
+    max_entries=settings.ANALYSIS_CACHE_MAX_ENTRIES
+)
+
+# Analyses currently running in this worker, so identical requests share one model call
+analyses_in_flight: Dict[str, "asyncio.Future"] = {}
+
+def find_prescriptions(patient_id: Optional[int] = None, limit: Optional[int] = None, after=None):
+    """Prescriptions newest first, optionally for one patient, read from the (patient_id, created_at) index"""
+    where = {"patient_id": patient_id} if patient_id is not None else None
+    return store.find("prescriptions", where=where, order_by="created_at", descending=True, limit=limit, after=after)
+
+def encode_cursor(prescription: dict) -> str:
+    """Opaque cursor pointing just past a prescription in newest-first order"""
+    raw = json.dumps([prescription.get("created_at"), prescription["id"]]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+def decode_cursor(cursor: str):
     try:
-        with open(PRESCRIPTIONS_FILE, 'w') as f:
-            json.dump(prescriptions, f, indent=2, default=str)
-    except Exception as e:
-        print(f"Error saving prescriptions: {e}")
+        created_at, prescription_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return created_at, str(prescription_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def build_prescription_delta(patient_id: Optional[int], since: int):
+    """Prescriptions created, updated or deleted after change sequence `since`"""
+    delta = store.delta("prescriptions", since)
+    changed = delta["changed"]
+    if patient_id is not None:
+        changed = [p for p in changed if p.get("patient_id") == patient_id]
+    changed.sort(key=lambda p: (p.get("created_at", ""), p["id"]), reverse=True)
+    return {
+        "prescriptions": changed,
+        "deleted": delta["deleted"],
+        "seq": delta["seq"],
+        "reset": delta["reset"]
+    }
+
+def prepare_storage():
+    """Create the prescriptions directory, indexes, and import legacy prescriptions"""
+    PRESCRIPTIONS_DIR.mkdir(exist_ok=True)
+    store.create_index("prescriptions", ["patient_id", "created_at"])
+    store.create_index("prescriptions", ["created_at"])
+    store.import_once("prescriptions", load_legacy_prescriptions)
+    analysis_cache.initialize()
+
+async def startup():
+    """Prepare storage and start tracking prescription changes for the response cache"""
+    # Other workers may hold the database lock while they start too
+    await run_in_threadpool(prepare_storage)
+    response_cache.track("prescriptions", lambda: store.version("prescriptions"))
 
 class PrescriptionAnalysisRequest(BaseModel):
     medication: str
@@ -61,12 +126,178 @@ async def analyze_prescription(request: PrescriptionAnalysisRequest):
     """
     Analyze genetic scoring results and provide doctor-friendly recommendations
     """
+    recommendation, source = await analyze(request)
+    return FastJSONResponse(recommendation, headers={"X-Analysis-Source": source})
+
+@router.post("/analyze-stream")
+async def analyze_prescription_stream(request: PrescriptionAnalysisRequest):
+    """
+    Same analysis as /analyze-prescription, streamed as newline-delimited
+    JSON: one {"field", "value"} line per top-level field as the model emits
+    it (risk_level and can_prescribe arrive first), then a final line with
+    the validated "result" and its "source", or an "error".
+    """
+    queue: asyncio.Queue = asyncio.Queue()
+
+    async def run():
+        try:
+            recommendation, source = await analyze(
+                request,
+                on_field=lambda key, value: queue.put_nowait({"field": key, "value": value})
+            )
+            queue.put_nowait({"source": source, "result": recommendation.model_dump()})
+        except HTTPException as e:
+            queue.put_nowait({"status_code": e.status_code, "error": e.detail})
+        except Exception as e:
+            queue.put_nowait({"status_code": 500, "error": str(e)})
+        finally:
+            queue.put_nowait(None)
+
+    async def generate():
+        task = asyncio.create_task(run())
+        try:
+            while True:
+                item = await queue.get()
+                if item is None:
+                    break
+                yield dumps(item) + b"\n"
+        finally:
+            task.cancel()
+
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
+
+@router.post("/analyze-batch")
+async def analyze_batch(requests: List[PrescriptionAnalysisRequest]):
+    """
+    Analyze several medications concurrently. Results stream back as
+    newline-delimited JSON in completion order, each tagged with its index
+    in the request list.
+    """
+    if not requests:
+        raise HTTPException(status_code=400, detail="No medications to analyze")
+    if len(requests) > settings.ANALYSIS_BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {settings.ANALYSIS_BATCH_MAX_ITEMS} medications per batch"
+        )
+
+    semaphore = asyncio.Semaphore(settings.ANALYSIS_BATCH_CONCURRENCY)
+
+    async def analyze_item(index: int, item: PrescriptionAnalysisRequest) -> Dict[str, Any]:
+        async with semaphore:
+            try:
+                recommendation, source = await analyze(item)
+                return {"index": index, "source": source, "result": recommendation.model_dump()}
+            except HTTPException as e:
+                return {"index": index, "medication": item.medication, "status_code": e.status_code, "error": e.detail}
+            except Exception as e:
+                return {"index": index, "medication": item.medication, "status_code": 500, "error": str(e)}
+
+    async def generate():
+        tasks = [asyncio.create_task(analyze_item(i, item)) for i, item in enumerate(requests)]
+        try:
+            for finished in asyncio.as_completed(tasks):
+                yield dumps(await finished) + b"\n"
+        finally:
+            # Client went away: stop the analyses nobody will read
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
+
+async def analyze(
+    request: PrescriptionAnalysisRequest,
+    on_field: Optional[Callable[[str, Any], None]] = None
+) -> Tuple[PrescriptionRecommendation, str]:
+    """
+    Analysis for a request and where it came from: "rules" (clear low risk,
+    no model call), "cache", "shared" (joined an identical analysis in
+    flight), "model", or "fallback" (rule-based answer when the model failed)
+    """
+    assessment = classify_risk(request.api_response)
+    if assessment is not None and assessment.conclusive:
+        return PrescriptionRecommendation(**low_risk_recommendation(request.medication)), "rules"
+
+    key = analysis_key(request.medication, request.api_response, settings.GROQ_MODEL, ANALYSIS_PROMPT_VERSION)
     try:
-        # Initialize Groq client
-        client = Groq(api_key=settings.GROQ_API_KEY)
+        cached = await run_in_threadpool(analysis_cache.get, key)
+        cache_requests.inc(cache="analysis", result="miss" if cached is None else "hit")
+        if cached is not None:
+            # Keys ignore case and spacing; echo the medication as this request spelled it
+            return PrescriptionRecommendation(**{**cached, "medication": request.medication}), "cache"
+    except Exception as e:
+        # A broken cache entry only costs a fresh analysis
+        logger.warning("Error reading analysis cache: %s", e)
 
-        # Create prompt for AI analysis
-        prompt = f"""You are a clinical pharmacogenomics expert helping doctors make informed prescription decisions.
+    try:
+        recommendation, source = await run_shared_analysis(key, request, on_field)
+    except Exception as e:
+        # The rules only stand in for the model when they point away from prescribing
+        if assessment is None or assessment.risk_level == "low":
+            raise
+        logger.warning(
+            "Model analysis failed, answering from local rules: %s", getattr(e, 'detail', e),
+            extra={"medication": request.medication}
+        )
+        return PrescriptionRecommendation(**local_recommendation(request.medication, assessment)), "fallback"
+
+    if not recommendation.alternatives and recommendation.risk_level in ("moderate", "high"):
+        alternatives = alternatives_for(request.medication)
+        if alternatives:
+            recommendation = PrescriptionRecommendation(**{**recommendation.model_dump(), "alternatives": alternatives})
+
+    if source == "model":
+        try:
+            await run_in_threadpool(analysis_cache.put, key, request.medication, recommendation.model_dump())
+        except Exception as e:
+            logger.warning("Error writing analysis cache: %s", e)
+    return recommendation, source
+
+async def run_shared_analysis(
+    key: str,
+    request: PrescriptionAnalysisRequest,
+    on_field: Optional[Callable[[str, Any], None]] = None
+) -> Tuple[PrescriptionRecommendation, str]:
+    """Run the model analysis, or join the identical one already running in this worker"""
+    in_flight = analyses_in_flight.get(key)
+    if in_flight is not None:
+        try:
+            recommendation = await asyncio.shield(in_flight)
+            return recommendation.model_copy(update={"medication": request.medication}), "shared"
+        except asyncio.CancelledError:
+            if not in_flight.cancelled():
+                raise
+            # The request that started it went away; run the analysis here instead
+
+    future = asyncio.get_running_loop().create_future()
+    analyses_in_flight[key] = future
+    try:
+        recommendation = await run_analysis(request, on_field)
+        future.set_result(recommendation)
+        return recommendation, "model"
+    except asyncio.CancelledError:
+        future.cancel()
+        raise
+    except Exception as e:
+        future.set_exception(e)
+        # Mark retrieved so an unshared failure doesn't log "exception never retrieved"
+        future.exception()
+        raise
+    finally:
+        analyses_in_flight.pop(key, None)
+
+ANALYSIS_SYSTEM_PROMPT = "You are a clinical pharmacogenomics expert. Always respond with valid JSON only."
+
+ANALYSIS_MAX_TOKENS = 2000
+
+REPAIR_PROMPT = """This prescription analysis is not valid ({error}).
+Return the same analysis as one corrected JSON object with the fields medication, risk_level,
+recommendation, can_prescribe, evidence and alternatives. Change nothing else.
+
+{response}"""
+
+def build_analysis_prompt(request: PrescriptionAnalysisRequest) -> str:
+    return f"""You are a clinical pharmacogenomics expert helping doctors make informed prescription decisions.
 
 Analyze the following genetic scoring results for medication: {request.medication}
 
@@ -110,47 +341,118 @@ Guidelines:
 
 Return ONLY valid JSON, no additional text."""
 
-        # Call Groq API
-        chat_completion = client.chat.completions.create(
-            messages=[
-                {
-                    "role": "system",
-                    "content": "You are a clinical pharmacogenomics expert. Always respond with valid JSON only."
-                },
-                {
-                    "role": "user",
-                    "content": prompt
-                }
-            ],
-            model=settings.GROQ_MODEL,
-            temperature=0.3,
-            max_tokens=2000,
-        )
+async def stream_completion(messages, on_text, **options) -> Optional[str]:
+    """Stream a chat completion into on_text; returns the finish reason"""
+    async def call():
+        with track_upstream("groq_chat"):
+            return await get_async_groq_client().chat.completions.with_raw_response.create(
+                messages=messages,
+                model=settings.GROQ_MODEL,
+                temperature=0.3,
+                stream=True,
+                **options
+            )
+
+    stream = await groq_scheduler.run(
+        Priority.ANALYSIS, call, tokens=estimate_tokens(messages, options.get("max_tokens", 0))
+    )
+    with span("analysis.stream"):
+        finish_reason = None
+        async for chunk in stream:
+            if not chunk.choices:
+                continue
+            choice = chunk.choices[0]
+            if choice.delta and choice.delta.content:
+                on_text(choice.delta.content)
+            finish_reason = choice.finish_reason or finish_reason
+    return finish_reason
+
+async def run_analysis(
+    request: PrescriptionAnalysisRequest,
+    on_field: Optional[Callable[[str, Any], None]] = None
+) -> PrescriptionRecommendation:
+    """
+    Stream the model's analysis, reporting each top-level field through
+    `on_field` as soon as it is complete. Truncated output is continued and
+    invalid output repaired, rather than regenerating the whole analysis.
+    """
+    parser = IncrementalJSONParser()
+    raw = []
+
+    def on_text(text: str):
+        raw.append(text)
+        for key, value in parser.feed(text):
+            if on_field:
+                on_field(key, value)
+
+    messages = [
+        {"role": "system", "content": ANALYSIS_SYSTEM_PROMPT},
+        {"role": "user", "content": build_analysis_prompt(request)}
+    ]
+    try:
+        finish_reason = await stream_completion(messages, on_text, max_tokens=ANALYSIS_MAX_TOKENS)
+
+        if finish_reason == "length" and not parser.done:
+            # Cut off mid-object: ask for the rest instead of starting over
+            await stream_completion(
+                messages + [
+                    {"role": "assistant", "content": "".join(raw)},
+                    {"role": "user", "content": "Your JSON was cut off. Continue exactly where it stopped; "
+                                                "output only the remaining characters."}
+                ],
+                on_text,
+                max_tokens=ANALYSIS_MAX_TOKENS
+            )
+    except UpstreamBusyError as e:
+        raise upstream_busy(e)
+    except Exception as e:
+        logger.error("Error analyzing prescription: %s", e)
+        raise HTTPException(status_code=500, detail=str(e))
 
-        # Parse the response
-        ai_response = chat_completion.choices[0].message.content
+    return await validate_analysis(request, "".join(raw), parser.fields)
 
-        # Clean up response (remove markdown code blocks if present)
-        ai_response = ai_response.strip()
-        if ai_response.startswith("```json"):
-            ai_response = ai_response[7:]
-        if ai_response.startswith("```"):
-            ai_response = ai_response[3:]
-        if ai_response.endswith("```"):
-            ai_response = ai_response[:-3]
-        ai_response = ai_response.strip()
+async def validate_analysis(
+    request: PrescriptionAnalysisRequest,
+    ai_response: str,
+    streamed_fields: Dict[str, Any]
+) -> PrescriptionRecommendation:
+    """Turn model output into a recommendation, repairing it locally or with one targeted fix-up call"""
+    error = None
+    try:
+        result = {**streamed_fields, **json.loads(repair_json(ai_response))}
+        return PrescriptionRecommendation(**result)
+    except (json.JSONDecodeError, ValidationError) as e:
+        error = e
 
-        # Parse JSON
-        result = json.loads(ai_response)
+    logger.info("Repairing invalid AI response: %s", error, extra={"medication": request.medication})
+    messages = [
+        {"role": "system", "content": ANALYSIS_SYSTEM_PROMPT},
+        {"role": "user", "content": REPAIR_PROMPT.format(error=error, response=ai_response)}
+    ]
 
-        return PrescriptionRecommendation(**result)
+    async def call():
+        with track_upstream("groq_chat"):
+            return await get_async_groq_client().chat.completions.with_raw_response.create(
+                messages=messages,
+                model=settings.GROQ_MODEL,
+                temperature=0,
+                max_tokens=ANALYSIS_MAX_TOKENS,
+                response_format={"type": "json_object"}
+            )
 
-    except json.JSONDecodeError as e:
-        print(f"JSON decode error: {e}")
-        print(f"AI Response: {ai_response}")
+    try:
+        completion = await groq_scheduler.run(
+            Priority.ANALYSIS, call, tokens=estimate_tokens(messages, ANALYSIS_MAX_TOKENS)
+        )
+        repaired = json.loads(repair_json(completion.choices[0].message.content or ""))
+        return PrescriptionRecommendation(**{"medication": request.medication, **repaired})
+    except UpstreamBusyError as e:
+        raise upstream_busy(e)
+    except (json.JSONDecodeError, ValidationError) as e:
+        logger.error("Unparseable AI response: %s", ai_response, extra={"medication": request.medication})
         raise HTTPException(status_code=500, detail=f"Failed to parse AI response: {str(e)}")
     except Exception as e:
-        print(f"Error analyzing prescription: {e}")
+        logger.error("Error repairing AI response: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 class FinalizePrescriptionRequest(BaseModel):
@@ -159,35 +461,41 @@ class FinalizePrescriptionRequest(BaseModel):
     medications: List[str]
     doctor_name: Optional[str] = "Dr. Smith"
 
+class FinalizeBatchRequest(BaseModel):
+    # Validated one by one so a bad item is reported instead of rejecting the batch
+    items: List[Dict[str, Any]]
+    all_or_nothing: bool = False
+
+# Largest number of prescriptions /finalize-batch accepts at once
+MAX_FINALIZE_BATCH = 1000
+
+def build_prescription_record(request: FinalizePrescriptionRequest) -> dict:
+    return {
+        "id": str(uuid.uuid4()),
+        "patient_id": request.patient_id,
+        "patient_name": request.patient_name,
+        "doctor_name": request.doctor_name,
+        "medications": request.medications,
+        "created_at": datetime.now().isoformat(),
+        "status": "active",
+        "read": False
+    }
+
 @router.post("/finalize")
 async def finalize_prescription(request: FinalizePrescriptionRequest):
     """
     Save finalized prescription and make it available to patient
     """
     try:
-        # Load existing prescriptions
-        prescriptions = load_prescriptions()
-
         # Create prescription record
-        prescription_id = str(uuid.uuid4())
-        prescription_data = {
-            "id": prescription_id,
-            "patient_id": request.patient_id,
-            "patient_name": request.patient_name,
-            "doctor_name": request.doctor_name,
-            "medications": request.medications,
-            "created_at": datetime.now().isoformat(),
-            "status": "active",
-            "read": False
-        }
+        prescription_data = build_prescription_record(request)
 
-        # Add to prescriptions list
-        prescriptions.append(prescription_data)
-        save_prescriptions(prescriptions)
+        # Persist to the shared store
+        await run_in_threadpool(store.put, "prescriptions", prescription_data)
 
-        return JSONResponse(content={
+        return FastJSONResponse(content={
             "success": True,
-            "prescription_id": prescription_id,
+            "prescription_id": prescription_data["id"],
             "message": f"Prescription sent to {request.patient_name}",
             "medications_count": len(request.medications)
         })
@@ -195,24 +503,103 @@ async def finalize_prescription(request: FinalizePrescriptionRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.get("/list")
-async def list_prescriptions(patient_id: Optional[int] = None):
+@router.post("/finalize-batch")
+async def finalize_prescription_batch(request: FinalizeBatchRequest):
     """
-    Get list of prescriptions for a patient
+    Save many finalized prescriptions in a single transaction.
+    Each item is validated on its own and gets its own result; with
+    `all_or_nothing`, one invalid item means nothing is saved.
     """
+    if not request.items:
+        raise HTTPException(status_code=400, detail="No prescriptions to finalize")
+    if len(request.items) > MAX_FINALIZE_BATCH:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_FINALIZE_BATCH} prescriptions per batch")
+
+    results = []
+    records = []
+    for index, item in enumerate(request.items):
+        try:
+            prescription = FinalizePrescriptionRequest.model_validate(item)
+        except ValidationError as e:
+            results.append({
+                "index": index,
+                "success": False,
+                "errors": [f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}" for error in e.errors()]
+            })
+            continue
+        if not prescription.medications:
+            results.append({"index": index, "success": False, "errors": ["medications: must not be empty"]})
+            continue
+
+        record = build_prescription_record(prescription)
+        records.append(record)
+        results.append({
+            "index": index,
+            "success": True,
+            "prescription_id": record["id"],
+            "patient_name": prescription.patient_name,
+            "medications_count": len(prescription.medications)
+        })
+
+    failed = len(request.items) - len(records)
+    if request.all_or_nothing and failed:
+        for result in results:
+            if result["success"]:
+                result.update(success=False, errors=["not saved: another item in the batch is invalid"])
+                result.pop("prescription_id")
+        records = []
+
     try:
-        prescriptions = load_prescriptions()
+        if records:
+            # One transaction for the whole batch
+            await run_in_threadpool(store.put_many, "prescriptions", records)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
-        # Filter by patient if provided
-        if patient_id is not None:
-            prescriptions = [p for p in prescriptions if p.get("patient_id") == patient_id]
+    return FastJSONResponse(content={
+        "success": failed == 0,
+        "created": len(records),
+        "failed": failed,
+        "results": results
+    })
 
-        # Sort by created_at descending (newest first)
-        prescriptions.sort(key=lambda x: x.get("created_at", ""), reverse=True)
+@router.get("/list")
+async def list_prescriptions(
+    request: Request,
+    patient_id: Optional[int] = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    since: Optional[int] = Query(None, ge=0)
+):
+    """
+    Get list of prescriptions for a patient, newest first.
+    Pass `limit` to page through them with the returned `next_cursor`, or
+    `since` (the `seq` of an earlier response) to get only what changed.
+    """
+    after = decode_cursor(cursor) if cursor else None
+
+    def build():
+        if since is not None:
+            return build_prescription_delta(patient_id, since)
+
+        # Read the sequence first; anything written meanwhile is resent by the next delta
+        seq = store.sequence()
+        # Fetch one extra row to learn whether another page follows
+        prescriptions = find_prescriptions(patient_id, limit + 1 if limit else None, after)
+
+        next_cursor = None
+        if limit and len(prescriptions) > limit:
+            prescriptions = prescriptions[:limit]
+            next_cursor = encode_cursor(prescriptions[-1])
+
+        return {
+            "prescriptions": prescriptions,
+            "next_cursor": next_cursor,
+            "seq": seq
+        }
 
-        return JSONResponse(content={
-            "prescriptions": prescriptions
-        })
+    try:
+        return await response_cache.respond(request, "prescriptions", build)
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -223,20 +610,17 @@ async def mark_prescription_read(prescription_id: str):
     Mark a prescription as read by patient
     """
     try:
-        prescriptions = load_prescriptions()
+        def set_read(prescription):
+            prescription["read"] = True
+            prescription["read_at"] = datetime.now().isoformat()
 
-        # Find prescription
-        prescription = next((p for p in prescriptions if p["id"] == prescription_id), None)
+        # Update the one record atomically, looked up by id
+        prescription = await run_in_threadpool(store.update, "prescriptions", prescription_id, set_read)
 
         if not prescription:
             raise HTTPException(status_code=404, detail="Prescription not found")
 
-        prescription["read"] = True
-        prescription["read_at"] = datetime.now().isoformat()
-
-        save_prescriptions(prescriptions)
-
-        return JSONResponse(content={
+        return FastJSONResponse(content={
             "success": True,
             "message": "Prescription marked as read"
         })
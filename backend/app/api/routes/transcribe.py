@@ -1,53 +1,55 @@
 from fastapi import APIRouter, File, UploadFile, HTTPException
-from fastapi.responses import JSONResponse
 import os
 import tempfile
 from typing import List, Dict
 import logging
+from functools import lru_cache
 from app.core.config import settings
-
-# Import Groq and check version
-try:
-    import groq
-    from groq import Groq
-    groq_version = groq.__version__ if hasattr(groq, '__version__') else 'Unknown'
-except ImportError as e:
-    groq = None
-    Groq = None
-    groq_version = 'Not installed'
+from app.core.log import chatty
+from app.core.metrics import track_upstream
+from app.core.responses import FastJSONResponse
+from app.core.tracing import span
+from app.services.groq_scheduler import Priority, UpstreamBusyError, get_async_groq_client, groq_scheduler, upstream_busy
 
 router = APIRouter()
-
-# Configure logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Log Groq version
-logger.info(f"Groq SDK version: {groq_version}")
-
-# Initialize Groq client using settings
 groq_api_key = settings.GROQ_API_KEY
-if not groq_api_key:
-    logger.warning("GROQ_API_KEY not found in settings")
-else:
-    logger.info("Groq API key configured successfully")
 
+@lru_cache()
 def get_groq_client():
-    """Get or create Groq client with current SDK."""
-    if groq_api_key and Groq:
-        client = Groq(api_key=groq_api_key)
-        # Check if audio attribute exists
-        if hasattr(client, 'audio'):
-            logger.info("✅ Groq client has audio attribute")
-            return client
-        else:
-            logger.warning(f"❌ Groq client missing audio attribute. Version: {groq_version}")
-            logger.warning(f"Available attributes: {[attr for attr in dir(client) if not attr.startswith('_')]}")
-            return None
-    return None
-
-client = get_groq_client()
+    """
+    Create the Groq client on first use. The SDK is imported lazily so it
+    is not loaded until a transcription is actually requested.
+    """
+    if not groq_api_key:
+        logger.warning("GROQ_API_KEY not found in settings")
+        return None
+
+    # Import Groq and check version
+    try:
+        import groq
+    except ImportError:
+        logger.warning("Groq SDK not installed")
+        return None
 
+    groq_version = groq.__version__ if hasattr(groq, '__version__') else 'Unknown'
+    logger.info("Groq SDK version: %s", groq_version)
+
+    # Shared with chat and prescription analysis, whose calls go through the same scheduler
+    client = get_async_groq_client()
+    # Check if audio attribute exists
+    if hasattr(client, 'audio'):
+        logger.info("Groq client has audio attribute")
+        return client
+    else:
+        logger.warning(
+            "Groq client missing audio attribute. Version: %s", groq_version,
+            extra={"attributes": [attr for attr in dir(client) if not attr.startswith('_')]}
+        )
+        return None
+
+@span("transcribe.parse_segments")
 def parse_transcription_to_segments(text: str, total_duration: float = None) -> List[Dict]:
     """
     Parse transcription text into segments with timestamps.
@@ -91,13 +93,12 @@ async def transcribe_audio(audio: UploadFile = File(...)):
     Returns timestamped segments of transcribed text.
     """
     try:
-        # Get fresh client instance to ensure we have the latest SDK
         groq_client = get_groq_client()
 
         # Check if Groq client is initialized
         if not groq_client:
             logger.warning("Groq client not initialized, using mock data")
-            return JSONResponse(content={
+            return FastJSONResponse(content={
                 "transcription": [
                     {"start": 0.0, "end": 3.0, "text": "Hello, this is your doctor speaking."},
                     {"start": 3.0, "end": 6.0, "text": "Today we'll practice a memory exercise."},
@@ -107,12 +108,13 @@ async def transcribe_audio(audio: UploadFile = File(...)):
             })
 
         # Read file content first
-        logger.info(f"Received file: {audio.filename}, type: {audio.content_type}")
-        content = await audio.read()
+        logger.info("Received audio", extra=chatty(upload=audio.filename, content_type=audio.content_type))
+        with span("audio.read"):
+            content = await audio.read()
 
         if len(content) == 0:
             logger.warning("Received empty audio file")
-            return JSONResponse(content={
+            return FastJSONResponse(content={
                 "transcription": [
                     {"start": 0.0, "end": 3.0, "text": "Recording was empty. Please try again."}
                 ],
@@ -120,34 +122,37 @@ async def transcribe_audio(audio: UploadFile = File(...)):
             })
 
         # Save uploaded file temporarily
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.webm') as tmp_file:
+        with span("tempfile.write", bytes=len(content)), \
+                tempfile.NamedTemporaryFile(delete=False, suffix='.webm') as tmp_file:
             tmp_file.write(content)
             tmp_file_path = tmp_file.name
 
         try:
-            # Get file size for logging
-            file_size = os.path.getsize(tmp_file_path)
-            logger.info(f"Audio file size: {file_size} bytes")
-
             # Transcribe using Groq Whisper
-            logger.info("Starting transcription with Groq Whisper...")
+            logger.info("Starting transcription with Groq Whisper", extra=chatty(bytes=len(content)))
+
+            with span("tempfile.read"), open(tmp_file_path, "rb") as file:
+                audio_bytes = file.read()
 
             # Use the EXACT format from Groq documentation
-            with open(tmp_file_path, "rb") as file:
-                transcription = groq_client.audio.transcriptions.create(
-                    file=(audio.filename or "recording.webm", file.read()),
-                    model="whisper-large-v3",
-                    response_format="verbose_json",
-                    language="en"  # Force English language recognition
-                )
-                logger.info("Transcription completed successfully")
+            async def call():
+                with track_upstream("groq_whisper"):
+                    return await groq_client.audio.transcriptions.with_raw_response.create(
+                        file=(audio.filename or "recording.webm", audio_bytes),
+                        model="whisper-large-v3",
+                        response_format="verbose_json",
+                        language="en"  # Force English language recognition
+                    )
+
+            # Batch work: queues behind chat and prescription analysis
+            transcription = await groq_scheduler.run(Priority.TRANSCRIPTION, call)
 
             # Process the transcription response
             segments = []
 
             # Handle different response formats
             if hasattr(transcription, 'segments') and transcription.segments:
-                logger.info(f"Got {len(transcription.segments)} segments from Groq")
+                logger.info("Got segments from Groq", extra=chatty(segments=len(transcription.segments)))
                 for segment in transcription.segments:
                     segments.append({
                         "start": float(segment.start) if hasattr(segment, 'start') else segment.get('start', 0),
@@ -156,7 +161,7 @@ async def transcribe_audio(audio: UploadFile = File(...)):
                     })
             elif hasattr(transcription, 'text') and transcription.text:
                 # If we only got text without timestamps, create segments
-                logger.info("Got text without segments, creating segments...")
+                logger.info("Got text without segments, creating segments", extra=chatty())
                 segments = parse_transcription_to_segments(transcription.text)
             elif isinstance(transcription, dict):
                 # Handle dictionary response
@@ -171,8 +176,8 @@ async def transcribe_audio(audio: UploadFile = File(...)):
                     segments = parse_transcription_to_segments(transcription['text'])
 
             if segments:
-                logger.info(f"Successfully transcribed with {len(segments)} segments")
-                return JSONResponse(content={
+                logger.info("Transcribed audio", extra=chatty(segments=len(segments), model="whisper-large-v3"))
+                return FastJSONResponse(content={
                     "transcription": segments,
                     "status": "success",
                     "model": "whisper-large-v3"
@@ -180,10 +185,10 @@ async def transcribe_audio(audio: UploadFile = File(...)):
             else:
                 # Return the raw text if no segments
                 text = transcription.text if hasattr(transcription, 'text') else str(transcription)
-                logger.info(f"No segments, returning text: {text[:100]}...")
+                logger.info("No segments, returning text", extra=chatty(text=text[:100]))
                 segments = parse_transcription_to_segments(text) if text else []
 
-                return JSONResponse(content={
+                return FastJSONResponse(content={
                     "transcription": segments if segments else [{"start": 0, "end": 5, "text": text or "Transcription completed."}],
                     "status": "success",
                     "model": "whisper-large-v3"
@@ -193,10 +198,13 @@ async def transcribe_audio(audio: UploadFile = File(...)):
             # Clean up temp file
             if os.path.exists(tmp_file_path):
                 os.remove(tmp_file_path)
-                logger.info("Cleaned up temporary file")
 
+    except UpstreamBusyError as e:
+        # Mock segments would pass for a real transcript; tell the client to retry instead
+        logger.warning("Transcription shed: %s", e)
+        raise upstream_busy(e)
     except Exception as e:
-        logger.error(f"Transcription error: {str(e)}")
+        logger.error("Transcription error: %s", e)
 
         # Return enhanced mock data as fallback
         mock_transcription = [
@@ -209,7 +217,7 @@ async def transcribe_audio(audio: UploadFile = File(...)):
             {"start": 19.0, "end": 22.0, "text": "Take your time and don't feel rushed."}
         ]
 
-        return JSONResponse(
+        return FastJSONResponse(
             status_code=200,
             content={
                 "transcription": mock_transcription,
@@ -226,19 +234,20 @@ async def transcribe_audio_turbo(audio: UploadFile = File(...)):
     try:
         groq_client = get_groq_client()
         if not groq_client:
-            return JSONResponse(content={
+            return FastJSONResponse(content={
                 "transcription": [],
                 "warning": "Groq API key not configured."
             })
 
-        logger.info(f"Turbo transcription for: {audio.filename}")
+        logger.info("Turbo transcription", extra=chatty(upload=audio.filename))
 
         # Read content first
-        content = await audio.read()
+        with span("audio.read"):
+            content = await audio.read()
 
         if len(content) == 0:
             logger.warning("Received empty audio file for turbo")
-            return JSONResponse(content={
+            return FastJSONResponse(content={
                 "transcription": [
                     {"start": 0.0, "end": 3.0, "text": "Recording was empty. Please try again."}
                 ],
@@ -246,19 +255,26 @@ async def transcribe_audio_turbo(audio: UploadFile = File(...)):
             })
 
         # Save uploaded file temporarily
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.webm') as tmp_file:
+        with span("tempfile.write", bytes=len(content)), \
+                tempfile.NamedTemporaryFile(delete=False, suffix='.webm') as tmp_file:
             tmp_file.write(content)
             tmp_file_path = tmp_file.name
 
         try:
-            with open(tmp_file_path, "rb") as file:
-                # Use Turbo model for faster processing
-                transcription = groq_client.audio.transcriptions.create(
-                    file=(audio.filename or "recording.webm", file.read()),
-                    model="whisper-large-v3-turbo",
-                    response_format="verbose_json",
-                    language="en"  # Force English language recognition
-                )
+            with span("tempfile.read"), open(tmp_file_path, "rb") as file:
+                audio_bytes = file.read()
+
+            async def call():
+                with track_upstream("groq_whisper"):
+                    # Use Turbo model for faster processing
+                    return await groq_client.audio.transcriptions.with_raw_response.create(
+                        file=(audio.filename or "recording.webm", audio_bytes),
+                        model="whisper-large-v3-turbo",
+                        response_format="verbose_json",
+                        language="en"  # Force English language recognition
+                    )
+
+            transcription = await groq_scheduler.run(Priority.TRANSCRIPTION, call)
 
             # Process segments
             segments = []
@@ -272,7 +288,7 @@ async def transcribe_audio_turbo(audio: UploadFile = File(...)):
             elif hasattr(transcription, 'text'):
                 segments = parse_transcription_to_segments(transcription.text)
 
-            return JSONResponse(content={
+            return FastJSONResponse(content={
                 "transcription": segments,
                 "status": "success",
                 "model": "whisper-large-v3-turbo"
@@ -282,9 +298,12 @@ async def transcribe_audio_turbo(audio: UploadFile = File(...)):
             if os.path.exists(tmp_file_path):
                 os.remove(tmp_file_path)
 
+    except UpstreamBusyError as e:
+        logger.warning("Turbo transcription shed: %s", e)
+        raise upstream_busy(e)
     except Exception as e:
-        logger.error(f"Turbo transcription error: {str(e)}")
-        return JSONResponse(
+        logger.error("Turbo transcription error: %s", e)
+        return FastJSONResponse(
             status_code=200,
             content={
                 "transcription": [
@@ -299,6 +318,7 @@ async def transcribe_audio_turbo(audio: UploadFile = File(...)):
 @router.get("/status")
 async def transcription_status():
     """Check if transcription service is available."""
+    client = get_groq_client()
     has_audio = hasattr(client, 'audio') if client else False
     has_transcriptions = hasattr(client.audio, 'transcriptions') if client and has_audio else False
 
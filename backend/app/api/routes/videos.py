@@ -1,89 +1,262 @@
-from fastapi import APIRouter, File, UploadFile, HTTPException, Form, Request
-from fastapi.responses import JSONResponse, FileResponse, StreamingResponse
+from fastapi import APIRouter, File, UploadFile, HTTPException, Form, Request, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, StreamingResponse, Response
 from typing import List, Optional
-import os
+import asyncio
 import json
-import shutil
+import logging
 from datetime import datetime
 import uuid
 from pathlib import Path
+from app.services.subtitle_service import SubtitleStore, SubtitleTrack
+from app.services.blob_store import (
+    BlobStore, StoredBlob, UploadTooLargeError, UnsupportedMediaError, VIDEO_CONTENT_TYPES
+)
+from app.services.upload_session_service import (
+    UploadSessionStore,
+    UploadSessionNotFoundError,
+    UploadOffsetMismatchError,
+    UploadIncompleteError,
+    UploadBusyError
+)
+from app.services.transcode_service import TranscodeService, hls_content_type
+from app.services.progress_service import WatchProgressBuffer, watched_seconds
+from app.services.engagement_service import engagement_aggregates
+from app.models.video_models import CreateUploadRequest, UploadSessionStatus, ProgressHeartbeat
+from app.core.response_cache import response_cache, etag_matches
+from app.core.responses import FastJSONResponse
+from app.core.config import settings
+from app.core.store import store, CachedCollection
+from app.core.tracing import span
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
 
-# Create videos directory if it doesn't exist
+# Videos directory, created at startup if it doesn't exist
 VIDEOS_DIR = Path("uploaded_videos")
-VIDEOS_DIR.mkdir(exist_ok=True)
 
 # JSON file for persisting video metadata
 METADATA_FILE = VIDEOS_DIR / "video_metadata.json"
 
-# Load existing video metadata or initialize empty storage
-def load_video_storage():
-    """Load video metadata from JSON file"""
+# Video files are stored content-addressed (sha256) so duplicates share one blob
+blob_store = BlobStore(VIDEOS_DIR, chunk_size=settings.UPLOAD_CHUNK_SIZE)
+
+# Resumable uploads append chunks to partial files until they are finalized
+upload_sessions = UploadSessionStore(
+    VIDEOS_DIR / "partials",
+    blob_store,
+    max_bytes=settings.MAX_VIDEO_UPLOAD_BYTES,
+    ttl_seconds=settings.UPLOAD_SESSION_TTL_SECONDS
+)
+
+# Fast-start MP4 and HLS renditions, produced in the background after upload
+transcode_service = TranscodeService(
+    VIDEOS_DIR / "renditions",
+    ffmpeg_path=settings.FFMPEG_PATH,
+    ffprobe_path=settings.FFPROBE_PATH,
+    max_concurrent=settings.TRANSCODE_CONCURRENCY
+)
+
+# Subtitles live in one file per video so metadata stays small
+subtitle_store = SubtitleStore(VIDEOS_DIR / "subtitles")
+
+# Video metadata lives in the shared store; each worker keeps a cached snapshot
+videos = CachedCollection(store, "videos")
+
+def load_legacy_video_metadata():
+    """Load video metadata from the JSON file used before the shared store"""
     if METADATA_FILE.exists():
         try:
             with open(METADATA_FILE, 'r') as f:
                 return json.load(f)
         except Exception as e:
-            print(f"Error loading video metadata: {e}")
+            logger.error("Error loading video metadata: %s", e)
             return []
     return []
 
-def save_video_storage():
-    """Save video metadata to JSON file"""
-    try:
-        with open(METADATA_FILE, 'w') as f:
-            json.dump(video_storage, f, indent=2, default=str)
-    except Exception as e:
-        print(f"Error saving video metadata: {e}")
+def load_video_storage() -> List[dict]:
+    """All video metadata records, in upload order"""
+    return videos.items()
+
+def find_video(video_id: str) -> Optional[dict]:
+    return videos.get(video_id)
+
+def update_video(video_id: str, mutate) -> Optional[dict]:
+    """Atomically apply `mutate` to a stored video record"""
+    return store.update("videos", video_id, mutate)
 
-# Initialize video storage from file
-video_storage = load_video_storage()
+# Watch-progress heartbeats are buffered in memory and flushed in bulk
+progress_buffer = WatchProgressBuffer(store, flush_interval=settings.PROGRESS_FLUSH_INTERVAL_SECONDS)
+
+def set_watched(video_data):
+    video_data["watched"] = True
+    video_data["watched_at"] = datetime.now().isoformat()
+    video_data["status"] = "watched"
 
-def cleanup_orphaned_files():
+def mark_completed_videos(flushed):
+    """Mark videos watched once a patient has seen enough of them"""
+    completed_ids = set()
+    for (video_id, _), progress in flushed.items():
+        if progress.duration and watched_seconds(progress.intervals) / progress.duration >= settings.WATCH_COMPLETE_RATIO:
+            video = find_video(video_id)
+            if video and not video.get("watched"):
+                completed_ids.add(video_id)
+    if completed_ids:
+        store.update_many("videos", completed_ids, set_watched)
+
+def handle_progress_flush(flushed):
+    """Apply flushed watch progress to video status and patient activity"""
+    if not flushed:
+        return
+    mark_completed_videos(flushed)
+    engagement_aggregates.record_activity(
+        (patient_key, progress.updated_at) for (_, patient_key), progress in flushed.items()
+    )
+
+# Background tasks started by startup() and cancelled by shutdown()
+background_tasks: List[asyncio.Task] = []
+
+# Number of video files checked per reconciliation step
+RECONCILE_BATCH_SIZE = 200
+
+# Only one worker reconciles storage or collects uploads at a time
+RECONCILE_LEASE_SECONDS = 300
+TRANSCODE_LEASE_SECONDS = 600
+
+# Running transcodes renew their leases at least this often, and leases left
+# behind by a crashed or redeployed worker are picked up on the same schedule
+TRANSCODE_SWEEP_SECONDS = TRANSCODE_LEASE_SECONDS / 3
+
+async def cleanup_orphaned_files():
     """Clean up orphaned video files and metadata entries"""
-    # Remove metadata entries for missing video files
-    global video_storage
-    cleaned_storage = []
-    for video in video_storage:
-        video_path = VIDEOS_DIR / video.get("filename", "")
-        if video_path.exists():
-            cleaned_storage.append(video)
-        else:
-            print(f"Removing metadata for missing video file: {video.get('filename')}")
-
-    if len(cleaned_storage) != len(video_storage):
-        video_storage = cleaned_storage
-        save_video_storage()
+    # Remove metadata entries for missing video files, checking a batch of
+    # files per worker-thread hop so the event loop keeps serving requests
+    snapshot = [(video["id"], video.get("filename", "")) for video in load_video_storage()]
+    missing_ids = set()
+    for start in range(0, len(snapshot), RECONCILE_BATCH_SIZE):
+        batch = snapshot[start:start + RECONCILE_BATCH_SIZE]
+        exists = await run_in_threadpool(
+            lambda: [(VIDEOS_DIR / filename).exists() for _, filename in batch]
+        )
+        for (video_id, filename), found in zip(batch, exists):
+            if not found:
+                logger.info("Removing metadata for missing video file: %s", filename)
+                missing_ids.add(video_id)
+
+    if missing_ids:
+        await run_in_threadpool(store.delete_many, "videos", missing_ids)
 
     # Note: We don't delete video files without metadata to avoid accidental data loss
     # Those files can be manually cleaned up if needed
 
-# Clean up on startup
-cleanup_orphaned_files()
+def migrate_inline_subtitles():
+    """Move subtitles stored inside older metadata records into the subtitle store"""
+    legacy_ids = [video["id"] for video in load_video_storage() if "subtitles" in video]
+
+    def move_subtitles(video):
+        track = subtitle_store.save(video["id"], video.pop("subtitles", []))
+        video["subtitle_count"] = len(track.cues)
+
+    if legacy_ids:
+        store.update_many("videos", legacy_ids, move_subtitles)
+
+async def resume_transcodes():
+    """
+    Requeue transcodes whose worker died or restarted, once their lease has
+    expired, and renew the leases of transcodes queued or running here
+    """
+    for video in load_video_storage():
+        sha256 = video.get("sha256")
+        if not sha256 or video.get("transcode", {}).get("status") not in ("pending", "running"):
+            continue
+        lease = f"transcode:{sha256}"
+        if transcode_service.is_running(sha256):
+            await run_in_threadpool(store.acquire_lease, lease, TRANSCODE_LEASE_SECONDS)
+        elif await run_in_threadpool(store.acquire_lease, lease, TRANSCODE_LEASE_SECONDS):
+            await schedule_transcode(dict(video), persist=True)
+            if not transcode_service.is_running(sha256):
+                # Already transcoded, or transcoding is off: nothing holds the lease
+                await run_in_threadpool(store.release_lease, lease)
+
+async def reconcile_video_storage():
+    """Bring metadata back in line with the files on disk after a restart"""
+    try:
+        if not await run_in_threadpool(store.acquire_lease, "videos:reconcile", RECONCILE_LEASE_SECONDS):
+            return
+        await cleanup_orphaned_files()
+        await run_in_threadpool(migrate_inline_subtitles)
+        await resume_transcodes()
+    except Exception as e:
+        logger.exception("Error reconciling video storage")
+
+async def watch_transcodes():
+    """Periodically resume interrupted transcodes and keep running ones leased"""
+    while True:
+        await asyncio.sleep(TRANSCODE_SWEEP_SECONDS)
+        try:
+            await resume_transcodes()
+        except Exception as e:
+            logger.exception("Error resuming transcodes")
+
+async def collect_abandoned_uploads():
+    """Periodically discard resumable uploads that have gone idle"""
+    interval = max(settings.UPLOAD_SESSION_TTL_SECONDS / 24, 60)
+    while True:
+        try:
+            if await run_in_threadpool(store.acquire_lease, "videos:upload-gc", interval):
+                removed = await run_in_threadpool(upload_sessions.collect_garbage)
+                if removed:
+                    logger.info("Removed %s abandoned upload(s)", removed)
+        except Exception as e:
+            logger.exception("Error collecting abandoned uploads")
+        await asyncio.sleep(interval)
+
+async def startup():
+    """Import legacy metadata and start background reconciliation"""
+    await run_in_threadpool(VIDEOS_DIR.mkdir, exist_ok=True)
+    await run_in_threadpool(store.import_once, "videos", load_legacy_video_metadata)
+    await run_in_threadpool(progress_buffer.initialize)
+    response_cache.track("videos", lambda: store.version("videos"))
+
+    background_tasks.append(asyncio.create_task(reconcile_video_storage()))
+    background_tasks.append(asyncio.create_task(collect_abandoned_uploads()))
+    background_tasks.append(asyncio.create_task(watch_transcodes()))
+    background_tasks.append(asyncio.create_task(progress_buffer.run(on_flush=handle_progress_flush)))
+
+async def shutdown():
+    """Stop background tasks and flush buffered progress"""
+    for task in background_tasks:
+        task.cancel()
+    await asyncio.gather(*background_tasks, return_exceptions=True)
+    background_tasks.clear()
+
+    try:
+        await progress_buffer.flush(on_flush=handle_progress_flush)
+    except Exception as e:
+        logger.exception("Error flushing watch progress")
 
 @router.post("/upload")
 async def upload_video(
     video: UploadFile = File(...),
     title: str = Form(...),
     description: str = Form(""),
-    subtitles: str = Form("[]")  # JSON string of subtitles
+    subtitles: str = Form("[]"),  # JSON string of subtitles
+    patient_id: Optional[int] = Form(None)
 ):
     """
     Upload a video from doctor to patient with subtitles
     """
     try:
-        # Generate unique video ID
-        video_id = str(uuid.uuid4())
-
-        # Create video filename
-        file_extension = video.filename.split('.')[-1] if '.' in video.filename else 'webm'
-        video_filename = f"{video_id}.{file_extension}"
-        video_path = VIDEOS_DIR / video_filename
-
-        # Save video file
-        with open(video_path, "wb") as buffer:
-            shutil.copyfileobj(video.file, buffer)
+        # Stream the video into the blob store, hashing it on the way
+        try:
+            with span("upload.write_blob"):
+                blob = await run_in_threadpool(
+                    blob_store.write_stream, video.file, settings.MAX_VIDEO_UPLOAD_BYTES
+                )
+        except UploadTooLargeError as e:
+            raise HTTPException(status_code=413, detail=str(e))
+        except UnsupportedMediaError as e:
+            raise HTTPException(status_code=415, detail=str(e))
 
         # Parse subtitles
         try:
@@ -91,74 +264,269 @@ async def upload_video(
         except json.JSONDecodeError:
             subtitles_data = []
 
-        # Create video metadata
-        video_data = {
-            "id": video_id,
-            "title": title,
-            "description": description,
-            "filename": video_filename,
-            "subtitles": subtitles_data,
-            "uploaded_at": datetime.now().isoformat(),
-            "status": "unwatched",
-            "type": "Doctor Instruction"
-        }
-
-        # Store in memory and persist to file
-        video_storage.append(video_data)
-        save_video_storage()
-
-        return JSONResponse(content={
-            "success": True,
-            "video_id": video_id,
-            "message": "Video uploaded successfully"
-        })
+        with span("upload.create_record"):
+            video_data = await create_video_record(blob, title, description, subtitles_data, patient_id)
+        return upload_response(video_data, blob)
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.get("/list")
-async def list_videos():
-    """
-    Get list of all videos for the patient
-    """
-    # Transform for patient view
-    patient_videos = []
-    for video in video_storage:
-        patient_videos.append({
-            "id": video["id"],
-            "date": datetime.fromisoformat(video["uploaded_at"]).strftime("%B %d, %Y"),
-            "time": datetime.fromisoformat(video["uploaded_at"]).strftime("%I:%M %p"),
-            "type": f"{video['type']}: {video['title']}",
-            "status": video["status"],
-            "watched": video.get("watched", False),
-            "watched_at": video.get("watched_at", None),
-            "video_url": f"/api/videos/stream/{video['id']}",
-            "summary": video["description"],
-            "transcript": video["subtitles"]
+async def create_video_record(
+    blob: StoredBlob,
+    title: str,
+    description: str,
+    subtitles_data: list,
+    patient_id: Optional[int]
+) -> dict:
+    """Create and persist the metadata record for a stored video blob"""
+    # Generate unique video ID
+    video_id = str(uuid.uuid4())
+
+    # Store subtitles separately from the metadata record
+    track = await run_in_threadpool(subtitle_store.save, video_id, subtitles_data)
+
+    # Create video metadata
+    video_data = {
+        "id": video_id,
+        "title": title,
+        "description": description,
+        "filename": blob.filename,
+        "sha256": blob.sha256,
+        "size": blob.size,
+        "content_type": blob.content_type,
+        "patient_id": patient_id,
+        "subtitle_count": len(track.cues),
+        "uploaded_at": datetime.now().isoformat(),
+        "status": "unwatched",
+        "type": "Doctor Instruction"
+    }
+    await schedule_transcode(video_data)
+
+    # Persist to the shared store
+    await run_in_threadpool(store.put, "videos", video_data)
+    return video_data
+
+async def schedule_transcode(video_data: dict, persist: bool = False):
+    """Queue background transcoding for a video and record its state"""
+    sha256 = video_data.get("sha256")
+    if not sha256:
+        # Uploaded before content addressing; served as-is
+        return
+
+    if transcode_service.is_ready(sha256):
+        video_data["transcode"] = {"status": "ready", "progress": 1.0}
+    elif not settings.TRANSCODE_ENABLED or not transcode_service.available:
+        video_data["transcode"] = {"status": "unavailable", "progress": 0.0}
+    else:
+        video_data["transcode"] = {"status": "pending", "progress": 0.0}
+        lease = f"transcode:{sha256}"
+
+        async def on_progress(status: str, progress: float):
+            # Renditions are per blob, so every record sharing it is updated
+            def set_state(video):
+                video["transcode"] = {"status": status, "progress": round(progress, 3)}
+
+            sharing_ids = [v["id"] for v in load_video_storage() if v.get("sha256") == sha256]
+            await run_in_threadpool(store.update_many, "videos", sharing_ids, set_state)
+            if status in ("ready", "failed"):
+                await run_in_threadpool(store.release_lease, lease)
+            else:
+                await run_in_threadpool(store.acquire_lease, lease, TRANSCODE_LEASE_SECONDS)
+
+        # Another worker may already be transcoding the same blob
+        if await run_in_threadpool(store.acquire_lease, lease, TRANSCODE_LEASE_SECONDS):
+            transcode_service.schedule(VIDEOS_DIR / video_data["filename"], sha256, on_progress)
+
+    if persist:
+        await run_in_threadpool(
+            store.update, "videos", video_data["id"], lambda video: video.update(transcode=video_data["transcode"])
+        )
+
+def upload_response(video_data: dict, blob: StoredBlob) -> FastJSONResponse:
+    return FastJSONResponse(content={
+        "success": True,
+        "video_id": video_data["id"],
+        "sha256": blob.sha256,
+        "deduplicated": blob.deduplicated,
+        "message": "Video uploaded successfully"
+    })
+
+@router.post("/uploads", response_model=UploadSessionStatus)
+async def create_upload(request: CreateUploadRequest):
+    """
+    Start a resumable upload. The client then PUTs chunks to
+    /uploads/{upload_id}?offset=N and finishes with /uploads/{upload_id}/finalize
+    """
+    try:
+        return upload_sessions.create(request.total_size, {
+            "title": request.title,
+            "description": request.description,
+            "subtitles": request.subtitles,
+            "patient_id": request.patient_id
         })
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+
+@router.get("/uploads/{upload_id}", response_model=UploadSessionStatus)
+async def get_upload_status(upload_id: str):
+    """
+    Get the offset a resumable upload should continue from
+    """
+    try:
+        return upload_sessions.describe(upload_id)
+    except UploadSessionNotFoundError:
+        raise HTTPException(status_code=404, detail="Upload not found")
+
+@router.put("/uploads/{upload_id}", response_model=UploadSessionStatus)
+async def upload_chunk(upload_id: str, request: Request, offset: int = Query(..., ge=0)):
+    """
+    Append the raw request body to a resumable upload at the given offset
+    """
+    try:
+        with span("upload.append_chunk", offset=offset):
+            await upload_sessions.append(upload_id, offset, request.stream())
+        return upload_sessions.describe(upload_id)
+    except UploadSessionNotFoundError:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    except UploadOffsetMismatchError as e:
+        raise HTTPException(status_code=409, detail=str(e), headers={"Upload-Offset": str(e.expected)})
+    except UploadBusyError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except UnsupportedMediaError as e:
+        # The first chunk shows the file can never be finalized
+        upload_sessions.abort(upload_id)
+        raise HTTPException(status_code=415, detail=str(e))
+
+@router.post("/uploads/{upload_id}/finalize")
+async def finalize_upload(upload_id: str):
+    """
+    Finish a resumable upload and create the video record
+    """
+    try:
+        with span("upload.finalize"):
+            blob, metadata = await upload_sessions.finalize(upload_id)
+    except UploadSessionNotFoundError:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    except (UploadIncompleteError, UploadBusyError) as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except UnsupportedMediaError as e:
+        upload_sessions.abort(upload_id)
+        raise HTTPException(status_code=415, detail=str(e))
+
+    return upload_response(
+        await create_video_record(
+            blob,
+            metadata["title"],
+            metadata["description"],
+            metadata["subtitles"],
+            metadata["patient_id"]
+        ),
+        blob
+    )
+
+@router.delete("/uploads/{upload_id}")
+async def abort_upload(upload_id: str):
+    """
+    Abandon a resumable upload and discard its partial data
+    """
+    try:
+        upload_sessions.abort(upload_id)
+    except UploadSessionNotFoundError:
+        raise HTTPException(status_code=404, detail="Upload not found")
 
-    return JSONResponse(content={
-        "videos": patient_videos
+    return FastJSONResponse(content={
+        "success": True,
+        "message": "Upload aborted"
     })
 
+@router.get("/list")
+async def list_videos(request: Request, since: Optional[int] = Query(None, ge=0)):
+    """
+    Get list of all videos for the patient.
+    Pass `since` (the `seq` of an earlier response) to get only what changed.
+    """
+    if since is not None:
+        return await response_cache.respond(request, "videos", lambda: build_video_delta(since))
+    return await response_cache.respond(request, "videos", build_video_list)
+
+def video_list_entry(video: dict) -> dict:
+    """Transform stored video metadata for the patient view"""
+    return {
+        "id": video["id"],
+        "date": datetime.fromisoformat(video["uploaded_at"]).strftime("%B %d, %Y"),
+        "time": datetime.fromisoformat(video["uploaded_at"]).strftime("%I:%M %p"),
+        "type": f"{video['type']}: {video['title']}",
+        "status": video["status"],
+        "watched": video.get("watched", False),
+        "watched_at": video.get("watched_at", None),
+        "video_url": f"/api/videos/stream/{video['id']}",
+        "hls_url": f"/api/videos/{video['id']}/hls/master.m3u8" if is_transcoded(video) else None,
+        "transcode_status": video.get("transcode", {}).get("status"),
+        "summary": video["description"],
+        "subtitles_url": f"/api/videos/{video['id']}/subtitles",
+        "subtitle_count": video.get("subtitle_count", 0)
+    }
+
+def build_video_list():
+    """All videos in the patient view, with the change sequence they reflect"""
+    # Read the sequence first; anything written meanwhile is resent by the next delta
+    seq = store.sequence()
+    return {
+        "videos": [video_list_entry(video) for video in load_video_storage()],
+        "seq": seq
+    }
+
+def build_video_delta(since: int):
+    """Videos added, updated or deleted after change sequence `since`"""
+    delta = store.delta("videos", since)
+    return {
+        "videos": [video_list_entry(video) for video in delta["changed"]],
+        "deleted": delta["deleted"],
+        "seq": delta["seq"],
+        "reset": delta["reset"]
+    }
+
+def video_content_type(video_data: dict) -> str:
+    """Content type of a stored video, falling back to its file extension"""
+    if video_data.get("content_type"):
+        return video_data["content_type"]
+    file_ext = video_data["filename"].split('.')[-1].lower()
+    return VIDEO_CONTENT_TYPES.get(file_ext, 'video/webm')
+
+def is_transcoded(video_data: dict) -> bool:
+    return video_data.get("transcode", {}).get("status") == "ready"
+
+def playback_file(video_data: dict):
+    """Best available file to stream for a video: the fast-start MP4 once ready, else the original"""
+    if is_transcoded(video_data):
+        faststart_path = transcode_service.faststart_path(video_data["sha256"])
+        if faststart_path.exists():
+            return faststart_path, "video/mp4"
+    return VIDEOS_DIR / video_data["filename"], video_content_type(video_data)
+
 @router.get("/stream/{video_id}")
 async def stream_video(video_id: str, request: Request):
     """
     Stream a video file with range request support
     """
-    # Find video in storage
-    video_data = next((v for v in video_storage if v["id"] == video_id), None)
+    with span("video.lookup"):
+        # Find video in storage
+        video_data = find_video(video_id)
 
-    if not video_data:
-        raise HTTPException(status_code=404, detail="Video not found")
+        if not video_data:
+            raise HTTPException(status_code=404, detail="Video not found")
 
-    video_path = VIDEOS_DIR / video_data["filename"]
+        video_path, content_type = playback_file(video_data)
 
-    if not video_path.exists():
-        raise HTTPException(status_code=404, detail="Video file not found")
+        if not video_path.exists():
+            raise HTTPException(status_code=404, detail="Video file not found")
 
-    # Get file size
-    file_size = video_path.stat().st_size
+        # Get file size
+        file_size = video_path.stat().st_size
 
     # Check if range request
     range_header = request.headers.get('range')
@@ -189,15 +557,6 @@ async def stream_video(video_id: str, request: Request):
                     current_position += len(data)
                     yield data
 
-        # Determine content type based on file extension
-        file_ext = video_data["filename"].split('.')[-1].lower()
-        content_type = {
-            'webm': 'video/webm',
-            'mp4': 'video/mp4',
-            'mov': 'video/quicktime',
-            'avi': 'video/x-msvideo'
-        }.get(file_ext, 'video/webm')
-
         return StreamingResponse(
             iterfile(),
             status_code=206,
@@ -206,55 +565,105 @@ async def stream_video(video_id: str, request: Request):
                 'Content-Range': f'bytes {range_start}-{range_end}/{file_size}',
                 'Accept-Ranges': 'bytes',
                 'Content-Length': str(range_end - range_start + 1),
-                'Content-Disposition': f'inline; filename={video_data["filename"]}',
+                'Content-Disposition': f'inline; filename={video_path.name}',
                 'Cache-Control': 'no-cache'
             }
         )
     else:
         # Regular file response for non-range requests
-        file_ext = video_data["filename"].split('.')[-1].lower()
-        content_type = {
-            'webm': 'video/webm',
-            'mp4': 'video/mp4',
-            'mov': 'video/quicktime',
-            'avi': 'video/x-msvideo'
-        }.get(file_ext, 'video/webm')
-
         return FileResponse(
             path=video_path,
             media_type=content_type,
             headers={
                 "Accept-Ranges": "bytes",
-                "Content-Disposition": f"inline; filename={video_data['filename']}",
+                "Content-Disposition": f"inline; filename={video_path.name}",
                 "Cache-Control": "no-cache",
                 "Content-Length": str(file_size)
             }
         )
 
 @router.get("/{video_id}")
-async def get_video_details(video_id: str):
+async def get_video_details(video_id: str, request: Request):
     """
     Get detailed information about a specific video
     """
-    video_data = next((v for v in video_storage if v["id"] == video_id), None)
+    video_data = find_video(video_id)
 
     if not video_data:
         raise HTTPException(status_code=404, detail="Video not found")
 
-    return JSONResponse(content=video_data)
+    return await response_cache.respond(request, "videos", lambda: video_data)
+
+@router.get("/{video_id}/hls/{asset_path:path}")
+async def stream_hls(video_id: str, asset_path: str):
+    """
+    Serve HLS playlists and segments for a transcoded video
+    """
+    video_data = find_video(video_id)
+
+    if not video_data:
+        raise HTTPException(status_code=404, detail="Video not found")
+
+    if not is_transcoded(video_data):
+        raise HTTPException(status_code=404, detail="HLS renditions are not ready yet")
+
+    rendition_dir = transcode_service.rendition_dir(video_data["sha256"]).resolve()
+    asset = (rendition_dir / asset_path).resolve()
+    if rendition_dir not in asset.parents or not asset.is_file():
+        raise HTTPException(status_code=404, detail="HLS asset not found")
+
+    # Segments never change once written; playlists are small and revalidated
+    cache_control = "no-cache" if asset.suffix == ".m3u8" else "public, max-age=31536000, immutable"
+    return FileResponse(
+        path=asset,
+        media_type=hls_content_type(asset),
+        headers={"Cache-Control": cache_control}
+    )
+
+@router.get("/{video_id}/subtitles")
+async def get_video_subtitles(
+    video_id: str,
+    request: Request,
+    format: str = Query("vtt", pattern="^(vtt|json)$"),
+    start: Optional[float] = Query(None, alias="from", ge=0),
+    end: Optional[float] = Query(None, alias="to", ge=0)
+):
+    """
+    Get subtitles for a video as WebVTT or JSON, optionally limited to the
+    cues visible in a from/to time window (in seconds)
+    """
+    if find_video(video_id) is None:
+        raise HTTPException(status_code=404, detail="Video not found")
+
+    if start is not None and end is not None and end < start:
+        raise HTTPException(status_code=400, detail="'to' must not be before 'from'")
+
+    track = subtitle_store.get(video_id) or SubtitleTrack(video_id, [])
+
+    etag = track.window_etag(format, start, end)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+
+    media_type = "text/vtt; charset=utf-8" if format == "vtt" else "application/json"
+    return Response(
+        content=track.render(format, start, end),
+        media_type=media_type,
+        headers=headers
+    )
 
 @router.post("/reload")
 async def reload_video_metadata():
     """
-    Reload video metadata from file
+    Reload video metadata and reconcile it with the files on disk
     """
-    global video_storage
     try:
-        video_storage = load_video_storage()
-        cleanup_orphaned_files()
-        return JSONResponse(content={
+        await cleanup_orphaned_files()
+        await run_in_threadpool(migrate_inline_subtitles)
+        response_cache.bump("videos")
+        return FastJSONResponse(content={
             "success": True,
-            "message": f"Reloaded metadata for {len(video_storage)} videos"
+            "message": f"Reloaded metadata for {len(load_video_storage())} videos"
         })
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -264,20 +673,19 @@ async def update_video_status(video_id: str, status: str):
     """
     Update video watch status
     """
-    video_data = next((v for v in video_storage if v["id"] == video_id), None)
-
-    if not video_data:
-        raise HTTPException(status_code=404, detail="Video not found")
+    def set_status(video_data):
+        video_data["status"] = status
 
-    video_data["status"] = status
+        if status == "watched":
+            video_data["completed_at"] = datetime.now().isoformat()
 
-    if status == "watched":
-        video_data["completed_at"] = datetime.now().isoformat()
+    # Save changes atomically in the shared store
+    video_data = await run_in_threadpool(update_video, video_id, set_status)
 
-    # Save changes to file
-    save_video_storage()
+    if not video_data:
+        raise HTTPException(status_code=404, detail="Video not found")
 
-    return JSONResponse(content={
+    return FastJSONResponse(content={
         "success": True,
         "message": f"Video status updated to {status}"
     })
@@ -287,42 +695,75 @@ async def mark_video_watched(video_id: str):
     """
     Mark a video as watched
     """
-    video_data = next((v for v in video_storage if v["id"] == video_id), None)
+    # Save changes atomically in the shared store
+    video_data = await run_in_threadpool(update_video, video_id, set_watched)
 
     if not video_data:
         raise HTTPException(status_code=404, detail="Video not found")
 
-    video_data["watched"] = True
-    video_data["watched_at"] = datetime.now().isoformat()
-    video_data["status"] = "watched"
-
-    # Save changes to file
-    save_video_storage()
-
-    return JSONResponse(content={
+    return FastJSONResponse(content={
         "success": True,
         "message": "Video marked as watched",
         "watched_at": video_data["watched_at"]
     })
 
+def progress_patient_key(video_data: dict, patient_id: Optional[int]) -> str:
+    """Progress is tracked per patient; default to the patient the video was sent to"""
+    if patient_id is None:
+        patient_id = video_data.get("patient_id")
+    return str(patient_id) if patient_id is not None else "anonymous"
+
+@router.post("/{video_id}/progress", status_code=202)
+async def record_watch_progress(video_id: str, heartbeat: ProgressHeartbeat):
+    """
+    Record a playback heartbeat. Heartbeats are merged in memory and
+    written to storage periodically, so players can report every few seconds
+    """
+    video_data = find_video(video_id)
+
+    if not video_data:
+        raise HTTPException(status_code=404, detail="Video not found")
+
+    progress_buffer.record(
+        video_id,
+        progress_patient_key(video_data, heartbeat.patient_id),
+        heartbeat.position,
+        heartbeat.played_from,
+        heartbeat.duration
+    )
+
+    return {"accepted": True}
+
+@router.get("/{video_id}/progress")
+async def get_watch_progress(video_id: str, patient_id: Optional[int] = None):
+    """
+    Get how far a patient has watched a video, including the ranges played
+    """
+    video_data = find_video(video_id)
+
+    if not video_data:
+        raise HTTPException(status_code=404, detail="Video not found")
+
+    progress = progress_buffer.load(video_id, progress_patient_key(video_data, patient_id))
+    return FastJSONResponse(content={"video_id": video_id, **progress.to_dict()})
+
 @router.post("/{video_id}/unwatch")
 async def mark_video_unwatched(video_id: str):
     """
     Mark a video as unwatched
     """
-    video_data = next((v for v in video_storage if v["id"] == video_id), None)
+    def set_unwatched(video_data):
+        video_data["watched"] = False
+        video_data.pop("watched_at", None)
+        video_data["status"] = "unwatched"
+
+    # Save changes atomically in the shared store
+    video_data = await run_in_threadpool(update_video, video_id, set_unwatched)
 
     if not video_data:
         raise HTTPException(status_code=404, detail="Video not found")
 
-    video_data["watched"] = False
-    video_data.pop("watched_at", None)
-    video_data["status"] = "unwatched"
-
-    # Save changes to file
-    save_video_storage()
-
-    return JSONResponse(content={
+    return FastJSONResponse(content={
         "success": True,
         "message": "Video marked as unwatched"
     })
\ No newline at end of file
@@ -1,11 +1,19 @@
 from fastapi import APIRouter, HTTPException
+import logging
 from pydantic import BaseModel
 from typing import List, Optional
+from functools import lru_cache
 from app.services.youtube_service import YouTubeService
 from app.models.chat_models import TranscriptItem
+from app.core.responses import FastJSONResponse
 
 router = APIRouter()
-youtube_service = YouTubeService()
+logger = logging.getLogger(__name__)
+
+@lru_cache()
+def get_youtube_service() -> YouTubeService:
+    """Create the YouTube service on first use rather than at import"""
+    return YouTubeService()
 
 class YouTubeTranscriptRequest(BaseModel):
     video_url: str
@@ -25,6 +33,7 @@ async def get_youtube_transcript(request: YouTubeTranscriptRequest):
     """
     try:
         # Get video info
+        youtube_service = get_youtube_service()
         video_info = await youtube_service.get_video_info(request.video_url)
 
         # Get transcript
@@ -39,18 +48,18 @@ async def get_youtube_transcript(request: YouTubeTranscriptRequest):
                 detail="No transcript available for this video. The video might not have captions."
             )
 
-        return YouTubeTranscriptResponse(
+        return FastJSONResponse(YouTubeTranscriptResponse(
             video_id=video_info["video_id"],
             title=video_info.get("title", "Unknown"),
             duration=video_info.get("duration", 0),
             embed_url=video_info["embed_url"],
             transcript=transcript
-        )
+        ))
 
     except HTTPException:
         raise
     except Exception as e:
-        print(f"Error in YouTube transcript endpoint: {str(e)}")
+        logger.error("Error in YouTube transcript endpoint: %s", e)
         raise HTTPException(
             status_code=500,
             detail=f"Failed to fetch YouTube transcript: {str(e)}"
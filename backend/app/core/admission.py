@@ -0,0 +1,198 @@
+import asyncio
+import math
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+from starlette.datastructures import Headers
+
+from app.core.config import settings
+from app.core.metrics import admission_queue_depth, admission_rejections
+from app.core.responses import FastJSONResponse
+from app.core.tracing import route_template
+
+# Room for the form fields and subtitles sent alongside an uploaded video
+FORM_OVERHEAD_BYTES = 16 * 1024 * 1024
+
+# Unread bodies up to this size are discarded after a rejection, so the
+# connection closes cleanly and the client sees the response instead of a reset
+MAX_DRAIN_BYTES = 32 * 1024 * 1024
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request is turned away rather than queued"""
+
+    def __init__(self, reason: str, retry_after: float):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class ConcurrencyLimiter:
+    """
+    At most `limit` requests at once, with up to `queue_size` more waiting
+    up to `max_wait` seconds for a slot. Anything beyond that is rejected
+    straight away, with a Retry-After estimated from recent request times.
+    """
+
+    def __init__(self, name: str, limit: int, queue_size: int, max_wait: float):
+        self.name = name
+        self.limit = limit
+        self.queue_size = queue_size
+        self.max_wait = max_wait
+        self.waiting = 0
+        self.average_seconds = 1.0
+        self._semaphore = asyncio.Semaphore(limit)
+
+    def retry_after(self) -> float:
+        # Time for the requests ahead to drain through the slots
+        return self.average_seconds * (self.waiting + 1) / self.limit
+
+    async def acquire(self) -> None:
+        if self._semaphore.locked():
+            if self.waiting >= self.queue_size:
+                raise AdmissionRejected("queue_full", self.retry_after())
+            self.waiting += 1
+            admission_queue_depth.inc(route=self.name)
+            try:
+                await asyncio.wait_for(self._semaphore.acquire(), timeout=self.max_wait)
+            except asyncio.TimeoutError:
+                raise AdmissionRejected("timeout", self.retry_after()) from None
+            finally:
+                self.waiting -= 1
+                admission_queue_depth.dec(route=self.name)
+        else:
+            await self._semaphore.acquire()
+
+    def release(self, held_seconds: float) -> None:
+        self._semaphore.release()
+        # Exponentially weighted, so the estimate follows load changes
+        self.average_seconds += 0.2 * (held_seconds - self.average_seconds)
+
+
+class MemoryBudget:
+    """Bytes of request bodies that may be held in memory at once"""
+
+    def __init__(self, budget: int):
+        self.budget = budget
+        self.reserved = 0
+
+    def reserve(self, size: int, retry_after: float) -> None:
+        if self.reserved + size > self.budget:
+            raise AdmissionRejected("memory", retry_after)
+        self.reserved += size
+
+    def release(self, size: int) -> None:
+        self.reserved -= size
+
+
+@dataclass
+class AdmissionRule:
+    limiter: ConcurrencyLimiter
+    max_body: Optional[int] = None  # Declared bodies larger than this get a 413
+    buffered: bool = False  # The handler holds the whole body in memory
+
+
+def build_rules() -> Dict[Tuple[str, str], AdmissionRule]:
+    """
+    Limited routes by method and path template. Transcription routes share one
+    limiter, and so do whole-file and chunked video uploads.
+    """
+    wait = settings.ADMISSION_MAX_WAIT_SECONDS
+    chat = ConcurrencyLimiter("/api/chat/", settings.ADMISSION_CHAT_CONCURRENCY, settings.ADMISSION_CHAT_QUEUE, wait)
+    transcribe = ConcurrencyLimiter(
+        "/api/transcribe/", settings.ADMISSION_TRANSCRIBE_CONCURRENCY, settings.ADMISSION_TRANSCRIBE_QUEUE, wait
+    )
+    upload = ConcurrencyLimiter(
+        "/api/videos/upload", settings.ADMISSION_UPLOAD_CONCURRENCY, settings.ADMISSION_UPLOAD_QUEUE, wait
+    )
+    # Audio arrives as one multipart field, so allow a little over the file limit
+    audio_body = settings.MAX_AUDIO_UPLOAD_BYTES + 64 * 1024
+    return {
+        ("POST", "/api/chat/"): AdmissionRule(chat),
+        ("POST", "/api/transcribe/"): AdmissionRule(transcribe, max_body=audio_body, buffered=True),
+        ("POST", "/api/transcribe/turbo"): AdmissionRule(transcribe, max_body=audio_body, buffered=True),
+        # Video bodies are streamed to disk, so they only count against the concurrency limit
+        ("POST", "/api/videos/upload"): AdmissionRule(
+            upload, max_body=settings.MAX_VIDEO_UPLOAD_BYTES + FORM_OVERHEAD_BYTES
+        ),
+        ("PUT", "/api/videos/uploads/{upload_id}"): AdmissionRule(upload, max_body=settings.MAX_VIDEO_UPLOAD_BYTES),
+    }
+
+
+async def reject(scope, receive, send, status_code: int, detail: str, retry_after: Optional[float] = None) -> None:
+    """Answer without running the route, then discard the body the client is still sending"""
+    headers = {}
+    if retry_after is not None:
+        headers["Retry-After"] = str(max(1, math.ceil(retry_after)))
+    await FastJSONResponse(status_code=status_code, content={"detail": detail}, headers=headers)(scope, receive, send)
+
+    drained = 0
+    while drained <= MAX_DRAIN_BYTES:
+        message = await receive()
+        if message["type"] != "http.request":
+            break
+        drained += len(message.get("body", b""))
+        if not message.get("more_body", False):
+            break
+
+
+class AdmissionMiddleware:
+    """
+    Admission control for the expensive write routes: per-route concurrency
+    limits with bounded wait queues, and a shared memory budget for
+    request bodies that handlers read into memory, charged by declared
+    Content-Length. Saturated routes answer a fast 503 with Retry-After
+    before any of the body is read.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.rules = build_rules()
+        self.methods = {method for method, _ in self.rules}
+        self.memory = MemoryBudget(settings.ADMISSION_MEMORY_BUDGET_BYTES)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in self.methods:
+            await self.app(scope, receive, send)
+            return
+
+        route = route_template(scope)
+        rule = self.rules.get((scope["method"], route))
+        if rule is None:
+            await self.app(scope, receive, send)
+            return
+
+        limiter = rule.limiter
+        content_length = Headers(scope=scope).get("content-length")
+        size = int(content_length) if content_length and content_length.isdigit() else None
+
+        if size is None and rule.buffered:
+            admission_rejections.inc(route=route, reason="length_required")
+            await reject(scope, receive, send, 411, "Content-Length is required")
+            return
+        if size is not None and rule.max_body is not None and size > rule.max_body:
+            admission_rejections.inc(route=route, reason="too_large")
+            await reject(scope, receive, send, 413, f"Request body exceeds the {rule.max_body} byte limit")
+            return
+
+        reserved = size if rule.buffered else 0
+        try:
+            if reserved:
+                self.memory.reserve(reserved, limiter.retry_after())
+            try:
+                await limiter.acquire()
+            except AdmissionRejected:
+                self.memory.release(reserved)
+                raise
+        except AdmissionRejected as e:
+            admission_rejections.inc(route=route, reason=e.reason)
+            await reject(scope, receive, send, 503, "Server is busy, please retry shortly", e.retry_after)
+            return
+
+        start = time.monotonic()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limiter.release(time.monotonic() - start)
+            self.memory.release(reserved)
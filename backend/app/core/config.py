@@ -18,10 +18,101 @@ class Settings(BaseSettings):
     # Groq API Settings
     GROQ_API_KEY: str = ""  # Will be loaded from .env file
     GROQ_MODEL: str = "llama-3.3-70b-versatile"
+    GROQ_BASE_URL: str = ""  # Alternative Groq-compatible endpoint, e.g. the load-test stand-in; empty uses Groq's
+
+    # Groq Rate Limit Settings (per worker; lowered further by Groq's rate-limit headers)
+    GROQ_REQUESTS_PER_MINUTE: int = 30
+    GROQ_TOKENS_PER_MINUTE: int = 12000
+    GROQ_CHAT_MAX_WAIT_SECONDS: float = 10.0  # How long each kind of call may queue for capacity
+    GROQ_ANALYSIS_MAX_WAIT_SECONDS: float = 30.0
+    GROQ_TRANSCRIPTION_MAX_WAIT_SECONDS: float = 120.0
+
+    # YouTube Settings
+    TRANSCRIPT_API_URL: str = ""  # Fetch transcripts and video info from this service instead of YouTube
+
+    # Prescription Analysis Settings
+    ANALYSIS_CACHE_TTL_SECONDS: int = 7 * 24 * 60 * 60  # Reuse an analysis of the same payload for a week
+    ANALYSIS_CACHE_MAX_ENTRIES: int = 5000
+    ANALYSIS_BATCH_CONCURRENCY: int = 4  # Model calls in flight at once per batch request
+    ANALYSIS_BATCH_MAX_ITEMS: int = 20
+
+    # Shared State Settings
+    DATABASE_PATH: str = "healthhack.db"  # SQLite store shared by all worker processes
+    CHANGE_LOG_RETENTION: int = 10000  # Changes kept for ?since= sync; older cursors get a full resync
+
+    # Server-Sent Events Settings
+    EVENTS_POLL_INTERVAL_SECONDS: float = 1.0  # How often each worker checks the store for new changes
+    EVENTS_HEARTBEAT_SECONDS: float = 15.0
+    EVENTS_QUEUE_SIZE: int = 256  # Events buffered per client; a client that falls further behind is told to resync
+    EVENTS_CATCHUP_LIMIT: int = 1000  # Changes replayed on reconnect; a longer gap gets a resync instead
+
+    # Video Upload Settings
+    MAX_VIDEO_UPLOAD_BYTES: int = 500 * 1024 * 1024  # 500 MB
+    UPLOAD_CHUNK_SIZE: int = 1024 * 1024  # 1 MB read/write buffer
+    UPLOAD_SESSION_TTL_SECONDS: int = 24 * 60 * 60  # Abandoned resumable uploads expire after a day
+
+    # Admission Control Settings
+    ADMISSION_ENABLED: bool = True  # Limit concurrent chat, transcription and upload requests
+    ADMISSION_MAX_WAIT_SECONDS: float = 2.0  # Longest a request queues for a slot before getting a 503
+    ADMISSION_CHAT_CONCURRENCY: int = 32
+    ADMISSION_CHAT_QUEUE: int = 64
+    ADMISSION_TRANSCRIBE_CONCURRENCY: int = 4
+    ADMISSION_TRANSCRIBE_QUEUE: int = 8
+    ADMISSION_UPLOAD_CONCURRENCY: int = 4
+    ADMISSION_UPLOAD_QUEUE: int = 8
+    ADMISSION_MEMORY_BUDGET_BYTES: int = 256 * 1024 * 1024  # Request bodies held in memory at once, by Content-Length
+    MAX_AUDIO_UPLOAD_BYTES: int = 25 * 1024 * 1024  # Largest file Groq's Whisper API accepts
+
+    # Watch Progress Settings
+    PROGRESS_FLUSH_INTERVAL_SECONDS: float = 10.0
+    WATCH_COMPLETE_RATIO: float = 0.9  # Share of a video that must be played to count as watched
+
+    # Transcoding Settings
+    TRANSCODE_ENABLED: bool = True
+    FFMPEG_PATH: str = "ffmpeg"
+    FFPROBE_PATH: str = "ffprobe"
+    TRANSCODE_CONCURRENCY: int = 1
+
+    # Logging Settings
+    LOG_LEVEL: str = "INFO"
+    LOG_FORMAT: str = "json"  # "json" (one object per line) or "text"
+    LOG_QUEUE_SIZE: int = 10000  # Records beyond this are dropped rather than blocking a request
+    LOG_CHATTY_SAMPLE_RATE: float = 0.1  # Share of routine per-request messages that are kept
+
+    # Response Compression Settings
+    COMPRESSION_ENABLED: bool = True  # gzip (or brotli, if installed) for JSON responses
+    COMPRESSION_MIN_SIZE: int = 1024  # Smaller bodies go out as they are
+    COMPRESSION_GZIP_LEVEL: int = 6
+    COMPRESSION_BROTLI_QUALITY: int = 4
+
+    # Metrics Settings
+    METRICS_ENABLED: bool = True  # Serve Prometheus metrics at /metrics
+    METRICS_PUBLISH_INTERVAL_SECONDS: float = 5.0  # How often each worker shares its metrics with the others
+
+    # Tracing Settings
+    TRACING_ENABLED: bool = False  # Record per-request span trees
+    TRACE_LOG_PATH: str = "traces.jsonl"
+    TRACE_LOG_MAX_BYTES: int = 5 * 1024 * 1024  # Rotate the trace log beyond this size
+    TRACE_LOG_BACKUPS: int = 3
+    TRACE_MIN_DURATION_MS: float = 500.0  # Only log requests at least this slow
+    DEBUG_ROUTES_ENABLED: bool = False  # Serve recorded traces at /debug/traces
+    DEBUG_TOKEN: str = ""  # Required in the X-Debug-Token header; debug routes stay off without it
+
+    # Profiling Settings
+    PROFILING_ENABLED: bool = False  # Allow per-request stack sampling
+    PROFILE_HEADER: str = "X-Profile"  # Requests sending this header are profiled
+    PROFILE_TOKEN: str = ""  # When set, the header value must match it
+    PROFILE_SAMPLE_RATE: float = 0.0  # Share of all other requests to profile
+    PROFILE_INTERVAL_MS: float = 5.0
+    PROFILE_OUTPUT_DIR: str = "profiles"
+    PROFILE_MAX_FILES: int = 200  # Oldest profiles are deleted beyond this
 
     # Server Settings
     HOST: str = "0.0.0.0"
     PORT: int = 8000
+    STARTUP_TIME_BUDGET_MS: int = 1000  # Cold start target, reported by /health
+    RUN_PROFILE: str = "development"  # "development" (auto-reload) or "production"
+    WORKERS: int = 0  # Production worker processes; 0 uses one per CPU core
 
     class Config:
         env_file = ".env"
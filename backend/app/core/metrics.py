@@ -0,0 +1,335 @@
+import asyncio
+import bisect
+import json
+import logging
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from fastapi.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.core.store import DocumentStore, store
+from app.core.tracing import route_template, span
+
+logger = logging.getLogger(__name__)
+
+# Latency buckets in seconds, from fast cache hits up to slow model calls
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+LabelValues = Tuple[str, ...]
+
+
+class Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[LabelValues, Any] = {}
+
+    def _key(self, labels: Dict[str, Any]) -> LabelValues:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "kind": self.kind,
+            "help": self.help,
+            "labelnames": list(self.labelnames),
+            "values": [[list(key), value] for key, value in self._values.items()],
+        }
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels) -> None:
+        self.inc(-amount, **labels)
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        entry = self._values.get(key)
+        if entry is None:
+            # Per-bucket (not cumulative) counts, then sum and count
+            entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        entry[0][bisect.bisect_left(self.buckets, value)] += 1
+        entry[1] += value
+        entry[2] += 1
+
+    @contextmanager
+    def time(self, **labels) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def snapshot(self) -> Dict[str, Any]:
+        snapshot = super().snapshot()
+        snapshot["buckets"] = list(self.buckets)
+        return snapshot
+
+
+class MetricsRegistry:
+    """
+    In-process metrics rendered in the Prometheus text format.
+
+    Each worker process keeps its own values and periodically publishes a
+    snapshot to the shared store; /metrics merges the snapshots of all live
+    workers, so a scrape sees the whole server whichever worker answers it.
+    """
+
+    def __init__(self, store: DocumentStore, publish_interval: float):
+        self.store = store
+        self.publish_interval = publish_interval
+        self._metrics: Dict[str, Metric] = {}
+
+    def _register(self, metric: Metric) -> Any:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, help, labelnames))
+
+    def gauge(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, help, labelnames))
+
+    def histogram(self, name: str, help: str, labelnames: Sequence[str] = (), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help, labelnames, buckets))
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {name: metric.snapshot() for name, metric in self._metrics.items()}
+
+    # Sharing between worker processes
+
+    def initialize(self) -> None:
+        with self.store.transaction() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS metrics_snapshots (
+                    owner TEXT PRIMARY KEY,
+                    body TEXT NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            """)
+
+    def publish(self) -> None:
+        """Store this worker's snapshot and drop those of workers that stopped publishing"""
+        now = time.time()
+        with self.store.transaction() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO metrics_snapshots (owner, body, updated_at) VALUES (?, ?, ?)",
+                (self.store.owner, json.dumps(self.snapshot()), now)
+            )
+            conn.execute(
+                "DELETE FROM metrics_snapshots WHERE updated_at < ?", (now - self.publish_interval * 6,)
+            )
+
+    async def run(self) -> None:
+        """Publish periodically until cancelled, then withdraw this worker's snapshot"""
+        try:
+            while True:
+                await asyncio.sleep(self.publish_interval)
+                try:
+                    await run_in_threadpool(self.publish)
+                except Exception:
+                    logger.exception("Error publishing metrics")
+        finally:
+            await run_in_threadpool(self.withdraw)
+
+    def withdraw(self) -> None:
+        with self.store.transaction() as conn:
+            conn.execute("DELETE FROM metrics_snapshots WHERE owner = ?", (self.store.owner,))
+
+    def render(self) -> str:
+        """Prometheus text for all workers: this one live, the others as last published"""
+        snapshots = [self.snapshot()]
+        rows = self.store.connection().execute(
+            "SELECT body FROM metrics_snapshots WHERE owner != ? AND updated_at >= ?",
+            (self.store.owner, time.time() - self.publish_interval * 3)
+        ).fetchall()
+        snapshots.extend(json.loads(row[0]) for row in rows)
+        return render_snapshots(snapshots)
+
+
+def merge_snapshots(snapshots: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """Sum values with the same name and labels across snapshots"""
+    merged: Dict[str, Dict[str, Any]] = {}
+    for snapshot in snapshots:
+        for name, metric in snapshot.items():
+            target = merged.setdefault(name, {**metric, "values": {}})
+            for labels, value in metric["values"]:
+                key = tuple(labels)
+                current = target["values"].get(key)
+                if current is None:
+                    target["values"][key] = json.loads(json.dumps(value))
+                elif metric["kind"] == "histogram":
+                    current[0] = [a + b for a, b in zip(current[0], value[0])]
+                    current[1] += value[1]
+                    current[2] += value[2]
+                else:
+                    target["values"][key] = current + value
+    return merged
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render_snapshots(snapshots: List[Dict[str, Any]]) -> str:
+    merged = merge_snapshots(snapshots)
+    lines: List[str] = []
+    for name, metric in merged.items():
+        lines.append(f"# HELP {name} {metric['help']}")
+        lines.append(f"# TYPE {name} {metric['kind']}")
+        names = metric["labelnames"]
+        for key, value in sorted(metric["values"].items()):
+            if metric["kind"] == "histogram":
+                cumulative = 0
+                for bound, count in zip(metric["buckets"] + ["+Inf"], value[0]):
+                    cumulative += count
+                    le = bound if bound == "+Inf" else _number(float(bound))
+                    lines.append(f"{name}_bucket{_labels(names, key, ('le', le))} {cumulative}")
+                lines.append(f"{name}_sum{_labels(names, key)} {_number(value[1])}")
+                lines.append(f"{name}_count{_labels(names, key)} {value[2]}")
+            else:
+                lines.append(f"{name}{_labels(names, key)} {_number(value)}")
+
+    # Hit ratios, derived from the cache counters so they cover every worker
+    cache = merged.get("cache_requests_total")
+    if cache:
+        totals: Dict[str, List[float]] = {}
+        for (cache_name, result), value in cache["values"].items():
+            entry = totals.setdefault(cache_name, [0, 0])
+            entry[0 if result == "hit" else 1] += value
+        lines.append("# HELP cache_hit_ratio Share of cache lookups that were hits")
+        lines.append("# TYPE cache_hit_ratio gauge")
+        for cache_name, (hits, misses) in sorted(totals.items()):
+            ratio = hits / (hits + misses) if hits + misses else 0.0
+            lines.append(f"cache_hit_ratio{_labels(['cache'], [cache_name])} {_number(round(ratio, 4))}")
+    return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry(store, settings.METRICS_PUBLISH_INTERVAL_SECONDS)
+
+http_requests = registry.counter(
+    "http_requests_total", "HTTP requests handled", ["method", "route", "status"]
+)
+http_request_duration = registry.histogram(
+    "http_request_duration_seconds", "Time to handle an HTTP request", ["method", "route"]
+)
+http_requests_in_flight = registry.gauge(
+    "http_requests_in_flight", "HTTP requests currently being handled", ["method", "route"]
+)
+upstream_duration = registry.histogram(
+    "upstream_request_duration_seconds",
+    "Time spent in calls to upstream services (groq_chat, groq_whisper, pytube, transcript_api)",
+    ["upstream", "outcome"]
+)
+video_bytes_streamed = registry.counter(
+    "video_bytes_streamed_total", "Video bytes sent to clients", ["route"]
+)
+cache_requests = registry.counter(
+    "cache_requests_total", "Cache lookups by cache and result", ["cache", "result"]
+)
+admission_queue_depth = registry.gauge(
+    "admission_queue_depth", "Requests waiting for a slot on a concurrency-limited route", ["route"]
+)
+admission_rejections = registry.counter(
+    "admission_rejections_total",
+    "Requests turned away by admission control, by reason (queue_full, timeout, memory, too_large, length_required)",
+    ["route", "reason"]
+)
+groq_queue_wait = registry.histogram(
+    "groq_queue_wait_seconds", "Time Groq calls waited for rate-limit capacity", ["priority"]
+)
+groq_queue_depth = registry.gauge(
+    "groq_queue_depth", "Groq calls waiting for rate-limit capacity", ["priority"]
+)
+groq_rejections = registry.counter(
+    "groq_rejections_total", "Groq calls given up on, by reason (deadline, rate_limited)", ["priority", "reason"]
+)
+
+
+@contextmanager
+def track_upstream(upstream: str) -> Iterator[None]:
+    """Time a call to an upstream service, labelled with whether it raised; also traced as a span"""
+    start = time.perf_counter()
+    outcome = "error"
+    try:
+        with span(f"upstream.{upstream}"):
+            yield
+        outcome = "ok"
+    finally:
+        upstream_duration.observe(time.perf_counter() - start, upstream=upstream, outcome=outcome)
+
+
+def is_video_route(route: str) -> bool:
+    return route.startswith("/api/videos/stream/") or "/hls/" in route
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording request counts, latency, in-flight requests and video bytes"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        route = route_template(scope)
+        count_bytes = is_video_route(route)
+        status = 500
+
+        async def send_with_metrics(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif count_bytes and message["type"] == "http.response.body":
+                video_bytes_streamed.inc(len(message.get("body", b"")), route=route)
+            await send(message)
+
+        http_requests_in_flight.inc(method=method, route=route)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_metrics)
+        finally:
+            http_requests_in_flight.dec(method=method, route=route)
+            http_request_duration.observe(time.perf_counter() - start, method=method, route=route)
+            http_requests.inc(method=method, route=route, status=str(status))
@@ -0,0 +1,157 @@
+import logging
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from fastapi.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.core.tracing import route_template
+
+logger = logging.getLogger(__name__)
+
+APP_DIR = Path(__file__).resolve().parent.parent
+
+# Samples taken while the profiled request was suspended (awaiting I/O or
+# waiting its turn on the event loop)
+NOT_RUNNING = "[not running]"
+
+
+class RequestProfile:
+    """Stack samples for one request, keyed by collapsed stack"""
+
+    def __init__(self, frame, thread_id: int):
+        self.frame = frame
+        self.thread_id = thread_id
+        self.stacks: Counter = Counter()
+
+
+class StackSampler:
+    """
+    Statistical profiler for individual requests.
+
+    A single background thread wakes every `interval` seconds while any
+    profile is active and reads the event loop thread's current stack. A
+    sample is credited to a request only if that request's middleware frame
+    is on the stack, so concurrent requests don't pollute each other's
+    profiles. Work a request hands to the thread pool or to tasks it
+    spawns (such as a streaming response body) counts as not running.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._profiles: List[RequestProfile] = []
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._labels: Dict[object, str] = {}
+
+    def start(self, profile: RequestProfile) -> None:
+        with self._lock:
+            self._profiles.append(profile)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+                self._thread.start()
+
+    def stop(self, profile: RequestProfile) -> None:
+        with self._lock:
+            self._profiles.remove(profile)
+
+    def _run(self) -> None:
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                if not self._profiles:
+                    self._thread = None
+                    return
+                profiles = list(self._profiles)
+            frames = sys._current_frames()
+            for profile in profiles:
+                stack = self._collapse(frames.get(profile.thread_id), profile.frame)
+                profile.stacks[stack or NOT_RUNNING] += 1
+
+    def _collapse(self, frame, stop) -> Optional[str]:
+        """Semicolon-joined labels from just below `stop` out to the leaf, or None if `stop` isn't on the stack"""
+        labels = []
+        while frame is not None and frame is not stop:
+            labels.append(self._label(frame.f_code))
+            frame = frame.f_back
+        if frame is None:
+            return None
+        labels.reverse()
+        return ";".join(labels)
+
+    def _label(self, code) -> str:
+        label = self._labels.get(code)
+        if label is None:
+            path = Path(code.co_filename)
+            try:
+                name = str(path.resolve().relative_to(APP_DIR.parent))
+            except ValueError:
+                name = path.name
+            label = self._labels[code] = f"{code.co_name} ({name}:{code.co_firstlineno})"
+        return label
+
+
+def write_profile(directory: Path, name: str, stacks: Counter, max_files: int) -> Path:
+    """Write collapsed stacks (flamegraph.pl / speedscope input) and prune the oldest profiles"""
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / f"{name}.folded"
+    path.write_text("".join(f"{stack} {count}\n" for stack, count in stacks.most_common()), encoding="utf-8")
+
+    profiles = sorted(directory.glob("*.folded"), key=lambda p: p.stat().st_mtime)
+    for old in profiles[:max(0, len(profiles) - max_files)]:
+        old.unlink(missing_ok=True)
+    return path
+
+
+def wants_profile(scope) -> bool:
+    """Profile when the request asks via the header (with the token, if one is set), or by sampling"""
+    header = settings.PROFILE_HEADER.lower().encode()
+    for key, value in scope.get("headers", []):
+        if key == header:
+            return not settings.PROFILE_TOKEN or value.decode("latin-1") == settings.PROFILE_TOKEN
+    return settings.PROFILE_SAMPLE_RATE > 0 and random.random() < settings.PROFILE_SAMPLE_RATE
+
+
+sampler = StackSampler(settings.PROFILE_INTERVAL_MS / 1000)
+
+
+class ProfilingMiddleware:
+    """ASGI middleware that samples the stacks of selected requests and saves a flame graph profile"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not wants_profile(scope):
+            await self.app(scope, receive, send)
+            return
+
+        route = route_template(scope)
+        slug = re.sub(r"[^A-Za-z0-9]+", "-", route).strip("-") or "root"
+        name = f"{time.strftime('%Y%m%d-%H%M%S')}-{scope['method'].lower()}-{slug}-{uuid.uuid4().hex[:8]}"
+
+        async def send_with_profile_id(message):
+            if message["type"] == "http.response.start":
+                message = {**message, "headers": [*message.get("headers", []), (b"x-profile-id", name.encode())]}
+            await send(message)
+
+        profile = RequestProfile(sys._getframe(), threading.get_ident())
+        sampler.start(profile)
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            sampler.stop(profile)
+            if profile.stacks:
+                try:
+                    await run_in_threadpool(
+                        write_profile, Path(settings.PROFILE_OUTPUT_DIR), name, profile.stacks, settings.PROFILE_MAX_FILES
+                    )
+                except Exception:
+                    logger.exception("Error writing profile %s", name)
@@ -0,0 +1,109 @@
+import hashlib
+import inspect
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Tuple
+
+from fastapi import Request
+from fastapi.responses import Response
+
+from app.core.compression import compress_async, negotiate_encoding
+from app.core.config import settings
+from app.core.metrics import cache_requests
+from app.core.responses import dumps
+
+
+class ResponseCache:
+    """
+    Cache of pre-encoded JSON response bodies for read-heavy endpoints.
+
+    Entries are grouped into namespaces (e.g. "videos", "prescriptions") that
+    each carry a version counter. Mutating handlers bump the namespace version,
+    which invalidates every cached body in it; until then, repeated requests
+    reuse the encoded bytes and clients holding the current ETag get a 304.
+    Compressed bodies are kept alongside, so each encoding is compressed once
+    per version rather than on every request.
+    A namespace can instead track a version owned elsewhere (such as a shared
+    store collection), so changes made by other worker processes count too.
+
+    ETags are built from the shared version and a hash of the body only, never
+    the worker-local counter, so every worker gives identical content the
+    same ETag and revalidation works whichever worker a client reaches.
+    """
+
+    def __init__(self, max_entries: int = 512):
+        self.max_entries = max_entries
+        self._versions: Dict[str, int] = {}
+        self._sources: Dict[str, Callable[[], int]] = {}
+        self._entries: "OrderedDict[Tuple[str, str, str], Tuple[int, bytes, str, Dict[str, bytes]]]" = OrderedDict()
+
+    def track(self, namespace: str, source: Callable[[], int]) -> None:
+        """Derive a namespace's version from an external counter"""
+        self._sources[namespace] = source
+
+    def shared_version(self, namespace: str) -> int:
+        """Version of the external counter a namespace tracks, the same in every worker"""
+        source = self._sources.get(namespace)
+        return source() if source else 0
+
+    def version(self, namespace: str) -> int:
+        """Current version of a namespace"""
+        return self._versions.get(namespace, 0) + self.shared_version(namespace)
+
+    def bump(self, namespace: str) -> None:
+        """Invalidate all cached responses in a namespace"""
+        self._versions[namespace] = self._versions.get(namespace, 0) + 1
+
+    async def respond(self, request: Request, namespace: str, build: Callable[[], Any]) -> Response:
+        """
+        Serve a JSON response for the request from cache, building and
+        encoding it with `build` only when the namespace has changed
+        """
+        shared_version = self.shared_version(namespace)
+        version = self._versions.get(namespace, 0) + shared_version
+        key = (namespace, request.url.path, str(request.query_params))
+
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] == version:
+            self._entries.move_to_end(key)
+            cache_requests.inc(cache="response", result="hit")
+        else:
+            cache_requests.inc(cache="response", result="miss")
+            content = build()
+            if inspect.isawaitable(content):
+                content = await content
+            body = dumps(content)
+            etag = f'"{namespace}-{shared_version}-{hashlib.sha256(body).hexdigest()[:16]}"'
+            entry = (version, body, etag, {})
+            self._entries[key] = entry
+            if len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+        _, body, etag, compressed = entry
+        headers = {"ETag": etag, "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+        if etag_matches(request, etag):
+            return Response(status_code=304, headers=headers)
+
+        encoding = None
+        if settings.COMPRESSION_ENABLED and len(body) >= settings.COMPRESSION_MIN_SIZE:
+            encoding = negotiate_encoding(request.headers.get("accept-encoding"))
+        if encoding is not None:
+            if encoding not in compressed:
+                compressed[encoding] = await compress_async(body, encoding)
+            body = compressed[encoding]
+            headers["Content-Encoding"] = encoding
+            headers["ETag"] = f"W/{etag}"
+        return Response(content=body, media_type="application/json", headers=headers)
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Check a request's If-None-Match header against an ETag"""
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return etag in candidates or f"W/{etag}" in candidates
+
+
+response_cache = ResponseCache()
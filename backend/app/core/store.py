@@ -0,0 +1,458 @@
+import asyncio
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from app.core.config import settings
+
+
+FIELD_NAME = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+# How long to wait for another worker's write lock. Writes belong on worker
+# threads, where waiting is harmless; on the event loop's thread a wait
+# stalls every request, so a stray write there gives up much sooner.
+BUSY_TIMEOUT_MS = 30000
+EVENT_LOOP_BUSY_TIMEOUT_MS = 1000
+
+
+def on_event_loop() -> bool:
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
+
+
+def field_expression(field: str) -> str:
+    """SQL expression for a top-level JSON field of a document body"""
+    if not FIELD_NAME.match(field):
+        raise ValueError(f"Invalid field name: {field}")
+    return f"json_extract(body, '$.{field}')"
+
+
+WriteHook = Callable[[sqlite3.Connection, str, Optional[Dict[str, Any]], Optional[Dict[str, Any]]], None]
+
+
+class DocumentStore:
+    """
+    SQLite-backed JSON document store shared by every worker process.
+
+    Documents are grouped into collections ("videos", "prescriptions") and
+    every write bumps the collection's version inside the same transaction.
+    Workers compare that version against the one their in-process caches were
+    built from, which is how a change made by one worker invalidates the
+    caches of all the others. Write hooks see each document before and after
+    a change and run inside the same transaction, so derived tables (such as
+    counters) can never drift from the documents.
+
+    Every document change is also appended to a change log with a store-wide,
+    monotonically increasing sequence number, so clients can ask for what
+    changed since the last sequence they saw instead of re-reading everything.
+    """
+
+    def __init__(self, path: Path, change_retention: int = 10000):
+        self.path = path
+        self.change_retention = change_retention
+        self.owner = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._local = threading.local()
+        self._write_hooks: List[WriteHook] = []
+
+    def add_write_hook(self, hook: "WriteHook") -> None:
+        """Register hook(conn, collection, before, after), called for every document write"""
+        if hook not in self._write_hooks:
+            self._write_hooks.append(hook)
+
+    def connection(self) -> sqlite3.Connection:
+        """Per-thread connection, opened on first use"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            busy_timeout_ms = EVENT_LOOP_BUSY_TIMEOUT_MS if on_event_loop() else BUSY_TIMEOUT_MS
+            conn = sqlite3.connect(
+                self.path, timeout=busy_timeout_ms / 1000, isolation_level=None, check_same_thread=False
+            )
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(f"PRAGMA busy_timeout={busy_timeout_ms}")
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        """Write transaction that takes the database lock up front"""
+        conn = self.connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        else:
+            conn.execute("COMMIT")
+
+    def initialize(self) -> None:
+        """Create tables; safe to run concurrently from every worker"""
+        with self.transaction() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS documents (
+                    collection TEXT NOT NULL,
+                    id TEXT NOT NULL,
+                    position INTEGER NOT NULL,
+                    body TEXT NOT NULL,
+                    PRIMARY KEY (collection, id)
+                )
+            """)
+            conn.execute("""
+                CREATE INDEX IF NOT EXISTS documents_position
+                ON documents (collection, position)
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS collection_versions (
+                    collection TEXT PRIMARY KEY,
+                    version INTEGER NOT NULL
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS leases (
+                    name TEXT PRIMARY KEY,
+                    owner TEXT NOT NULL,
+                    expires_at REAL NOT NULL
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS changes (
+                    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                    collection TEXT NOT NULL,
+                    id TEXT NOT NULL,
+                    kind TEXT NOT NULL,
+                    fields TEXT NOT NULL,
+                    changed_at REAL NOT NULL
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS store_meta (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL
+                )
+            """)
+
+    # Reads
+
+    def version(self, collection: str) -> int:
+        """Current version of a collection; changes on every write to it"""
+        row = self.connection().execute(
+            "SELECT version FROM collection_versions WHERE collection = ?", (collection,)
+        ).fetchone()
+        return row[0] if row else 0
+
+    def all(self, collection: str) -> List[Dict[str, Any]]:
+        """All documents in a collection, in insertion order"""
+        rows = self.connection().execute(
+            "SELECT body FROM documents WHERE collection = ? ORDER BY position", (collection,)
+        ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def get(self, collection: str, doc_id: str) -> Optional[Dict[str, Any]]:
+        row = self.connection().execute(
+            "SELECT body FROM documents WHERE collection = ? AND id = ?", (collection, doc_id)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def find(
+        self,
+        collection: str,
+        where: Optional[Dict[str, Any]] = None,
+        order_by: str = "created_at",
+        descending: bool = False,
+        limit: Optional[int] = None,
+        after: Optional[Tuple[Any, str]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Documents matching `where` (field equality), sorted by a field and then
+        id. `after` is the (field value, id) of the last document of a previous
+        page; with an index from create_index this is a range scan, not a sort.
+        """
+        order = field_expression(order_by)
+        clauses = ["collection = ?"]
+        params: List[Any] = [collection]
+        for field, value in (where or {}).items():
+            clauses.append(f"{field_expression(field)} IS ?")
+            params.append(value)
+        if after is not None:
+            clauses.append(f"({order}, id) {'<' if descending else '>'} (?, ?)")
+            params.extend(after)
+
+        direction = "DESC" if descending else "ASC"
+        sql = (
+            f"SELECT body FROM documents WHERE {' AND '.join(clauses)} "
+            f"ORDER BY {order} {direction}, id {direction}"
+        )
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return [json.loads(row[0]) for row in self.connection().execute(sql, params).fetchall()]
+
+    # Change log
+
+    def sequence(self) -> int:
+        """Sequence number of the latest change to any collection"""
+        row = self.connection().execute("SELECT MAX(seq) FROM changes").fetchone()
+        return row[0] or 0
+
+    def oldest_sequence(self) -> Optional[int]:
+        """Sequence number of the oldest change still in the log"""
+        return self.connection().execute("SELECT MIN(seq) FROM changes").fetchone()[0]
+
+    def changes_since(self, since: int, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Change log entries after `since`, oldest first"""
+        sql = "SELECT seq, collection, id, kind, fields, changed_at FROM changes WHERE seq > ? ORDER BY seq"
+        params: List[Any] = [since]
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return [
+            {"seq": seq, "collection": collection, "id": doc_id, "kind": kind,
+             "fields": json.loads(fields), "changed_at": changed_at}
+            for seq, collection, doc_id, kind, fields, changed_at in self.connection().execute(sql, params)
+        ]
+
+    def delta(self, collection: str, since: int) -> Dict[str, Any]:
+        """
+        Documents of a collection changed or deleted after sequence `since`.
+        `reset` is set when the change log no longer reaches back that far, in
+        which case `changed` holds the whole collection.
+        """
+        conn = self.connection()
+        # One read snapshot, so the sequence matches the documents returned
+        conn.execute("BEGIN")
+        try:
+            seq = conn.execute("SELECT MAX(seq) FROM changes").fetchone()[0] or 0
+            oldest = conn.execute("SELECT MIN(seq) FROM changes").fetchone()[0]
+            if since > seq or (oldest is not None and since < oldest - 1):
+                return {"seq": seq, "reset": True, "changed": self.all(collection), "deleted": []}
+
+            latest: Dict[str, str] = {}
+            for doc_id, kind in conn.execute(
+                "SELECT id, kind FROM changes WHERE seq > ? AND collection = ? ORDER BY seq",
+                (since, collection)
+            ):
+                latest[doc_id] = kind
+
+            changed, deleted = [], []
+            for doc_id, kind in latest.items():
+                doc = self.get(collection, doc_id) if kind != "deleted" else None
+                if doc is None:
+                    deleted.append(doc_id)
+                else:
+                    changed.append(doc)
+            return {"seq": seq, "reset": False, "changed": changed, "deleted": deleted}
+        finally:
+            conn.execute("COMMIT")
+
+    # Indexes
+
+    def create_index(self, collection: str, fields: Sequence[str]) -> None:
+        """Index a collection's documents by JSON fields, for find()"""
+        if not FIELD_NAME.match(collection):
+            raise ValueError(f"Invalid collection name: {collection}")
+        name = "documents_" + "_".join([collection, *fields])
+        columns = ", ".join(field_expression(field) for field in fields)
+        with self.transaction() as conn:
+            conn.execute(f"CREATE INDEX IF NOT EXISTS {name} ON documents (collection, {columns}, id)")
+
+    # Writes
+
+    def put(self, collection: str, doc: Dict[str, Any]) -> Dict[str, Any]:
+        """Insert or replace a document"""
+        self.put_many(collection, [doc])
+        return doc
+
+    def put_many(self, collection: str, docs: Iterable[Dict[str, Any]]) -> None:
+        """Insert or replace several documents in one transaction"""
+        with self.transaction() as conn:
+            self._put(conn, collection, docs)
+            self._bump(conn, collection)
+
+    def update(
+        self,
+        collection: str,
+        doc_id: str,
+        mutate: Callable[[Dict[str, Any]], None]
+    ) -> Optional[Dict[str, Any]]:
+        """Atomically read, mutate in place and write back one document"""
+        updated = self.update_many(collection, [doc_id], mutate)
+        return updated[0] if updated else None
+
+    def update_many(
+        self,
+        collection: str,
+        doc_ids: Iterable[str],
+        mutate: Callable[[Dict[str, Any]], None]
+    ) -> List[Dict[str, Any]]:
+        """Atomically apply `mutate` to each existing document in `doc_ids`"""
+        updated = []
+        with self.transaction() as conn:
+            for doc_id in doc_ids:
+                row = conn.execute(
+                    "SELECT body FROM documents WHERE collection = ? AND id = ?", (collection, doc_id)
+                ).fetchone()
+                if row is None:
+                    continue
+                doc = json.loads(row[0])
+                mutate(doc)
+                conn.execute(
+                    "UPDATE documents SET body = ? WHERE collection = ? AND id = ?",
+                    (json.dumps(doc, default=str), collection, doc_id)
+                )
+                self._changed(conn, collection, json.loads(row[0]), doc)
+                updated.append(doc)
+            if updated:
+                self._bump(conn, collection)
+        return updated
+
+    def delete_many(self, collection: str, doc_ids: Iterable[str]) -> int:
+        doc_ids = list(doc_ids)
+        with self.transaction() as conn:
+            deleted = 0
+            for doc_id in doc_ids:
+                row = conn.execute(
+                    "SELECT body FROM documents WHERE collection = ? AND id = ?", (collection, doc_id)
+                ).fetchone()
+                if row is None:
+                    continue
+                conn.execute("DELETE FROM documents WHERE collection = ? AND id = ?", (collection, doc_id))
+                self._changed(conn, collection, json.loads(row[0]), None)
+                deleted += 1
+            if deleted:
+                self._bump(conn, collection)
+        return deleted
+
+    def import_once(self, collection: str, load: Callable[[], List[Dict[str, Any]]]) -> int:
+        """
+        Seed a collection from legacy storage exactly once across all workers.
+        Returns the number of documents imported.
+        """
+        marker = f"imported:{collection}"
+        with self.transaction() as conn:
+            if conn.execute("SELECT 1 FROM store_meta WHERE key = ?", (marker,)).fetchone():
+                return 0
+            docs = load()
+            self._put(conn, collection, docs)
+            conn.execute("INSERT INTO store_meta (key, value) VALUES (?, ?)", (marker, str(time.time())))
+            if docs:
+                self._bump(conn, collection)
+            return len(docs)
+
+    def _put(self, conn: sqlite3.Connection, collection: str, docs: Iterable[Dict[str, Any]]) -> None:
+        position = conn.execute(
+            "SELECT COALESCE(MAX(position), 0) FROM documents WHERE collection = ?", (collection,)
+        ).fetchone()[0]
+        for doc in docs:
+            existing = conn.execute(
+                "SELECT position, body FROM documents WHERE collection = ? AND id = ?", (collection, doc["id"])
+            ).fetchone()
+            if existing:
+                doc_position = existing[0]
+            else:
+                position += 1
+                doc_position = position
+            conn.execute(
+                "INSERT OR REPLACE INTO documents (collection, id, position, body) VALUES (?, ?, ?, ?)",
+                (collection, doc["id"], doc_position, json.dumps(doc, default=str))
+            )
+            self._changed(conn, collection, json.loads(existing[1]) if existing else None, doc)
+
+    def _changed(
+        self,
+        conn: sqlite3.Connection,
+        collection: str,
+        before: Optional[Dict[str, Any]],
+        after: Optional[Dict[str, Any]]
+    ) -> None:
+        """Log a document change and run the write hooks for it"""
+        if before is None:
+            kind, fields = "created", []
+        elif after is None:
+            kind, fields = "deleted", []
+        else:
+            kind = "updated"
+            fields = sorted(key for key in before.keys() | after.keys() if before.get(key) != after.get(key))
+            if not fields:
+                return
+
+        doc_id = (after or before)["id"]
+        seq = conn.execute(
+            "INSERT INTO changes (collection, id, kind, fields, changed_at) VALUES (?, ?, ?, ?, ?)",
+            (collection, doc_id, kind, json.dumps(fields), time.time())
+        ).lastrowid
+        # Trim the log now and then rather than on every write
+        if seq % 256 == 0:
+            conn.execute("DELETE FROM changes WHERE seq <= ?", (seq - self.change_retention,))
+
+        for hook in self._write_hooks:
+            hook(conn, collection, before, after)
+
+    def _bump(self, conn: sqlite3.Connection, collection: str) -> None:
+        conn.execute("""
+            INSERT INTO collection_versions (collection, version) VALUES (?, 1)
+            ON CONFLICT (collection) DO UPDATE SET version = version + 1
+        """, (collection,))
+
+    # Leases, so only one worker runs a given background job
+
+    def acquire_lease(self, name: str, ttl_seconds: float) -> bool:
+        """Take (or renew) a named lease unless another live worker holds it"""
+        now = time.time()
+        with self.transaction() as conn:
+            row = conn.execute("SELECT owner, expires_at FROM leases WHERE name = ?", (name,)).fetchone()
+            if row and row[0] != self.owner and row[1] > now:
+                return False
+            conn.execute(
+                "INSERT OR REPLACE INTO leases (name, owner, expires_at) VALUES (?, ?, ?)",
+                (name, self.owner, now + ttl_seconds)
+            )
+            return True
+
+    def release_lease(self, name: str) -> None:
+        with self.transaction() as conn:
+            conn.execute("DELETE FROM leases WHERE name = ? AND owner = ?", (name, self.owner))
+
+
+class CachedCollection:
+    """
+    In-process snapshot of a store collection.
+
+    Reads are served from memory and the snapshot is rebuilt only when the
+    collection version in the store moves, whichever worker changed it.
+    """
+
+    def __init__(self, store: DocumentStore, collection: str):
+        self.store = store
+        self.collection = collection
+        self._version = -1
+        self._items: List[Dict[str, Any]] = []
+        self._by_id: Dict[str, Dict[str, Any]] = {}
+
+    def _refresh(self) -> None:
+        version = self.store.version(self.collection)
+        if version != self._version:
+            self._items = self.store.all(self.collection)
+            self._by_id = {item["id"]: item for item in self._items}
+            self._version = version
+
+    def items(self) -> List[Dict[str, Any]]:
+        self._refresh()
+        return self._items
+
+    def get(self, doc_id: str) -> Optional[Dict[str, Any]]:
+        self._refresh()
+        return self._by_id.get(doc_id)
+
+
+store = DocumentStore(Path(settings.DATABASE_PATH), settings.CHANGE_LOG_RETENTION)
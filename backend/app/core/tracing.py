@@ -0,0 +1,266 @@
+import asyncio
+import functools
+import json
+import logging
+import os
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+from app.core.config import settings
+from app.core.log import request_id_var
+
+logger = logging.getLogger(__name__)
+
+# Long-lived or self-referential routes that would crowd out the slow requests worth looking at
+UNTRACED_ROUTES = {"/metrics", "/debug/traces", "/api/events/stream"}
+
+
+class Span:
+    """A timed phase of a request; child spans nest under the one active when they start"""
+
+    def __init__(self, name: str, attributes: Optional[Dict[str, Any]] = None, start: Optional[float] = None):
+        self.name = name
+        self.attributes = attributes or {}
+        self.start = time.perf_counter() if start is None else start
+        self.end: Optional[float] = None
+        self.error: Optional[str] = None
+        self.children: List["Span"] = []
+
+    def finish(self, end: Optional[float] = None) -> None:
+        self.end = time.perf_counter() if end is None else end
+
+    def to_dict(self, origin: float) -> Dict[str, Any]:
+        """Offsets and durations in milliseconds, relative to the root span's start"""
+        end = self.end if self.end is not None else time.perf_counter()
+        node: Dict[str, Any] = {
+            "name": self.name,
+            "offset_ms": round((self.start - origin) * 1000, 3),
+            "duration_ms": round((end - self.start) * 1000, 3),
+        }
+        if self.attributes:
+            node["attributes"] = self.attributes
+        if self.error:
+            node["error"] = self.error
+        if self.children:
+            node["spans"] = [child.to_dict(origin) for child in sorted(self.children, key=lambda s: s.start)]
+        return node
+
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+@contextmanager
+def span(name: str, **attributes) -> Iterator[Optional[Span]]:
+    """
+    Time a block as a child of the active span. Outside a traced request
+    this does nothing, so services can be instrumented unconditionally.
+    Don't hold a span open across a generator's yield: the consumer may
+    resume it in another context.
+    """
+    parent = _current_span.get()
+    if parent is None:
+        yield None
+        return
+    child = Span(name, attributes)
+    parent.children.append(child)
+    token = _current_span.set(child)
+    try:
+        yield child
+    except BaseException as e:
+        child.error = type(e).__name__
+        raise
+    finally:
+        child.finish()
+        _current_span.reset(token)
+
+
+def traced_endpoint(call):
+    """Wrap an endpoint so its own run shows up as a "handler" span"""
+    if asyncio.iscoroutinefunction(call):
+        @functools.wraps(call)
+        async def wrapper(*args, **kwargs):
+            with span("handler"):
+                return await call(*args, **kwargs)
+    else:
+        @functools.wraps(call)
+        def wrapper(*args, **kwargs):
+            with span("handler"):
+                return call(*args, **kwargs)
+    return wrapper
+
+
+def instrument_routes(app) -> None:
+    """
+    Give every API route a handler span. The time before it is request
+    parsing and validation; the time after it, up to the response start,
+    is response serialization.
+    """
+    from fastapi.routing import APIRoute
+
+    for route in app.routes:
+        if isinstance(route, APIRoute) and not getattr(route.dependant.call, "__wrapped__", None):
+            route.dependant.call = traced_endpoint(route.dependant.call)
+
+
+def route_template(scope) -> str:
+    """The matched route's path template, so ids don't each become their own series"""
+    from starlette.routing import Match
+
+    app = scope.get("app")
+    for route in getattr(getattr(app, "router", None), "routes", []):
+        match, _ = route.matches(scope)
+        if match != Match.NONE:
+            return getattr(route, "path", scope["path"])
+    return "unmatched"
+
+
+class TraceLog:
+    """
+    Finished traces, one JSON object per line, in a size-rotated file.
+
+    Writes go through a single background thread so requests never wait on
+    disk. Every worker appends to the same file, which makes the debug view
+    cover the whole server; a rotation racing with another worker's write
+    only lands that line in the previous file.
+    """
+
+    def __init__(self, path: Path, max_bytes: int, backups: int):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="trace-log")
+
+    def record(self, trace: Dict[str, Any]) -> None:
+        self._executor.submit(self._write, json.dumps(trace, default=str) + "\n")
+
+    def _write(self, line: str) -> None:
+        try:
+            with open(self.path, "a", encoding="utf-8") as file:
+                file.write(line)
+                size = file.tell()
+            if size > self.max_bytes:
+                self._rotate()
+        except Exception:
+            logger.exception("Error writing trace")
+
+    def _rotate(self) -> None:
+        for index in range(self.backups - 1, 0, -1):
+            source = self.path.with_name(f"{self.path.name}.{index}")
+            if source.exists():
+                os.replace(source, self.path.with_name(f"{self.path.name}.{index + 1}"))
+        try:
+            if self.backups > 0:
+                os.replace(self.path, self.path.with_name(f"{self.path.name}.1"))
+            else:
+                os.remove(self.path)
+        except FileNotFoundError:
+            # Another worker rotated it first
+            pass
+
+    def flush(self) -> None:
+        """Wait for queued writes to reach the file"""
+        self._executor.submit(lambda: None).result()
+
+    def slowest(self, limit: int, route: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        The slowest traces in the current and most recently rotated file,
+        optionally for one route
+        """
+        traces = []
+        for path in (self.path, self.path.with_name(f"{self.path.name}.1")):
+            try:
+                with open(path, "r", encoding="utf-8") as file:
+                    for line in file:
+                        try:
+                            trace = json.loads(line)
+                        except ValueError:
+                            continue
+                        if route is None or trace.get("route") == route:
+                            traces.append(trace)
+            except FileNotFoundError:
+                continue
+        traces.sort(key=lambda trace: trace["duration_ms"], reverse=True)
+        return traces[:limit]
+
+
+trace_log = TraceLog(Path(settings.TRACE_LOG_PATH), settings.TRACE_LOG_MAX_BYTES, settings.TRACE_LOG_BACKUPS)
+
+
+def render_tree(node: Dict[str, Any], depth: int = 0) -> List[str]:
+    """Indented text lines for a span tree"""
+    line = f"{'  ' * depth}{node['name']}  {node['duration_ms']:.1f} ms  (+{node['offset_ms']:.1f})"
+    if node.get("error"):
+        line += f"  ! {node['error']}"
+    lines = [line]
+    for child in node.get("spans", []):
+        lines.extend(render_tree(child, depth + 1))
+    return lines
+
+
+class TracingMiddleware:
+    """ASGI middleware that opens a root span per request and logs the finished trace"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        route = route_template(scope)
+        if route in UNTRACED_ROUTES:
+            await self.app(scope, receive, send)
+            return
+
+        trace_id = request_id_var.get() or uuid.uuid4().hex[:16]
+        root = Span(f"{scope['method']} {route}", {"path": scope["path"]})
+        started_at = time.time()
+        response_started: Optional[float] = None
+        status = 500
+
+        async def send_with_trace(message):
+            nonlocal response_started, status
+            if message["type"] == "http.response.start":
+                response_started = time.perf_counter()
+                status = message["status"]
+                message = {**message, "headers": [*message.get("headers", []), (b"x-trace-id", trace_id.encode())]}
+            await send(message)
+
+        token = _current_span.set(root)
+        try:
+            await self.app(scope, receive, send_with_trace)
+        except BaseException as e:
+            root.error = type(e).__name__
+            raise
+        finally:
+            _current_span.reset(token)
+            root.finish()
+            self.add_framework_spans(root, response_started)
+            duration_ms = (root.end - root.start) * 1000
+            if duration_ms >= settings.TRACE_MIN_DURATION_MS:
+                trace_log.record({
+                    "trace_id": trace_id,
+                    "started_at": started_at,
+                    "method": scope["method"],
+                    "route": route,
+                    "status": status,
+                    "duration_ms": round(duration_ms, 3),
+                    "root": root.to_dict(root.start),
+                })
+
+    @staticmethod
+    def add_framework_spans(root: Span, response_started: Optional[float]) -> None:
+        """Derive parsing/validation and serialization spans around the handler span"""
+        handler = next((child for child in root.children if child.name == "handler"), None)
+        if handler is None or handler.end is None:
+            return
+        root.children.append(Span("parse_and_validate", start=root.start))
+        root.children[-1].finish(handler.start)
+        if response_started is not None and response_started > handler.end:
+            root.children.append(Span("serialize", start=handler.end))
+            root.children[-1].finish(response_started)
@@ -1,14 +1,82 @@
+import time
+
+# Measured from here so cold start includes router imports as well as startup
+_started_at = time.perf_counter()
+
+import asyncio
+import logging
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from app.api.routes import chat, diagnostics, youtube, transcribe, videos, prescription
+from fastapi.responses import PlainTextResponse
+from app.api.routes import chat, diagnostics, youtube, transcribe, videos, prescription, dashboard, events, debug
+from app.core.admission import AdmissionMiddleware
+from app.core.compression import CompressionMiddleware
 from app.core.config import settings
+from app.core.log import configure_logging, shutdown_logging, RequestIdMiddleware
+from app.core.metrics import registry as metrics_registry, MetricsMiddleware
+from app.core.profiling import ProfilingMiddleware
+from app.core.responses import FastJSONResponse
+from app.core.store import store
+from app.core.tracing import trace_log, instrument_routes, TracingMiddleware
+from app.services.engagement_service import engagement_aggregates
+
+logger = logging.getLogger(__name__)
+
+startup_ms: float = 0.0
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Run startup work once the event loop is up instead of at import time.
+    Slow reconciliation runs as background tasks, so the app accepts traffic
+    as soon as metadata has been loaded.
+    """
+    global startup_ms
+    configure_logging()
+    if settings.TRACING_ENABLED:
+        # Every route is registered by now
+        instrument_routes(app)
+    # Off the event loop: other workers may hold the database lock while they start too
+    await run_in_threadpool(store.initialize)
+    await run_in_threadpool(engagement_aggregates.initialize)
+    await run_in_threadpool(metrics_registry.initialize)
+    metrics_task = asyncio.create_task(metrics_registry.run())
+    await prescription.startup()
+    await videos.startup()
+    await events.startup()
+
+    startup_ms = round((time.perf_counter() - _started_at) * 1000, 1)
+    if startup_ms > settings.STARTUP_TIME_BUDGET_MS:
+        logger.warning(
+            "Startup took %s ms, over the %s ms budget", startup_ms, settings.STARTUP_TIME_BUDGET_MS,
+            extra={"startup_ms": startup_ms}
+        )
+    else:
+        logger.info("Startup completed in %s ms", startup_ms, extra={"startup_ms": startup_ms})
+
+    yield
+
+    await events.shutdown()
+    await videos.shutdown()
+    metrics_task.cancel()
+    await asyncio.gather(metrics_task, return_exceptions=True)
+    trace_log.flush()
+    shutdown_logging()
 
 app = FastAPI(
     title="HealthHack API",
     description="Backend API for Alzheimer's detection and patient care system",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse
 )
 
+# Innermost, so shed requests cost as little as possible but still get CORS headers and metrics
+if settings.ADMISSION_ENABLED:
+    app.add_middleware(AdmissionMiddleware)
+
 # Configure CORS - Allow all origins
 app.add_middleware(
     CORSMiddleware,
@@ -18,6 +86,21 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+if settings.COMPRESSION_ENABLED:
+    app.add_middleware(CompressionMiddleware)
+
+# Innermost of the instrumentation, so profiles show the app rather than the other middleware
+if settings.PROFILING_ENABLED:
+    app.add_middleware(ProfilingMiddleware)
+
+# Outermost, so timings cover the whole middleware stack
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+if settings.TRACING_ENABLED:
+    app.add_middleware(TracingMiddleware)
+# Outside tracing too, so traces share the request's id
+app.add_middleware(RequestIdMiddleware)
+
 # Include routers
 app.include_router(chat.router, prefix="/api/chat", tags=["chat"])
 app.include_router(diagnostics.router, prefix="/api/diagnostics", tags=["diagnostics"])
@@ -25,6 +108,14 @@ app.include_router(youtube.router, prefix="/api/youtube", tags=["youtube"])
 app.include_router(transcribe.router, prefix="/api/transcribe", tags=["transcribe"])
 app.include_router(videos.router, prefix="/api/videos", tags=["videos"])
 app.include_router(prescription.router, prefix="/api/prescription", tags=["prescription"])
+app.include_router(dashboard.router, prefix="/api/dashboard", tags=["dashboard"])
+app.include_router(events.router, prefix="/api/events", tags=["events"])
+
+if settings.TRACING_ENABLED and settings.DEBUG_ROUTES_ENABLED:
+    if settings.DEBUG_TOKEN:
+        app.include_router(debug.router, prefix="/debug", tags=["debug"])
+    else:
+        logger.warning("Debug routes are enabled but DEBUG_TOKEN is not set; not serving them")
 
 @app.get("/")
 async def root():
@@ -32,4 +123,10 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy"}
\ No newline at end of file
+    return {"status": "healthy", "startup_ms": startup_ms}
+
+if settings.METRICS_ENABLED:
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics():
+        """Prometheus metrics merged across all workers"""
+        return PlainTextResponse(metrics_registry.render(), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,21 @@
+from pydantic import BaseModel, Field
+from typing import Any, Dict, List, Optional
+
+class CreateUploadRequest(BaseModel):
+    title: str
+    description: str = ""
+    subtitles: List[Dict[str, Any]] = []
+    patient_id: Optional[int] = None
+    total_size: int = Field(..., gt=0)  # in bytes
+
+class UploadSessionStatus(BaseModel):
+    upload_id: str
+    offset: int
+    total_size: int
+    expires_at: float
+
+class ProgressHeartbeat(BaseModel):
+    position: float = Field(..., ge=0)  # current playhead, in seconds
+    played_from: Optional[float] = Field(None, ge=0)  # start of the range played since the last heartbeat
+    duration: Optional[float] = Field(None, gt=0)
+    patient_id: Optional[int] = None
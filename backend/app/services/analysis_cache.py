@@ -0,0 +1,92 @@
+import hashlib
+import json
+import time
+from typing import Any, Dict, Optional
+
+from app.core.store import DocumentStore
+
+# Hits only refresh their LRU timestamp when it is older than this, so a
+# burst of repeat lookups doesn't turn every read into a write
+TOUCH_INTERVAL_SECONDS = 60
+
+
+def analysis_key(medication: str, api_response: Dict[str, Any], model: str, prompt_version: str) -> str:
+    """Cache key for an analysis; api_response is hashed in canonical (sorted-key) form"""
+    canonical = json.dumps(
+        {
+            "medication": medication.strip().lower(),
+            "api_response": api_response,
+            "model": model,
+            "prompt_version": prompt_version,
+        },
+        sort_keys=True,
+        separators=(",", ":"),
+        ensure_ascii=False,
+        default=str
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class AnalysisCache:
+    """
+    Persistent cache of validated prescription analyses.
+
+    Entries live in the shared store, so every worker benefits from an
+    analysis any of them ran. Entries expire after `ttl_seconds` and the least
+    recently used ones are evicted beyond `max_entries`.
+    """
+
+    def __init__(self, store: DocumentStore, ttl_seconds: float, max_entries: int):
+        self.store = store
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+
+    def initialize(self) -> None:
+        with self.store.transaction() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS analysis_cache (
+                    key TEXT PRIMARY KEY,
+                    medication TEXT NOT NULL,
+                    body TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )
+            """)
+            conn.execute("""
+                CREATE INDEX IF NOT EXISTS analysis_cache_accessed
+                ON analysis_cache (accessed_at)
+            """)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Cached analysis for a key, or None when missing or expired"""
+        now = time.time()
+        row = self.store.connection().execute(
+            "SELECT body, created_at, accessed_at FROM analysis_cache WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        body, created_at, accessed_at = row
+        if now - created_at > self.ttl_seconds:
+            with self.store.transaction() as conn:
+                conn.execute("DELETE FROM analysis_cache WHERE key = ?", (key,))
+            return None
+        if now - accessed_at > TOUCH_INTERVAL_SECONDS:
+            with self.store.transaction() as conn:
+                conn.execute("UPDATE analysis_cache SET accessed_at = ? WHERE key = ?", (now, key))
+        return json.loads(body)
+
+    def put(self, key: str, medication: str, result: Dict[str, Any]) -> None:
+        """Store an analysis and enforce the TTL and size bounds"""
+        now = time.time()
+        with self.store.transaction() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO analysis_cache (key, medication, body, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, medication, json.dumps(result), now, now)
+            )
+            conn.execute("DELETE FROM analysis_cache WHERE created_at < ?", (now - self.ttl_seconds,))
+            conn.execute("""
+                DELETE FROM analysis_cache WHERE key IN (
+                    SELECT key FROM analysis_cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?
+                )
+            """, (self.max_entries,))
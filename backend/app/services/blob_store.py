@@ -0,0 +1,120 @@
+import hashlib
+import os
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+from typing import BinaryIO, Optional
+
+# Container formats we accept, keyed by file extension
+VIDEO_CONTENT_TYPES = {
+    "webm": "video/webm",
+    "mkv": "video/x-matroska",
+    "mp4": "video/mp4",
+    "mov": "video/quicktime",
+    "avi": "video/x-msvideo",
+}
+
+
+class UploadTooLargeError(Exception):
+    """Raised when an upload exceeds the configured size limit"""
+
+
+class UnsupportedMediaError(Exception):
+    """Raised when uploaded bytes are not a recognised video container"""
+
+
+@dataclass
+class StoredBlob:
+    filename: str
+    sha256: str
+    size: int
+    extension: str
+    content_type: str
+    deduplicated: bool
+
+
+# Leading bytes sniff_video_extension needs to recognise every supported container
+SNIFF_MIN_BYTES = 12
+
+
+def sniff_video_extension(header: bytes) -> Optional[str]:
+    """Detect the video container from the first bytes of a file"""
+    if header.startswith(b"\x1a\x45\xdf\xa3"):
+        # EBML: WebM declares its doctype near the start, anything else is Matroska
+        return "webm" if b"webm" in header[:64] else "mkv"
+    if header[4:8] == b"ftyp":
+        return "mov" if header[8:12] == b"qt  " else "mp4"
+    if header[4:8] in (b"moov", b"mdat", b"wide", b"free"):
+        return "mov"
+    if header.startswith(b"RIFF") and header[8:12] == b"AVI ":
+        return "avi"
+    return None
+
+
+class BlobStore:
+    """
+    Content-addressed storage for uploaded videos.
+
+    Files are named by the sha256 of their content, so the same recording sent
+    to several patients is stored once and referenced by several metadata rows.
+    """
+
+    def __init__(self, directory: Path, chunk_size: int = 1024 * 1024):
+        self.directory = directory
+        self.chunk_size = chunk_size
+
+    def temp_path(self) -> Path:
+        """A fresh temporary path on the same filesystem as the blobs"""
+        return self.directory / f".upload-{uuid.uuid4().hex}.part"
+
+    def write_stream(self, source: BinaryIO, max_bytes: int) -> StoredBlob:
+        """
+        Copy a file object into the store, hashing and size-checking it while
+        it streams. Blocking; run it in a worker thread from async code.
+        """
+        self.directory.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.temp_path()
+        digest = hashlib.sha256()
+        size = 0
+        header = b""
+
+        try:
+            with open(tmp_path, "wb", buffering=0) as out:
+                while True:
+                    chunk = source.read(self.chunk_size)
+                    if not chunk:
+                        break
+                    size += len(chunk)
+                    if size > max_bytes:
+                        raise UploadTooLargeError(f"Upload exceeds the {max_bytes} byte limit")
+                    if len(header) < 64:
+                        header += chunk[:64 - len(header)]
+                    digest.update(chunk)
+                    out.write(chunk)
+            return self.adopt(tmp_path, digest.hexdigest(), size, header)
+        finally:
+            if tmp_path.exists():
+                tmp_path.unlink()
+
+    def adopt(self, tmp_path: Path, sha256: str, size: int, header: bytes) -> StoredBlob:
+        """Move a fully written temporary file to its content address"""
+        extension = sniff_video_extension(header)
+        if extension is None:
+            raise UnsupportedMediaError("Uploaded file is not a supported video format")
+
+        filename = f"{sha256}.{extension}"
+        blob_path = self.directory / filename
+        deduplicated = blob_path.exists()
+        if deduplicated:
+            tmp_path.unlink()
+        else:
+            os.replace(tmp_path, blob_path)
+
+        return StoredBlob(
+            filename=filename,
+            sha256=sha256,
+            size=size,
+            extension=extension,
+            content_type=VIDEO_CONTENT_TYPES[extension],
+            deduplicated=deduplicated
+        )
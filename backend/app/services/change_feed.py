@@ -0,0 +1,148 @@
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional, Set
+
+from app.core.store import DocumentStore
+
+logger = logging.getLogger(__name__)
+
+# Updates to these fields are reported as "status_changed"
+STATUS_FIELDS = {"status", "read", "watched"}
+
+# Event names for newly created documents, per collection
+CREATED_EVENTS = {
+    "prescriptions": "new_prescription",
+    "videos": "new_video",
+}
+
+
+def reset_event(seq: int) -> Dict[str, Any]:
+    """Tells a client it missed changes and should reload its lists, then carry on from `seq`"""
+    return {"event": "reset", "seq": seq, "data": {"seq": seq}}
+
+
+def change_event(store: DocumentStore, change: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Turn a change log entry into an event for clients, or None if they don't need it"""
+    collection = change["collection"]
+    if collection not in CREATED_EVENTS:
+        return None
+    if change["kind"] == "created":
+        name = CREATED_EVENTS[collection]
+    elif change["kind"] == "updated" and STATUS_FIELDS.intersection(change["fields"]):
+        name = "status_changed"
+    else:
+        return None
+
+    doc = store.get(collection, change["id"])
+    if doc is None:
+        return None
+    return {
+        "event": name,
+        "seq": change["seq"],
+        "data": {
+            "collection": collection,
+            "id": change["id"],
+            "patient_id": doc.get("patient_id"),
+            "status": doc.get("status"),
+            "read": doc.get("read"),
+            "watched": doc.get("watched"),
+        },
+    }
+
+
+class ChangeFeed:
+    """
+    Fans store changes out to the server-sent-event clients of this worker.
+
+    One loop per worker watches the store's change sequence, so changes made
+    by any worker process reach every connected client, and turns new change
+    log entries into events pushed onto each subscriber's queue.
+
+    Queues are bounded: a subscriber that falls `queue_size` events behind
+    has its backlog replaced by a single reset event, so a slow client costs
+    a resync rather than unbounded memory.
+    """
+
+    def __init__(self, store: DocumentStore, poll_interval: float, queue_size: int, catchup_limit: int):
+        self.store = store
+        self.poll_interval = poll_interval
+        self.queue_size = queue_size
+        self.catchup_limit = catchup_limit
+        self._seq = 0
+        self._subscribers: Set[asyncio.Queue] = set()
+
+    def subscribe(self) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue) -> None:
+        self._subscribers.discard(queue)
+
+    def events_since(self, since: int) -> List[Dict[str, Any]]:
+        """
+        Events for changes after `since`, for clients catching up after a
+        reconnect. Just a reset event when the gap is longer than the catch-up
+        limit or than the change log reaches back.
+        """
+        seq = self.store.sequence()
+        oldest = self.store.oldest_sequence()
+        if since > seq or (oldest is not None and since < oldest - 1):
+            return [reset_event(seq)]
+
+        changes = self.store.changes_since(since, self.catchup_limit + 1)
+        if len(changes) > self.catchup_limit:
+            return [reset_event(max(seq, changes[-1]["seq"]))]
+
+        events = []
+        for change in changes:
+            event = change_event(self.store, change)
+            if event:
+                events.append(event)
+        return events
+
+    def poll(self) -> List[Dict[str, Any]]:
+        """Events for changes made since the last poll"""
+        if self.store.sequence() <= self._seq:
+            return []
+        events = []
+        for change in self.store.changes_since(self._seq):
+            self._seq = change["seq"]
+            event = change_event(self.store, change)
+            if event:
+                events.append(event)
+        return events
+
+    async def run(self) -> None:
+        """Poll the store and publish events until cancelled"""
+        self._seq = self.store.sequence()
+        try:
+            while True:
+                await asyncio.sleep(self.poll_interval)
+                if not self._subscribers:
+                    # Nobody is listening; skip ahead instead of replaying later
+                    self._seq = self.store.sequence()
+                    continue
+                try:
+                    for event in self.poll():
+                        for queue in self._subscribers:
+                            self._publish(queue, event)
+                except Exception:
+                    logger.exception("Error polling change feed")
+        finally:
+            # Wake every open stream so it can close
+            for queue in self._subscribers:
+                self._replace_backlog(queue, None)
+
+    def _publish(self, queue: asyncio.Queue, event: Dict[str, Any]) -> None:
+        try:
+            queue.put_nowait(event)
+        except asyncio.QueueFull:
+            logger.warning("Event stream client fell %s events behind; sending a reset", self.queue_size)
+            self._replace_backlog(queue, reset_event(event["seq"]))
+
+    @staticmethod
+    def _replace_backlog(queue: asyncio.Queue, item: Optional[Dict[str, Any]]) -> None:
+        while not queue.empty():
+            queue.get_nowait()
+        queue.put_nowait(item)
@@ -0,0 +1,207 @@
+import json
+import sqlite3
+import time
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from app.core.store import DocumentStore, store
+
+# Key the counters for all patients together are kept under
+ALL_PATIENTS = "*"
+
+# Document fields that count as patient activity, per collection
+ACTIVITY_FIELDS = {
+    "videos": ("uploaded_at", "watched_at", "completed_at"),
+    "prescriptions": ("created_at", "read_at"),
+}
+
+BUILT_MARKER = "engagement:built"
+
+
+def patient_key(doc: Dict[str, Any]) -> str:
+    patient_id = doc.get("patient_id")
+    return str(patient_id) if patient_id is not None else "anonymous"
+
+
+def contributions(collection: str, doc: Dict[str, Any]) -> Dict[str, int]:
+    """Counter increments one document is responsible for"""
+    if collection == "videos":
+        return {
+            "videos.total": 1,
+            f"videos.status.{doc.get('status', 'unwatched')}": 1,
+        }
+    if collection == "prescriptions":
+        counts = {"prescriptions.total": 1}
+        if not doc.get("read"):
+            counts["prescriptions.unread"] = 1
+        return counts
+    return {}
+
+
+def last_activity(collection: str, doc: Dict[str, Any]) -> Optional[str]:
+    stamps = [doc[field] for field in ACTIVITY_FIELDS.get(collection, ()) if doc.get(field)]
+    return max(stamps) if stamps else None
+
+
+class EngagementAggregates:
+    """
+    Per-patient engagement counters kept up to date on every write.
+
+    Counters (videos per status, prescriptions, unread prescriptions) and the
+    last activity time are adjusted by a store write hook inside the same
+    transaction as the document change, so the doctor dashboard reads a
+    handful of rows instead of scanning every video and prescription.
+    """
+
+    def __init__(self, store: DocumentStore):
+        self.store = store
+
+    def initialize(self) -> None:
+        """Create the tables, hook into store writes and build the counters once"""
+        self.store.add_write_hook(self.on_write)
+        with self.store.transaction() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS engagement_counters (
+                    patient_key TEXT NOT NULL,
+                    metric TEXT NOT NULL,
+                    value INTEGER NOT NULL,
+                    PRIMARY KEY (patient_key, metric)
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS engagement_activity (
+                    patient_key TEXT PRIMARY KEY,
+                    last_activity TEXT NOT NULL
+                )
+            """)
+            if not conn.execute("SELECT 1 FROM store_meta WHERE key = ?", (BUILT_MARKER,)).fetchone():
+                self._rebuild(conn)
+                conn.execute(
+                    "INSERT INTO store_meta (key, value) VALUES (?, ?)", (BUILT_MARKER, str(time.time()))
+                )
+
+    def _rebuild(self, conn: sqlite3.Connection) -> None:
+        """Recompute every counter from the documents already in the store"""
+        conn.execute("DELETE FROM engagement_counters")
+        conn.execute("DELETE FROM engagement_activity")
+        for collection in ACTIVITY_FIELDS:
+            rows = conn.execute("SELECT body FROM documents WHERE collection = ?", (collection,))
+            for (body,) in rows.fetchall():
+                self.on_write(conn, collection, None, json.loads(body))
+
+        has_progress = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'watch_progress'"
+        ).fetchone()
+        if has_progress:
+            rows = conn.execute("SELECT patient_key, MAX(updated_at) FROM watch_progress GROUP BY patient_key")
+            for key, updated_at in rows.fetchall():
+                self._touch(conn, key, _isoformat(updated_at))
+
+    # Maintenance
+
+    def on_write(
+        self,
+        conn: sqlite3.Connection,
+        collection: str,
+        before: Optional[Dict[str, Any]],
+        after: Optional[Dict[str, Any]]
+    ) -> None:
+        """Store write hook: apply the difference between the old and new document"""
+        if collection not in ACTIVITY_FIELDS:
+            return
+
+        deltas: Dict[Tuple[str, str], int] = defaultdict(int)
+        for doc, sign in ((before, -1), (after, 1)):
+            if doc is None:
+                continue
+            for key in (patient_key(doc), ALL_PATIENTS):
+                for metric, count in contributions(collection, doc).items():
+                    deltas[(key, metric)] += sign * count
+
+        for (key, metric), delta in deltas.items():
+            if delta:
+                conn.execute("""
+                    INSERT INTO engagement_counters (patient_key, metric, value) VALUES (?, ?, ?)
+                    ON CONFLICT (patient_key, metric) DO UPDATE SET value = value + excluded.value
+                """, (key, metric, delta))
+
+        if after is not None:
+            activity = last_activity(collection, after)
+            if activity:
+                self._touch(conn, patient_key(after), activity)
+
+    def record_activity(self, activity: Iterable[Tuple[str, float]]) -> None:
+        """Fold (patient_key, unix time) pairs, e.g. watch progress, into last activity"""
+        latest: Dict[str, float] = {}
+        for key, timestamp in activity:
+            latest[key] = max(timestamp, latest.get(key, 0.0))
+        if not latest:
+            return
+        with self.store.transaction() as conn:
+            for key, timestamp in latest.items():
+                self._touch(conn, key, _isoformat(timestamp))
+
+    def _touch(self, conn: sqlite3.Connection, key: str, timestamp: str) -> None:
+        for target in (key, ALL_PATIENTS):
+            conn.execute("""
+                INSERT INTO engagement_activity (patient_key, last_activity) VALUES (?, ?)
+                ON CONFLICT (patient_key) DO UPDATE
+                SET last_activity = MAX(last_activity, excluded.last_activity)
+            """, (target, timestamp))
+
+    # Reads
+
+    def summary(self) -> Dict[str, Any]:
+        """Totals across all patients plus one entry per patient"""
+        conn = self.store.connection()
+        counters: Dict[str, Dict[str, int]] = defaultdict(dict)
+        for key, metric, value in conn.execute("SELECT patient_key, metric, value FROM engagement_counters"):
+            counters[key][metric] = value
+        activity = dict(conn.execute("SELECT patient_key, last_activity FROM engagement_activity").fetchall())
+
+        keys = sorted((set(counters) | set(activity)) - {ALL_PATIENTS})
+        return {
+            "totals": _shape(ALL_PATIENTS, counters.get(ALL_PATIENTS, {}), activity.get(ALL_PATIENTS)),
+            "patients": [_shape(key, counters.get(key, {}), activity.get(key)) for key in keys],
+        }
+
+    def patient(self, key: str) -> Dict[str, Any]:
+        conn = self.store.connection()
+        metrics = dict(conn.execute(
+            "SELECT metric, value FROM engagement_counters WHERE patient_key = ?", (key,)
+        ).fetchall())
+        row = conn.execute(
+            "SELECT last_activity FROM engagement_activity WHERE patient_key = ?", (key,)
+        ).fetchone()
+        return _shape(key, metrics, row[0] if row else None)
+
+
+def _shape(key: str, metrics: Dict[str, int], activity: Optional[str]) -> Dict[str, Any]:
+    statuses = {
+        metric.rsplit(".", 1)[1]: value
+        for metric, value in metrics.items()
+        if metric.startswith("videos.status.") and value
+    }
+    statuses.setdefault("watched", 0)
+    statuses.setdefault("unwatched", 0)
+
+    shaped: Dict[str, Any] = {"patient_key": key}
+    if key != ALL_PATIENTS:
+        shaped["patient_id"] = int(key) if key.isdigit() else None
+    shaped.update({
+        "videos": {"total": metrics.get("videos.total", 0), "by_status": statuses},
+        "prescriptions": {
+            "total": metrics.get("prescriptions.total", 0),
+            "unread": metrics.get("prescriptions.unread", 0),
+        },
+        "last_activity": activity,
+    })
+    return shaped
+
+
+def _isoformat(timestamp: float) -> str:
+    return datetime.fromtimestamp(timestamp).isoformat()
+
+
+engagement_aggregates = EngagementAggregates(store)
@@ -0,0 +1,283 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import math
+import re
+import time
+from dataclasses import dataclass, field
+from enum import IntEnum
+from functools import lru_cache
+from typing import Any, Awaitable, Callable, List, Mapping, Optional
+
+from fastapi import HTTPException
+
+from app.core.config import settings
+from app.core.metrics import groq_queue_depth, groq_queue_wait, groq_rejections
+
+logger = logging.getLogger(__name__)
+
+
+class Priority(IntEnum):
+    """Order in which queued Groq calls get capacity; lower goes first"""
+    CHAT = 0
+    ANALYSIS = 1
+    TRANSCRIPTION = 2
+
+
+class UpstreamBusyError(Exception):
+    """Raised when a Groq call can't get rate-limit capacity before its deadline"""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def upstream_busy(error: UpstreamBusyError) -> HTTPException:
+    """503 telling the client when capacity should be back"""
+    return HTTPException(
+        status_code=503,
+        detail=str(error),
+        headers={"Retry-After": str(max(1, math.ceil(error.retry_after)))}
+    )
+
+
+@lru_cache()
+def get_async_groq_client():
+    """
+    Shared async Groq client, imported lazily to keep startup fast. The SDK's
+    own retries are off: retrying a 429 is the scheduler's job, so it can
+    pause every caller instead of each one hammering the API on its own.
+    """
+    from groq import AsyncGroq
+    return AsyncGroq(api_key=settings.GROQ_API_KEY, base_url=settings.GROQ_BASE_URL or None, max_retries=0)
+
+
+def estimate_tokens(messages: List[Mapping[str, Any]], max_tokens: int) -> int:
+    """Rough upper bound on what a chat completion counts against tokens/minute"""
+    prompt_chars = sum(len(message.get("content") or "") for message in messages)
+    return prompt_chars // 4 + max_tokens
+
+
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_DURATION_UNITS = {"h": 3600.0, "m": 60.0, "s": 1.0, "ms": 0.001}
+
+
+def parse_duration(value: Optional[str]) -> Optional[float]:
+    """Seconds in a rate-limit reset header such as "7.66s", "2m59.56s" or "120ms" """
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _DURATION_PART.findall(value)
+    if not parts:
+        return None
+    return sum(float(amount) * _DURATION_UNITS[unit] for amount, unit in parts)
+
+
+def _header_int(headers: Mapping[str, str], name: str) -> Optional[int]:
+    try:
+        return int(float(headers[name]))
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    """Capacity refilled continuously at `per_minute` units a minute"""
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.level = self.capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+
+    @property
+    def rate(self) -> float:
+        return self.capacity / 60.0
+
+    def refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until `amount` can be taken; 0 if it can be now"""
+        self.refill(now)
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        # A call bigger than the whole bucket goes through once the bucket is full
+        amount = min(amount, self.capacity)
+        if self.level >= amount:
+            return 0.0
+        return (amount - self.level) / self.rate
+
+    def take(self, amount: float) -> None:
+        self.level -= min(amount, self.capacity)
+
+    def give_back(self, amount: float) -> None:
+        self.level = min(self.capacity, self.level + amount)
+
+    def resize(self, per_minute: float) -> None:
+        self.capacity = float(per_minute)
+        self.level = min(self.level, self.capacity)
+
+    def sync(self, remaining: int, reset_seconds: Optional[float], now: float) -> None:
+        """Never assume more capacity than the upstream says is left"""
+        self.refill(now)
+        self.level = min(self.level, float(remaining))
+        if remaining <= 0 and reset_seconds:
+            self.block(now + reset_seconds)
+
+    def block(self, until: float) -> None:
+        self.blocked_until = max(self.blocked_until, until)
+        self.level = min(self.level, 0.0)
+
+
+@dataclass(order=True)
+class _Waiter:
+    priority: int
+    seq: int
+    tokens: int = field(compare=False)
+    deadline: float = field(compare=False)
+    future: asyncio.Future = field(compare=False)
+
+
+class GroqScheduler:
+    """
+    Admits Groq calls against requests/minute and tokens/minute buckets,
+    highest priority first. Buckets start from the configured limits and are
+    corrected by the x-ratelimit-* headers on every response, which also
+    reflect calls made by other workers. A 429 pauses all callers for its
+    Retry-After. Queued calls that can't be admitted before their deadline
+    fail fast with UpstreamBusyError.
+    """
+
+    def __init__(self, requests_per_minute: int, tokens_per_minute: int):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self._queue: List[_Waiter] = []
+        self._seq = itertools.count()
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+    def max_wait(self, priority: Priority) -> float:
+        return {
+            Priority.CHAT: settings.GROQ_CHAT_MAX_WAIT_SECONDS,
+            Priority.ANALYSIS: settings.GROQ_ANALYSIS_MAX_WAIT_SECONDS,
+            Priority.TRANSCRIPTION: settings.GROQ_TRANSCRIPTION_MAX_WAIT_SECONDS,
+        }[priority]
+
+    def wait_time(self, tokens: int) -> float:
+        now = time.monotonic()
+        return max(self.requests.wait_time(1, now), self.tokens.wait_time(tokens, now))
+
+    async def acquire(self, priority: Priority, tokens: int, deadline: float) -> None:
+        """Wait until the call may be made, or raise UpstreamBusyError at the deadline"""
+        label = priority.name.lower()
+        waiter = _Waiter(priority, next(self._seq), tokens, deadline, asyncio.get_running_loop().create_future())
+        heapq.heappush(self._queue, waiter)
+        groq_queue_depth.inc(priority=label)
+        start = time.monotonic()
+        try:
+            self._dispatch()
+            await asyncio.wait_for(waiter.future, timeout=max(0.0, deadline - start))
+        except asyncio.TimeoutError:
+            groq_rejections.inc(priority=label, reason="deadline")
+            raise UpstreamBusyError("Groq rate limit reached, try again shortly", self.wait_time(tokens)) from None
+        except UpstreamBusyError:
+            groq_rejections.inc(priority=label, reason="deadline")
+            raise
+        finally:
+            groq_queue_depth.dec(priority=label)
+            groq_queue_wait.observe(time.monotonic() - start, priority=label)
+            # A waiter that gave up may have been holding up the queue
+            self._dispatch()
+
+    def _dispatch(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        now = time.monotonic()
+        while self._queue:
+            waiter = self._queue[0]
+            if waiter.future.done():
+                heapq.heappop(self._queue)
+                continue
+            wait = max(self.requests.wait_time(1, now), self.tokens.wait_time(waiter.tokens, now))
+            if wait == 0:
+                self.requests.take(1)
+                self.tokens.take(waiter.tokens)
+                heapq.heappop(self._queue)
+                waiter.future.set_result(None)
+                continue
+            if now + wait > waiter.deadline:
+                # It can't make its deadline; say so now rather than at the deadline
+                heapq.heappop(self._queue)
+                waiter.future.set_exception(UpstreamBusyError("Groq rate limit reached, try again shortly", wait))
+                continue
+            self._timer = asyncio.get_running_loop().call_later(wait, self._dispatch)
+            return
+
+    def observe(self, headers: Mapping[str, str]) -> None:
+        """Correct the buckets from a response's rate-limit headers"""
+        now = time.monotonic()
+        # Groq's token limit is per minute; its request limit is per day, so only "remaining" is used
+        limit_tokens = _header_int(headers, "x-ratelimit-limit-tokens")
+        if limit_tokens:
+            self.tokens.resize(limit_tokens)
+        remaining_tokens = _header_int(headers, "x-ratelimit-remaining-tokens")
+        if remaining_tokens is not None:
+            self.tokens.sync(remaining_tokens, parse_duration(headers.get("x-ratelimit-reset-tokens")), now)
+        remaining_requests = _header_int(headers, "x-ratelimit-remaining-requests")
+        if remaining_requests is not None:
+            self.requests.sync(remaining_requests, parse_duration(headers.get("x-ratelimit-reset-requests")), now)
+
+    def rate_limited(self, headers: Mapping[str, str]) -> float:
+        """Pause every caller after a 429; returns the pause in seconds"""
+        self.observe(headers)
+        retry_after = parse_duration(headers.get("retry-after")) or 1.0
+        until = time.monotonic() + retry_after
+        self.requests.block(until)
+        self.tokens.block(until)
+        return retry_after
+
+    async def run(
+        self,
+        priority: Priority,
+        call: Callable[[], Awaitable[Any]],
+        tokens: int = 0,
+        max_wait: Optional[float] = None
+    ) -> Any:
+        """
+        Make a Groq call once there is capacity. `call` must use the async
+        client's `with_raw_response` so the rate-limit headers can be read;
+        the parsed result is returned. A 429 is retried while the deadline allows.
+        """
+        deadline = time.monotonic() + (self.max_wait(priority) if max_wait is None else max_wait)
+        while True:
+            await self.acquire(priority, tokens, deadline)
+            try:
+                raw = await call()
+            except Exception as e:
+                if getattr(e, "status_code", None) != 429:
+                    raise
+                retry_after = self.rate_limited(e.response.headers)
+                logger.warning(
+                    "Groq rate limited, pausing calls for %.1f s", retry_after,
+                    extra={"priority": priority.name.lower()}
+                )
+                if time.monotonic() + retry_after >= deadline:
+                    groq_rejections.inc(priority=priority.name.lower(), reason="rate_limited")
+                    raise UpstreamBusyError("Groq rate limit reached, try again shortly", retry_after) from e
+                continue
+
+            self.observe(raw.headers)
+            result = await raw.parse()
+            usage = getattr(result, "usage", None)
+            if tokens and usage is not None and getattr(usage, "total_tokens", None):
+                # Hand back what the estimate over-reserved
+                self.tokens.give_back(max(0, tokens - usage.total_tokens))
+            return result
+
+
+groq_scheduler = GroqScheduler(settings.GROQ_REQUESTS_PER_MINUTE, settings.GROQ_TOKENS_PER_MINUTE)
@@ -1,11 +1,16 @@
-from groq import Groq
+import logging
 from typing import List
 from app.core.config import settings
+from app.core.metrics import track_upstream
+from app.core.tracing import span
 from app.models.chat_models import TranscriptItem
+from app.services.groq_scheduler import Priority, estimate_tokens, get_async_groq_client, groq_scheduler
+
+logger = logging.getLogger(__name__)
 
 class GroqService:
     def __init__(self):
-        self.client = Groq(api_key=settings.GROQ_API_KEY)
+        self.client = get_async_groq_client()
         self.model = settings.GROQ_MODEL
 
     async def generate_response(
@@ -27,37 +32,71 @@ class GroqService:
             if video_duration is None or video_duration == 0:
                 video_duration = 120.0  # Default to 2 minutes if not provided
 
-            # Separate transcript into watched and unwatched portions
-            watched_transcript = [
-                item for item in transcript
-                if item.timestamp is not None and item.timestamp <= current_time
-            ]
+            with span("chat.build_prompt", transcript_items=len(transcript)):
+                system_prompt = self.build_system_prompt(transcript, current_time, video_duration)
 
-            unwatched_transcript = [
-                item for item in transcript
-                if item.timestamp is not None and item.timestamp > current_time
+            messages = [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": message}
             ]
 
-            # Create context from watched transcript
-            watched_context = "\n".join([
-                f"[{self._format_time(item.timestamp)}] {item.text}"
-                for item in watched_transcript
-            ])
-
-            # Create context from full transcript for searching
-            full_context = "\n".join([
-                f"[{self._format_time(item.timestamp)}] {item.text}"
-                for item in transcript
-            ])
-
-            # Check if there's content coming later
-            unwatched_context = "\n".join([
-                f"[{self._format_time(item.timestamp)}] {item.text}"
-                for item in unwatched_transcript
-            ]) if unwatched_transcript else ""
-
-            # Create the enhanced system prompt
-            system_prompt = f"""You are a helpful medical assistant helping a patient understand medical instructions from their doctor.
+            async def call():
+                with track_upstream("groq_chat"):
+                    return await self.client.chat.completions.with_raw_response.create(
+                        messages=messages,
+                        model=self.model,
+                        temperature=0.7,
+                        max_tokens=500,
+                    )
+
+            # Interactive, so it goes ahead of analyses and transcriptions
+            completion = await groq_scheduler.run(Priority.CHAT, call, tokens=estimate_tokens(messages, 500))
+
+            response = completion.choices[0].message.content
+            return response if response else "I apologize, but I couldn't generate a response. Please try again."
+
+        except Exception as e:
+            logger.error("Error generating Groq response: %s", e)
+            raise
+
+    def build_system_prompt(
+        self,
+        transcript: List[TranscriptItem],
+        current_time: float,
+        video_duration: float
+    ) -> str:
+        """System prompt with the watched, upcoming and full transcript as context"""
+        # Separate transcript into watched and unwatched portions
+        watched_transcript = [
+            item for item in transcript
+            if item.timestamp is not None and item.timestamp <= current_time
+        ]
+
+        unwatched_transcript = [
+            item for item in transcript
+            if item.timestamp is not None and item.timestamp > current_time
+        ]
+
+        # Create context from watched transcript
+        watched_context = "\n".join([
+            f"[{self._format_time(item.timestamp)}] {item.text}"
+            for item in watched_transcript
+        ])
+
+        # Create context from full transcript for searching
+        full_context = "\n".join([
+            f"[{self._format_time(item.timestamp)}] {item.text}"
+            for item in transcript
+        ])
+
+        # Check if there's content coming later
+        unwatched_context = "\n".join([
+            f"[{self._format_time(item.timestamp)}] {item.text}"
+            for item in unwatched_transcript
+        ]) if unwatched_transcript else ""
+
+        # Create the enhanced system prompt
+        return f"""You are a helpful medical assistant helping a patient understand medical instructions from their doctor.
 The patient is watching a video with medical instructions and has paused at {self._format_time(current_time)} out of {self._format_time(video_duration)} total.
 
 IMPORTANT INSTRUCTIONS:
@@ -80,24 +119,6 @@ FULL TRANSCRIPT (for reference):
 
 Remember: Always provide helpful answers even if the content will be covered later. The patient needs information now."""
 
-            # Call Groq API
-            completion = self.client.chat.completions.create(
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": message}
-                ],
-                model=self.model,
-                temperature=0.7,
-                max_tokens=500,
-            )
-
-            response = completion.choices[0].message.content
-            return response if response else "I apologize, but I couldn't generate a response. Please try again."
-
-        except Exception as e:
-            print(f"Error generating Groq response: {str(e)}")
-            raise
-
     def _format_time(self, seconds: float) -> str:
         """Format time in MM:SS format"""
         if seconds is None:
@@ -0,0 +1,148 @@
+import json
+import re
+from typing import Any, Dict, List, Tuple
+
+# Markdown code fences models sometimes wrap JSON in
+FENCE = re.compile(r"^\s*```(?:json)?\s*|\s*```\s*$", re.IGNORECASE)
+
+CLOSERS = {"{": "}", "[": "]"}
+
+
+class IncrementalJSONParser:
+    """
+    Parser for a JSON object that arrives in pieces, e.g. a streamed completion.
+
+    feed() returns each top-level field as soon as its value is complete, so a
+    caller can act on early fields before the rest of the object has arrived.
+    Anything before the opening brace (a code fence, a stray sentence) and
+    after the closing one is ignored.
+    """
+
+    def __init__(self):
+        self.text = ""
+        self.fields: Dict[str, Any] = {}
+        self.done = False
+        self._pos = 0
+        self._stack: List[str] = []
+        self._in_string = False
+        self._escape = False
+        self._key = None
+        self._key_start = None
+        self._value_start = None
+
+    def feed(self, chunk: str) -> List[Tuple[str, Any]]:
+        """Consume more text; returns the (key, value) pairs completed by it"""
+        if self.done:
+            return []
+        if not self.text:
+            brace = chunk.find("{")
+            if brace < 0:
+                return []
+            chunk = chunk[brace:]
+        self.text += chunk
+
+        completed = []
+        text = self.text
+        while self._pos < len(text) and not self.done:
+            char = text[self._pos]
+            depth = len(self._stack)
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                    if depth == 1 and self._key_start is not None:
+                        self._key = _loads(text[self._key_start:self._pos + 1])
+                        self._key_start = None
+            elif char == '"':
+                self._in_string = True
+                if depth == 1 and self._key is None and self._value_start is None:
+                    self._key_start = self._pos
+            elif char in CLOSERS:
+                self._stack.append(char)
+            elif char in "}]":
+                if depth == 1 and char == "}":
+                    self._complete_field(self._pos, completed)
+                    self.done = True
+                if self._stack:
+                    self._stack.pop()
+            elif depth == 1 and char == ":" and self._key is not None:
+                self._value_start = self._pos + 1
+            elif depth == 1 and char == ",":
+                self._complete_field(self._pos, completed)
+            self._pos += 1
+
+        if self.done:
+            self.text = text[:self._pos]
+        return completed
+
+    def _complete_field(self, end: int, completed: List[Tuple[str, Any]]) -> None:
+        if self._key is not None and self._value_start is not None:
+            raw = self.text[self._value_start:end].strip()
+            try:
+                value = json.loads(raw)
+            except ValueError:
+                # Leave a malformed value for repair once the whole object is in
+                pass
+            else:
+                self.fields[self._key] = value
+                completed.append((self._key, value))
+        self._key = None
+        self._key_start = None
+        self._value_start = None
+
+
+def repair_json(text: str) -> str:
+    """
+    Best-effort fix for a truncated or slightly malformed JSON object: strips
+    code fences and surrounding prose, drops a dangling key or trailing
+    comma, and closes any open strings, arrays and objects.
+    """
+    text = FENCE.sub("", text.strip())
+    start = text.find("{")
+    if start < 0:
+        return text
+    text = text[start:]
+
+    stack: List[str] = []
+    in_string = escape = False
+    end = len(text)
+    for index, char in enumerate(text):
+        if in_string:
+            if escape:
+                escape = False
+            elif char == "\\":
+                escape = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in CLOSERS:
+            stack.append(char)
+        elif char in "}]":
+            if stack:
+                stack.pop()
+            if not stack:
+                end = index + 1
+                break
+    text = text[:end]
+    if in_string:
+        text += '"'
+
+    text = text.rstrip()
+    # A key with no value yet, or a value cut off after its colon
+    if stack and stack[-1] == "{":
+        text = re.sub(r'[,{]\s*"(?:[^"\\]|\\.)*"\s*:?\s*$', lambda m: "{" if m.group(0)[0] == "{" else "", text)
+    text = re.sub(r",\s*$", "", text)
+    text = re.sub(r",(\s*[}\]])", r"\1", text)
+    return text + "".join(CLOSERS[opener] for opener in reversed(stack))
+
+
+def _loads(raw: str) -> Any:
+    try:
+        return json.loads(raw)
+    except ValueError:
+        return raw.strip('"')
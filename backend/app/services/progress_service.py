@@ -0,0 +1,195 @@
+import asyncio
+import bisect
+import json
+import logging
+import time
+from typing import Dict, List, Optional, Tuple
+
+from fastapi.concurrency import run_in_threadpool
+
+from app.core.store import DocumentStore
+
+logger = logging.getLogger(__name__)
+
+# Played ranges closer together than this (seconds) are merged into one
+INTERVAL_MERGE_GAP = 1.0
+
+Interval = List[float]
+
+
+def merge_interval(intervals: List[Interval], start: float, end: float) -> List[Interval]:
+    """Insert [start, end] into a sorted list of disjoint intervals, merging overlaps"""
+    if end < start:
+        start, end = end, start
+
+    starts = [interval[0] for interval in intervals]
+    lo = bisect.bisect_left(starts, start)
+    # The interval just before may reach into the new one
+    if lo > 0 and intervals[lo - 1][1] + INTERVAL_MERGE_GAP >= start:
+        lo -= 1
+    hi = lo
+    while hi < len(intervals) and intervals[hi][0] <= end + INTERVAL_MERGE_GAP:
+        hi += 1
+
+    if lo < hi:
+        start = min(start, intervals[lo][0])
+        end = max(end, intervals[hi - 1][1])
+    return intervals[:lo] + [[round(start, 2), round(end, 2)]] + intervals[hi:]
+
+
+def merge_intervals(a: List[Interval], b: List[Interval]) -> List[Interval]:
+    merged = [list(interval) for interval in a]
+    for start, end in b:
+        merged = merge_interval(merged, start, end)
+    return merged
+
+
+def watched_seconds(intervals: List[Interval]) -> float:
+    return sum(end - start for start, end in intervals)
+
+
+class WatchProgress:
+    """Progress of one patient through one video"""
+
+    __slots__ = ("max_position", "duration", "intervals", "updated_at")
+
+    def __init__(self, max_position: float = 0.0, duration: Optional[float] = None,
+                 intervals: Optional[List[Interval]] = None, updated_at: float = 0.0):
+        self.max_position = max_position
+        self.duration = duration
+        self.intervals = intervals or []
+        self.updated_at = updated_at
+
+    def merge(self, other: "WatchProgress") -> "WatchProgress":
+        return WatchProgress(
+            max_position=max(self.max_position, other.max_position),
+            duration=other.duration or self.duration,
+            intervals=merge_intervals(self.intervals, other.intervals),
+            updated_at=max(self.updated_at, other.updated_at)
+        )
+
+    def to_dict(self) -> Dict:
+        seconds = watched_seconds(self.intervals)
+        return {
+            "max_position": round(self.max_position, 2),
+            "duration": self.duration,
+            "watched_intervals": self.intervals,
+            "watched_seconds": round(seconds, 2),
+            "watched_ratio": round(min(seconds / self.duration, 1.0), 3) if self.duration else None,
+            "updated_at": self.updated_at or None
+        }
+
+
+class WatchProgressBuffer:
+    """
+    Buffers watch-progress heartbeats in memory and flushes them in bulk.
+
+    Each heartbeat is merged into a pending per-(video, patient) entry, so a
+    player reporting every few seconds costs a dictionary update. A periodic
+    flush writes all pending entries in one transaction; merges are max/union,
+    so flushes from several workers can land in any order.
+    """
+
+    def __init__(self, store: DocumentStore, flush_interval: float):
+        self.store = store
+        self.flush_interval = flush_interval
+        self._pending: Dict[Tuple[str, str], WatchProgress] = {}
+
+    def initialize(self) -> None:
+        with self.store.transaction() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS watch_progress (
+                    video_id TEXT NOT NULL,
+                    patient_key TEXT NOT NULL,
+                    max_position REAL NOT NULL,
+                    duration REAL,
+                    intervals TEXT NOT NULL,
+                    updated_at REAL NOT NULL,
+                    PRIMARY KEY (video_id, patient_key)
+                )
+            """)
+
+    def record(
+        self,
+        video_id: str,
+        patient_key: str,
+        position: float,
+        played_from: Optional[float] = None,
+        duration: Optional[float] = None
+    ) -> None:
+        """Merge one heartbeat into the pending buffer"""
+        key = (video_id, patient_key)
+        entry = self._pending.get(key)
+        if entry is None:
+            entry = self._pending[key] = WatchProgress()
+
+        entry.max_position = max(entry.max_position, position)
+        if duration:
+            entry.duration = duration
+        if played_from is not None and played_from <= position:
+            entry.intervals = merge_interval(entry.intervals, played_from, position)
+        entry.updated_at = time.time()
+
+    def load(self, video_id: str, patient_key: str) -> WatchProgress:
+        """Persisted progress merged with anything still pending in this worker"""
+        row = self.store.connection().execute(
+            "SELECT max_position, duration, intervals, updated_at FROM watch_progress "
+            "WHERE video_id = ? AND patient_key = ?",
+            (video_id, patient_key)
+        ).fetchone()
+        persisted = WatchProgress(row[0], row[1], json.loads(row[2]), row[3]) if row else WatchProgress()
+        pending = self._pending.get((video_id, patient_key))
+        return persisted.merge(pending) if pending else persisted
+
+    async def flush(self, on_flush=None) -> None:
+        """
+        Write all pending progress in one transaction and pass the merged
+        entries to `on_flush`. Both run on a worker thread, so a database
+        locked by another worker never holds up the event loop.
+        """
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, {}
+        try:
+            merged = await run_in_threadpool(self._write, pending)
+        except Exception:
+            self._restore(pending)
+            raise
+        if merged and on_flush:
+            await run_in_threadpool(on_flush, merged)
+
+    def _restore(self, pending: Dict[Tuple[str, str], WatchProgress]) -> None:
+        """Put unwritten heartbeats back so the next flush retries them"""
+        for key, entry in pending.items():
+            current = self._pending.get(key)
+            self._pending[key] = entry.merge(current) if current else entry
+
+    def _write(self, pending: Dict[Tuple[str, str], WatchProgress]) -> Dict[Tuple[str, str], WatchProgress]:
+        merged = {}
+        with self.store.transaction() as conn:
+            for (video_id, patient_key), entry in pending.items():
+                row = conn.execute(
+                    "SELECT max_position, duration, intervals, updated_at FROM watch_progress "
+                    "WHERE video_id = ? AND patient_key = ?",
+                    (video_id, patient_key)
+                ).fetchone()
+                if row:
+                    entry = WatchProgress(row[0], row[1], json.loads(row[2]), row[3]).merge(entry)
+                conn.execute(
+                    "INSERT OR REPLACE INTO watch_progress "
+                    "(video_id, patient_key, max_position, duration, intervals, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (video_id, patient_key, entry.max_position, entry.duration,
+                     json.dumps(entry.intervals), entry.updated_at)
+                )
+                merged[(video_id, patient_key)] = entry
+        return merged
+
+    async def run(self, on_flush=None) -> None:
+        """Flush periodically until cancelled"""
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush(on_flush)
+            except Exception:
+                logger.exception("Error flushing watch progress")
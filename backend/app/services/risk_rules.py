@@ -0,0 +1,207 @@
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+# Score thresholds from the analysis guidelines: >70 low, 40-70 moderate, <40 high
+LOW_RISK_ABOVE = 70
+HIGH_RISK_BELOW = 40
+
+# Payload keys that hold a compatibility score (0-100, higher is safer), warnings,
+# an explicit risk label, or recommendation text. Generic and risk-type scores
+# ("score", "risk_score", ...) are left out: their direction and scale are unknown.
+SCORE_KEYS = {"compatibility_score", "genetic_compatibility_score", "overall_compatibility_score"}
+WARNING_KEYS = {"warnings", "warning", "alerts", "flags", "contraindications"}
+RISK_LABEL_KEYS = {"risk_level", "risk", "risk_category"}
+RECOMMENDATION_KEYS = {"recommendation", "recommendations", "interpretation", "summary"}
+
+# Recommendation wording that rules out answering "safe to prescribe" locally
+NEGATIVE_TERMS = (
+    "avoid", "not recommended", "contraindicat", "do not", "don't", "alternative",
+    "caution", "reduce", "adjust", "increased risk", "higher risk", "toxicity",
+)
+
+RISK_ORDER = ["low", "moderate", "high"]
+
+# How deep into the scoring payload to look for those keys
+MAX_DEPTH = 4
+
+LOW_RISK_RECOMMENDATION = "This medication is safe to prescribe based on genetic profile"
+
+# Common pharmacogenomically sensitive drugs and options without the same gene-drug interaction
+ALTERNATIVES: Dict[str, List[Dict[str, Any]]] = {
+    "clopidogrel": [
+        {"name": "Prasugrel", "description": "P2Y12 inhibitor not dependent on CYP2C19 activation",
+         "benefits": ["Effective in CYP2C19 poor metabolizers"],
+         "considerations": ["Higher bleeding risk", "Avoid with prior stroke or TIA"]},
+        {"name": "Ticagrelor", "description": "Direct-acting P2Y12 inhibitor",
+         "benefits": ["No CYP2C19 activation required"],
+         "considerations": ["Twice-daily dosing", "May cause dyspnea"]},
+    ],
+    "warfarin": [
+        {"name": "Apixaban", "description": "Direct factor Xa inhibitor",
+         "benefits": ["Dosing not guided by CYP2C9/VKORC1 genotype", "No routine INR monitoring"],
+         "considerations": ["Adjust for renal function, age and weight"]},
+        {"name": "Rivaroxaban", "description": "Direct factor Xa inhibitor",
+         "benefits": ["Once-daily dosing", "No routine INR monitoring"],
+         "considerations": ["Take with food", "Adjust for renal function"]},
+    ],
+    "codeine": [
+        {"name": "Morphine", "description": "Opioid analgesic that does not need CYP2D6 activation",
+         "benefits": ["Predictable effect regardless of CYP2D6 status"],
+         "considerations": ["Opioid side effects and dependence risk"]},
+        {"name": "Acetaminophen", "description": "Non-opioid analgesic",
+         "benefits": ["No CYP2D6 dependence", "Low interaction burden"],
+         "considerations": ["Daily dose limit for liver safety"]},
+    ],
+    "tramadol": [
+        {"name": "Morphine", "description": "Opioid analgesic that does not need CYP2D6 activation",
+         "benefits": ["Predictable effect regardless of CYP2D6 status"],
+         "considerations": ["Opioid side effects and dependence risk"]},
+        {"name": "Acetaminophen", "description": "Non-opioid analgesic",
+         "benefits": ["No CYP2D6 dependence"],
+         "considerations": ["Daily dose limit for liver safety"]},
+    ],
+    "simvastatin": [
+        {"name": "Rosuvastatin", "description": "Statin less affected by SLCO1B1 variants",
+         "benefits": ["Potent LDL lowering", "Lower myopathy risk in SLCO1B1 carriers"],
+         "considerations": ["Lower starting dose in Asian ancestry"]},
+        {"name": "Pravastatin", "description": "Hydrophilic statin",
+         "benefits": ["Lower myopathy risk", "Few CYP interactions"],
+         "considerations": ["Less potent LDL lowering"]},
+    ],
+    "donepezil": [
+        {"name": "Rivastigmine", "description": "Cholinesterase inhibitor not metabolized by CYP enzymes",
+         "benefits": ["Unaffected by CYP2D6 status", "Available as a transdermal patch"],
+         "considerations": ["Gastrointestinal side effects", "Titrate slowly"]},
+        {"name": "Memantine", "description": "NMDA receptor antagonist for moderate to severe dementia",
+         "benefits": ["Minimal CYP metabolism", "Can be combined with cholinesterase inhibitors"],
+         "considerations": ["Adjust for renal function", "Dizziness or confusion in some patients"]},
+    ],
+    "carbamazepine": [
+        {"name": "Levetiracetam", "description": "Antiepileptic without HLA-B*15:02 hypersensitivity association",
+         "benefits": ["Few drug interactions", "No HLA screening required"],
+         "considerations": ["Mood and behavioral side effects", "Adjust for renal function"]},
+    ],
+}
+
+
+@dataclass
+class RiskAssessment:
+    """Risk derived from the scoring payload alone"""
+    risk_level: str
+    score: Optional[float] = None
+    warnings: List[str] = field(default_factory=list)
+    # Low risk backed by a 0-100 compatibility score with nothing against it,
+    # so the fixed low-risk answer can be given without the model
+    conclusive: bool = False
+
+
+def _walk(value: Any, depth: int = 0):
+    """Yield (key, value) pairs of a nested payload, down to MAX_DEPTH levels"""
+    if depth > MAX_DEPTH:
+        return
+    if isinstance(value, dict):
+        for key, item in value.items():
+            yield str(key).lower(), item
+            yield from _walk(item, depth + 1)
+    elif isinstance(value, list):
+        for item in value:
+            yield from _walk(item, depth + 1)
+
+
+def _warning_texts(value: Any) -> List[str]:
+    if not value:
+        return []
+    if isinstance(value, str):
+        return [value]
+    if isinstance(value, list):
+        return [item if isinstance(item, str) else str(item) for item in value if item]
+    if isinstance(value, dict):
+        return [f"{key}: {item}" for key, item in value.items() if item]
+    return []
+
+
+def _is_negative(text: Any) -> bool:
+    return any(term in text.lower() for term in NEGATIVE_TERMS) if isinstance(text, str) else False
+
+
+def score_risk(score: float) -> str:
+    if score > LOW_RISK_ABOVE:
+        return "low"
+    if score >= HIGH_RISK_BELOW:
+        return "moderate"
+    return "high"
+
+
+def classify_risk(api_response: Dict[str, Any]) -> Optional[RiskAssessment]:
+    """
+    Apply the deterministic score and warning rules to a scoring payload.
+    Returns None when the payload has no score or risk label to go on.
+    Scores between 0 and 1 may be on a 0-1 scale, so they never make the
+    result conclusive; scores outside 0-100 are ignored.
+    """
+    scores: List[float] = []
+    labels: List[str] = []
+    warnings: List[str] = []
+    unclear_scale = False
+    negative = False
+    for key, value in _walk(api_response):
+        if key in SCORE_KEYS and isinstance(value, (int, float)) and not isinstance(value, bool):
+            if 0 < value <= 1:
+                unclear_scale = True
+            elif 0 <= value <= 100:
+                scores.append(float(value))
+        elif key in RISK_LABEL_KEYS and isinstance(value, str) and value.lower() in RISK_ORDER:
+            labels.append(value.lower())
+        elif key in WARNING_KEYS:
+            warnings.extend(_warning_texts(value))
+        elif key in RECOMMENDATION_KEYS:
+            negative = negative or _is_negative(value) or any(_is_negative(item) for item in _warning_texts(value))
+
+    if not scores and not labels:
+        return None
+
+    # The most severe signal wins
+    levels = labels + [score_risk(score) for score in scores]
+    if warnings or negative:
+        levels.append("moderate")
+    risk_level = max(levels, key=RISK_ORDER.index)
+    conclusive = risk_level == "low" and bool(scores) and not unclear_scale
+    return RiskAssessment(
+        risk_level=risk_level,
+        score=min(scores) if scores else None,
+        warnings=warnings,
+        conclusive=conclusive
+    )
+
+
+def alternatives_for(medication: str) -> Optional[List[Dict[str, Any]]]:
+    return ALTERNATIVES.get(medication.strip().lower())
+
+
+def low_risk_recommendation(medication: str) -> Dict[str, Any]:
+    """The fixed answer the guidelines prescribe for low-risk results"""
+    return {
+        "medication": medication,
+        "risk_level": "low",
+        "recommendation": LOW_RISK_RECOMMENDATION,
+        "can_prescribe": True,
+        "evidence": None,
+        "alternatives": None,
+    }
+
+
+def local_recommendation(medication: str, assessment: RiskAssessment) -> Dict[str, Any]:
+    """Rule-based answer for a moderate/high result, used when the model can't be reached"""
+    evidence = []
+    if assessment.score is not None:
+        evidence.append(f"Genetic compatibility score {assessment.score:g} indicates {assessment.risk_level} risk.")
+    if assessment.warnings:
+        evidence.append("Warnings: " + "; ".join(assessment.warnings))
+    return {
+        "medication": medication,
+        "risk_level": assessment.risk_level,
+        "recommendation": f"{assessment.risk_level.capitalize()} genetic risk; consider an alternative medication",
+        "can_prescribe": False,
+        "evidence": " ".join(evidence) or None,
+        "alternatives": alternatives_for(medication),
+    }
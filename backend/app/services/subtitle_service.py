@@ -0,0 +1,151 @@
+import bisect
+import hashlib
+import json
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+
+def _format_vtt_timestamp(seconds: float) -> str:
+    """Format seconds as a WebVTT timestamp (HH:MM:SS.mmm)"""
+    milliseconds = int(round(max(seconds, 0.0) * 1000))
+    hours, milliseconds = divmod(milliseconds, 3_600_000)
+    minutes, milliseconds = divmod(milliseconds, 60_000)
+    secs, milliseconds = divmod(milliseconds, 1000)
+    return f"{hours:02d}:{minutes:02d}:{secs:02d}.{milliseconds:03d}"
+
+
+def normalize_segments(segments: Any) -> List[Dict[str, Any]]:
+    """
+    Normalize uploaded subtitle segments into sorted {start, end, text} cues.
+
+    Accepts both the {start, end, text} shape produced by the transcriber and
+    the {timestamp, text} shape used by the chat transcript.
+    """
+    if not isinstance(segments, list):
+        return []
+
+    cues = []
+    for segment in segments:
+        if not isinstance(segment, dict):
+            continue
+        try:
+            start = float(segment.get("start", segment.get("timestamp", 0)) or 0)
+            end = float(segment.get("end", start) or start)
+        except (TypeError, ValueError):
+            continue
+        cues.append({
+            "start": start,
+            "end": max(end, start),
+            "text": str(segment.get("text", "")).strip()
+        })
+
+    cues.sort(key=lambda cue: (cue["start"], cue["end"]))
+    return cues
+
+
+class SubtitleTrack:
+    """Sorted subtitle cues for one video with pre-rendered WebVTT/JSON bodies"""
+
+    def __init__(self, video_id: str, cues: List[Dict[str, Any]]):
+        self.video_id = video_id
+        self.cues = cues
+        self.starts = [cue["start"] for cue in cues]
+
+        # Running maximum of cue end times. Cues may overlap, so ends are not
+        # sorted themselves, but their running maximum is and can be bisected.
+        self.max_ends = []
+        running_end = float("-inf")
+        for cue in cues:
+            running_end = max(running_end, cue["end"])
+            self.max_ends.append(running_end)
+
+        self.etag = hashlib.sha256(
+            json.dumps(cues, separators=(",", ":")).encode("utf-8")
+        ).hexdigest()[:32]
+        self._rendered: Dict[str, bytes] = {}
+
+    def window(self, start: Optional[float] = None, end: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Return the cues visible anywhere in the [start, end) time window"""
+        lo = 0 if start is None else bisect.bisect_right(self.max_ends, start)
+        hi = len(self.cues) if end is None else bisect.bisect_left(self.starts, end)
+        if start is None:
+            return self.cues[lo:hi]
+        return [cue for cue in self.cues[lo:hi] if cue["end"] > start]
+
+    def render(self, fmt: str, start: Optional[float] = None, end: Optional[float] = None) -> bytes:
+        """Render the track (or a time window of it) as WebVTT or JSON bytes"""
+        if start is None and end is None:
+            if fmt not in self._rendered:
+                self._rendered[fmt] = self._render_cues(fmt, self.cues)
+            return self._rendered[fmt]
+        return self._render_cues(fmt, self.window(start, end))
+
+    def window_etag(self, fmt: str, start: Optional[float] = None, end: Optional[float] = None) -> str:
+        """Strong ETag for a rendering of this track"""
+        if start is None and end is None:
+            return f'"{self.etag}-{fmt}"'
+        return f'"{self.etag}-{fmt}-{start}-{end}"'
+
+    def _render_cues(self, fmt: str, cues: List[Dict[str, Any]]) -> bytes:
+        if fmt == "vtt":
+            lines = ["WEBVTT", ""]
+            for index, cue in enumerate(cues, start=1):
+                lines.append(str(index))
+                lines.append(f"{_format_vtt_timestamp(cue['start'])} --> {_format_vtt_timestamp(cue['end'])}")
+                lines.append(cue["text"].replace("-->", "->"))
+                lines.append("")
+            return "\n".join(lines).encode("utf-8")
+
+        return json.dumps(
+            {"video_id": self.video_id, "subtitles": cues},
+            separators=(",", ":")
+        ).encode("utf-8")
+
+
+class SubtitleStore:
+    """
+    Per-video subtitle files stored next to (not inside) the video metadata.
+
+    Parsed tracks are cached in memory and revalidated against the file's
+    mtime, so repeated requests never re-read or re-render the subtitles.
+    """
+
+    def __init__(self, directory: Path):
+        self.directory = directory
+        self._cache: Dict[str, Tuple[int, SubtitleTrack]] = {}
+
+    def _path(self, video_id: str) -> Path:
+        return self.directory / f"{video_id}.json"
+
+    def save(self, video_id: str, segments: Any) -> SubtitleTrack:
+        """Normalize and persist subtitles for a video"""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        cues = normalize_segments(segments)
+        path = self._path(video_id)
+        tmp_path = path.with_suffix(".json.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(cues, f, separators=(",", ":"))
+        tmp_path.replace(path)
+
+        track = SubtitleTrack(video_id, cues)
+        self._cache[video_id] = (path.stat().st_mtime_ns, track)
+        return track
+
+    def get(self, video_id: str) -> Optional[SubtitleTrack]:
+        """Load the subtitle track for a video, or None if it has none"""
+        path = self._path(video_id)
+        try:
+            mtime = path.stat().st_mtime_ns
+        except FileNotFoundError:
+            self._cache.pop(video_id, None)
+            return None
+
+        cached = self._cache.get(video_id)
+        if cached and cached[0] == mtime:
+            return cached[1]
+
+        with open(path, "r") as f:
+            cues = json.load(f)
+        track = SubtitleTrack(video_id, cues)
+        self._cache[video_id] = (mtime, track)
+        return track
@@ -0,0 +1,210 @@
+import asyncio
+import json
+import logging
+import shutil
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# HLS ladder: (height, video bitrate, audio bitrate)
+HLS_LADDER: List[Tuple[int, int, int]] = [
+    (360, 800_000, 96_000),
+    (720, 2_500_000, 128_000),
+]
+
+FASTSTART_FILENAME = "faststart.mp4"
+HLS_MASTER_PLAYLIST = "master.m3u8"
+
+ProgressCallback = Callable[[str, float], Awaitable[None]]
+
+
+class TranscodeError(Exception):
+    """Raised when ffmpeg or ffprobe fails on a source video"""
+
+
+class TranscodeService:
+    """
+    Background post-upload pipeline built on a local ffmpeg.
+
+    For each stored blob it produces a fast-start MP4 (moov atom up front, so
+    players can seek without extra range requests) and a small HLS ladder.
+    Renditions are keyed by the blob's sha256, so deduplicated uploads share
+    them, and are written to a temporary directory that is renamed into place
+    only once every output is complete.
+    """
+
+    def __init__(
+        self,
+        output_dir: Path,
+        ffmpeg_path: str = "ffmpeg",
+        ffprobe_path: str = "ffprobe",
+        max_concurrent: int = 1
+    ):
+        self.output_dir = output_dir
+        self.ffmpeg_path = shutil.which(ffmpeg_path)
+        self.ffprobe_path = shutil.which(ffprobe_path)
+        self.max_concurrent = max_concurrent
+        # Created lazily so it binds to the running event loop
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._jobs: Dict[str, asyncio.Task] = {}
+
+    @property
+    def available(self) -> bool:
+        return self.ffmpeg_path is not None and self.ffprobe_path is not None
+
+    def rendition_dir(self, sha256: str) -> Path:
+        return self.output_dir / sha256
+
+    def faststart_path(self, sha256: str) -> Path:
+        return self.rendition_dir(sha256) / FASTSTART_FILENAME
+
+    def is_ready(self, sha256: str) -> bool:
+        """Whether complete renditions already exist for a blob"""
+        return (self.rendition_dir(sha256) / HLS_MASTER_PLAYLIST).exists()
+
+    def is_running(self, sha256: str) -> bool:
+        job = self._jobs.get(sha256)
+        return job is not None and not job.done()
+
+    def schedule(self, source: Path, sha256: str, on_progress: ProgressCallback) -> None:
+        """Start transcoding a blob in the background unless it is already queued"""
+        if self.is_running(sha256):
+            return
+        task = asyncio.create_task(self._run(source, sha256, on_progress))
+        self._jobs[sha256] = task
+        task.add_done_callback(lambda _: self._jobs.pop(sha256, None))
+
+    async def _run(self, source: Path, sha256: str, on_progress: ProgressCallback) -> None:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrent)
+        try:
+            async with self._semaphore:
+                await on_progress("running", 0.0)
+                await self.transcode(source, sha256, on_progress)
+            await on_progress("ready", 1.0)
+        except Exception:
+            logger.exception("Error transcoding video %s", sha256)
+            await on_progress("failed", 0.0)
+
+    async def transcode(self, source: Path, sha256: str, on_progress: ProgressCallback) -> None:
+        """Produce the fast-start MP4 and HLS renditions for one blob"""
+        duration, width, height = await self.probe(source)
+        rungs = [rung for rung in HLS_LADDER if rung[0] <= height] or HLS_LADDER[:1]
+        steps = 1 + len(rungs)
+
+        final_dir = self.rendition_dir(sha256)
+        work_dir = self.output_dir / f".{sha256}.tmp"
+        if work_dir.exists():
+            shutil.rmtree(work_dir)
+        work_dir.mkdir(parents=True)
+
+        try:
+            faststart = work_dir / FASTSTART_FILENAME
+            await self._ffmpeg([
+                "-i", str(source),
+                "-c:v", "libx264", "-preset", "veryfast", "-crf", "23",
+                "-pix_fmt", "yuv420p",
+                "-c:a", "aac", "-b:a", "128k",
+                "-movflags", "+faststart",
+                str(faststart)
+            ], duration, lambda fraction: on_progress("running", fraction / steps))
+
+            variants = []
+            for step, (rung_height, video_bitrate, audio_bitrate) in enumerate(rungs, start=1):
+                rung_dir = work_dir / f"{rung_height}p"
+                rung_dir.mkdir()
+                await self._ffmpeg([
+                    "-i", str(faststart),
+                    "-vf", f"scale=-2:{rung_height}",
+                    "-c:v", "libx264", "-preset", "veryfast",
+                    "-b:v", str(video_bitrate),
+                    "-maxrate", str(int(video_bitrate * 1.07)),
+                    "-bufsize", str(video_bitrate * 2),
+                    "-c:a", "aac", "-b:a", str(audio_bitrate),
+                    "-hls_time", "6",
+                    "-hls_playlist_type", "vod",
+                    "-hls_segment_filename", str(rung_dir / "segment_%04d.ts"),
+                    str(rung_dir / "index.m3u8")
+                ], duration, lambda fraction, step=step: on_progress("running", (step + fraction) / steps))
+
+                rung_width = int(round(width * rung_height / height / 2)) * 2 if height else 0
+                variants.append((rung_height, rung_width, video_bitrate + audio_bitrate))
+
+            lines = ["#EXTM3U", "#EXT-X-VERSION:3"]
+            for rung_height, rung_width, bandwidth in variants:
+                lines.append(f"#EXT-X-STREAM-INF:BANDWIDTH={bandwidth},RESOLUTION={rung_width}x{rung_height}")
+                lines.append(f"{rung_height}p/index.m3u8")
+            (work_dir / HLS_MASTER_PLAYLIST).write_text("\n".join(lines) + "\n")
+
+            if final_dir.exists():
+                shutil.rmtree(final_dir)
+            work_dir.rename(final_dir)
+        finally:
+            if work_dir.exists():
+                shutil.rmtree(work_dir, ignore_errors=True)
+
+    async def probe(self, source: Path) -> Tuple[float, int, int]:
+        """Return (duration seconds, width, height) of the first video stream"""
+        process = await asyncio.create_subprocess_exec(
+            self.ffprobe_path, "-v", "error",
+            "-select_streams", "v:0",
+            "-show_entries", "stream=width,height:format=duration",
+            "-of", "json", str(source),
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE
+        )
+        stdout, stderr = await process.communicate()
+        if process.returncode != 0:
+            raise TranscodeError(f"ffprobe failed: {stderr.decode(errors='replace')[-500:]}")
+
+        info = json.loads(stdout or b"{}")
+        stream = (info.get("streams") or [{}])[0]
+        try:
+            duration = float(info.get("format", {}).get("duration") or 0)
+        except ValueError:
+            duration = 0.0
+        return duration, int(stream.get("width") or 0), int(stream.get("height") or 0)
+
+    async def _ffmpeg(
+        self,
+        args: List[str],
+        duration: float,
+        on_fraction: Callable[[float], Awaitable[None]]
+    ) -> None:
+        """Run ffmpeg, reporting the fraction of the input processed so far"""
+        process = await asyncio.create_subprocess_exec(
+            self.ffmpeg_path, "-y", "-nostdin", "-v", "error",
+            "-progress", "pipe:1", "-nostats",
+            *args,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE
+        )
+        stderr_task = asyncio.create_task(process.stderr.read())
+
+        last_reported = 0.0
+        async for raw_line in process.stdout:
+            key, _, value = raw_line.decode(errors="replace").strip().partition("=")
+            # ffmpeg reports out_time_us and (despite its name) out_time_ms in microseconds
+            if key in ("out_time_us", "out_time_ms") and duration > 0:
+                try:
+                    fraction = min(int(value) / 1_000_000 / duration, 1.0)
+                except ValueError:
+                    continue
+                if fraction - last_reported >= 0.05:
+                    last_reported = fraction
+                    await on_fraction(fraction)
+
+        stderr = await stderr_task
+        if await process.wait() != 0:
+            raise TranscodeError(f"ffmpeg failed: {stderr.decode(errors='replace')[-500:]}")
+        await on_fraction(1.0)
+
+
+def hls_content_type(path: Path) -> str:
+    """Content type for files in an HLS rendition directory"""
+    if path.suffix == ".m3u8":
+        return "application/vnd.apple.mpegurl"
+    if path.suffix == ".ts":
+        return "video/mp2t"
+    return "application/octet-stream"
@@ -0,0 +1,270 @@
+import asyncio
+import hashlib
+import json
+import time
+import uuid
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, List, Tuple
+
+from fastapi.concurrency import run_in_threadpool
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to the in-process lock only
+    fcntl = None
+
+from app.services.blob_store import (
+    SNIFF_MIN_BYTES,
+    BlobStore,
+    StoredBlob,
+    UnsupportedMediaError,
+    UploadTooLargeError,
+    sniff_video_extension
+)
+
+
+class UploadSessionNotFoundError(Exception):
+    """Raised when an upload id is unknown or has expired"""
+
+
+class UploadOffsetMismatchError(Exception):
+    """Raised when a chunk does not start at the session's current offset"""
+
+    def __init__(self, expected: int):
+        super().__init__(f"Chunk must start at offset {expected}")
+        self.expected = expected
+
+
+class UploadIncompleteError(Exception):
+    """Raised when finalizing a session before all bytes have arrived"""
+
+
+class UploadBusyError(Exception):
+    """Raised when another request (possibly in another worker) is writing the session"""
+
+
+class UploadSessionStore:
+    """
+    Resumable chunked uploads.
+
+    Each session is a small JSON descriptor plus a `.part` file that chunks
+    are appended to in place. The `.part` file size is the session's offset,
+    so an interrupted client can ask where to resume. Finalizing moves the
+    `.part` file into the blob store without copying it.
+    """
+
+    def __init__(self, directory: Path, blob_store: BlobStore, max_bytes: int, ttl_seconds: int):
+        self.directory = directory
+        self.blob_store = blob_store
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._locks: Dict[str, asyncio.Lock] = {}
+        # Running sha256 per session, valid only while it matches the file offset
+        self._hashers: Dict[str, Tuple[int, Any, bytes]] = {}
+
+    def _meta_path(self, upload_id: str) -> Path:
+        return self.directory / f"{upload_id}.json"
+
+    def _part_path(self, upload_id: str) -> Path:
+        return self.directory / f"{upload_id}.part"
+
+    def _lock(self, upload_id: str) -> asyncio.Lock:
+        return self._locks.setdefault(upload_id, asyncio.Lock())
+
+    def create(self, total_size: int, metadata: Dict[str, Any]) -> Dict[str, Any]:
+        """Start a new upload session for a file of `total_size` bytes"""
+        if total_size > self.max_bytes:
+            raise UploadTooLargeError(f"Upload exceeds the {self.max_bytes} byte limit")
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        upload_id = uuid.uuid4().hex
+        session = {
+            "id": upload_id,
+            "total_size": total_size,
+            "created_at": time.time(),
+            "metadata": metadata
+        }
+        with open(self._meta_path(upload_id), "w") as f:
+            json.dump(session, f)
+        self._part_path(upload_id).touch()
+        return self.describe(upload_id)
+
+    def get(self, upload_id: str) -> Dict[str, Any]:
+        """Load a session descriptor"""
+        if not upload_id.isalnum():
+            raise UploadSessionNotFoundError(upload_id)
+        try:
+            with open(self._meta_path(upload_id), "r") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            raise UploadSessionNotFoundError(upload_id)
+
+    def offset(self, upload_id: str) -> int:
+        """Number of bytes received so far"""
+        try:
+            return self._part_path(upload_id).stat().st_size
+        except FileNotFoundError:
+            raise UploadSessionNotFoundError(upload_id)
+
+    def describe(self, upload_id: str) -> Dict[str, Any]:
+        """Public view of a session's progress"""
+        session = self.get(upload_id)
+        part_path = self._part_path(upload_id)
+        return {
+            "upload_id": upload_id,
+            "offset": self.offset(upload_id),
+            "total_size": session["total_size"],
+            "expires_at": part_path.stat().st_mtime + self.ttl_seconds
+        }
+
+    async def append(self, upload_id: str, offset: int, chunks: AsyncIterator[bytes]) -> int:
+        """
+        Append a chunk starting at `offset`; returns the new offset. The first
+        chunk's leading bytes are checked before anything is written, so an
+        unsupported container fails now rather than at finalize.
+        """
+        session = self.get(upload_id)
+        async with self._lock(upload_id):
+            current = self.offset(upload_id)
+            if offset != current:
+                raise UploadOffsetMismatchError(current)
+
+            position, hasher, header = self._hashers.get(upload_id, (0, None, b""))
+            if hasher is None or position != current:
+                # Only hash incrementally from a known state; finalize rehashes otherwise
+                hasher = hashlib.sha256() if current == 0 else None
+                header = b""
+
+            buffer: List[bytes] = []
+            buffered = 0
+            sniffed = current > 0
+            with open(self._part_path(upload_id), "ab", buffering=0) as out:
+                self._lock_file(out)
+                if out.seek(0, 2) != offset:
+                    # Another worker appended between the offset check and the lock
+                    raise UploadOffsetMismatchError(out.tell())
+                async for piece in chunks:
+                    if not piece:
+                        continue
+                    if current + buffered + len(piece) > session["total_size"]:
+                        raise UploadTooLargeError("Chunk extends past the declared upload size")
+                    buffer.append(piece)
+                    buffered += len(piece)
+                    if not sniffed and buffered >= SNIFF_MIN_BYTES:
+                        self._check_container(b"".join(buffer))
+                        sniffed = True
+                    if buffered >= self.blob_store.chunk_size:
+                        data = b"".join(buffer)
+                        await run_in_threadpool(out.write, data)
+                        current, header = self._track(upload_id, hasher, current, header, data)
+                        buffer, buffered = [], 0
+                if buffer:
+                    data = b"".join(buffer)
+                    if not sniffed and len(data) == session["total_size"]:
+                        # The whole file is shorter than a container header
+                        self._check_container(data)
+                    await run_in_threadpool(out.write, data)
+                    current, header = self._track(upload_id, hasher, current, header, data)
+
+            return current
+
+    @staticmethod
+    def _check_container(header: bytes) -> None:
+        if sniff_video_extension(header[:64]) is None:
+            raise UnsupportedMediaError("Uploaded file is not a supported video format")
+
+    def _lock_file(self, f) -> None:
+        """Exclusive lock on a .part file, held until it is closed"""
+        if fcntl is None:
+            return
+        try:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            raise UploadBusyError("Another chunk for this upload is still being written")
+
+    def _track(self, upload_id: str, hasher: Any, current: int, header: bytes, data: bytes) -> Tuple[int, bytes]:
+        if hasher is not None:
+            hasher.update(data)
+        if len(header) < 64:
+            header += data[:64 - len(header)]
+        current += len(data)
+        self._hashers[upload_id] = (current, hasher, header)
+        return current, header
+
+    async def finalize(self, upload_id: str) -> Tuple[StoredBlob, Dict[str, Any]]:
+        """Move a completed upload into the blob store; returns the blob and session metadata"""
+        session = self.get(upload_id)
+        async with self._lock(upload_id):
+            part_path = self._part_path(upload_id)
+            try:
+                part = open(part_path, "rb")
+            except FileNotFoundError:
+                raise UploadSessionNotFoundError(upload_id)
+
+            with part:
+                # Held until the blob is adopted, so chunks or a concurrent
+                # finalize from another worker cannot interleave
+                self._lock_file(part)
+                if not self._meta_path(upload_id).exists():
+                    raise UploadSessionNotFoundError(upload_id)
+
+                size = self.offset(upload_id)
+                if size != session["total_size"]:
+                    raise UploadIncompleteError(
+                        f"Received {size} of {session['total_size']} bytes"
+                    )
+
+                position, hasher, header = self._hashers.pop(upload_id, (0, None, b""))
+                if hasher is None or position != size:
+                    sha256, header = await run_in_threadpool(self._hash_file, part_path)
+                else:
+                    sha256 = hasher.hexdigest()
+
+                blob = await run_in_threadpool(self.blob_store.adopt, part_path, sha256, size, header)
+                self._meta_path(upload_id).unlink(missing_ok=True)
+
+            self._locks.pop(upload_id, None)
+            return blob, session["metadata"]
+
+    def abort(self, upload_id: str) -> None:
+        """Discard an upload session and its partial data"""
+        self.get(upload_id)
+        self._discard(upload_id)
+
+    def collect_garbage(self) -> int:
+        """Remove sessions that have not received data within the TTL"""
+        if not self.directory.exists():
+            return 0
+
+        removed = 0
+        cutoff = time.time() - self.ttl_seconds
+        for meta_path in self.directory.glob("*.json"):
+            upload_id = meta_path.stem
+            part_path = self._part_path(upload_id)
+            try:
+                last_activity = (part_path if part_path.exists() else meta_path).stat().st_mtime
+            except FileNotFoundError:
+                continue
+            lock = self._locks.get(upload_id)
+            if last_activity < cutoff and not (lock and lock.locked()):
+                self._discard(upload_id)
+                removed += 1
+        return removed
+
+    def _discard(self, upload_id: str) -> None:
+        self._part_path(upload_id).unlink(missing_ok=True)
+        self._meta_path(upload_id).unlink(missing_ok=True)
+        self._hashers.pop(upload_id, None)
+        self._locks.pop(upload_id, None)
+
+    def _hash_file(self, path: Path) -> Tuple[str, bytes]:
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            header = f.read(64)
+            digest.update(header)
+            while True:
+                chunk = f.read(self.blob_store.chunk_size)
+                if not chunk:
+                    break
+                digest.update(chunk)
+        return digest.hexdigest(), header
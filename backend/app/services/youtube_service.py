@@ -1,9 +1,14 @@
-from youtube_transcript_api import YouTubeTranscriptApi
-from pytube import YouTube
 from typing import List, Optional, Dict, Any
 from app.models.chat_models import TranscriptItem
+from app.core.config import settings
+from app.core.log import chatty
+from app.core.metrics import track_upstream
+from app.core.tracing import span
+import logging
 import re
 
+logger = logging.getLogger(__name__)
+
 class YouTubeService:
     def __init__(self):
         pass
@@ -41,21 +46,33 @@ class YouTubeService:
         """
         try:
             video_id = self.extract_video_id(video_url)
-            print(f"Fetching transcript for video ID: {video_id}")
+            logger.info("Fetching transcript", extra=chatty(video_id=video_id))
+
+            if settings.TRANSCRIPT_API_URL:
+                transcript_list = await self._fetch_from_api(f"/transcripts/{video_id}", {"languages": ",".join(languages)})
+                return [
+                    TranscriptItem(timestamp=entry['start'], text=entry['text'].replace('\n', ' ').strip())
+                    for entry in transcript_list or []
+                ]
+
+            # Imported here so the library is only loaded when a transcript is requested
+            from youtube_transcript_api import YouTubeTranscriptApi
 
             # Try different methods to get transcript
             transcript_list = []
 
             try:
                 # First try to get list of available transcripts
-                transcript_api = YouTubeTranscriptApi.list_transcripts(video_id)
+                with track_upstream("transcript_api"):
+                    transcript_api = YouTubeTranscriptApi.list_transcripts(video_id)
 
                 # Try to find a transcript in preferred languages
                 for lang in languages:
                     try:
                         transcript = transcript_api.find_transcript([lang])
-                        transcript_list = transcript.fetch()
-                        print(f"Found transcript in language: {lang}")
+                        with track_upstream("transcript_api"):
+                            transcript_list = transcript.fetch()
+                        logger.info("Found transcript in preferred language", extra=chatty(video_id=video_id, language=lang))
                         break
                     except:
                         continue
@@ -63,37 +80,43 @@ class YouTubeService:
                 # If no preferred language found, get any available transcript
                 if not transcript_list:
                     for transcript in transcript_api:
-                        print(f"Using available transcript: {transcript.language} (auto-generated: {transcript.is_generated})")
-                        transcript_list = transcript.fetch()
+                        logger.info(
+                            "Using available transcript",
+                            extra=chatty(video_id=video_id, language=transcript.language, generated=transcript.is_generated)
+                        )
+                        with track_upstream("transcript_api"):
+                            transcript_list = transcript.fetch()
                         break
 
             except Exception as e:
-                print(f"Error listing transcripts: {str(e)}")
+                logger.warning("Error listing transcripts for %s: %s", video_id, e)
                 # Fallback to direct fetch
                 try:
-                    transcript_list = YouTubeTranscriptApi.get_transcript(video_id)
+                    with track_upstream("transcript_api"):
+                        transcript_list = YouTubeTranscriptApi.get_transcript(video_id)
                 except:
                     pass
 
             if not transcript_list:
-                print(f"No transcript found for video: {video_id}")
+                logger.info("No transcript found for video %s", video_id)
                 return []
 
             # Convert to our TranscriptItem format
             transcript_items = []
-            for entry in transcript_list:
-                transcript_items.append(
-                    TranscriptItem(
-                        timestamp=entry['start'],  # Start time in seconds
-                        text=entry['text'].replace('\n', ' ').strip()
+            with span("transcript.convert", entries=len(transcript_list)):
+                for entry in transcript_list:
+                    transcript_items.append(
+                        TranscriptItem(
+                            timestamp=entry['start'],  # Start time in seconds
+                            text=entry['text'].replace('\n', ' ').strip()
+                        )
                     )
-                )
 
-            print(f"Successfully fetched {len(transcript_items)} transcript items")
+            logger.info("Fetched transcript", extra=chatty(video_id=video_id, items=len(transcript_items)))
             return transcript_items
 
         except Exception as e:
-            print(f"Error fetching YouTube transcript: {str(e)}")
+            logger.error("Error fetching YouTube transcript: %s", e)
             # Return empty transcript if error
             return []
 
@@ -109,25 +132,44 @@ class YouTubeService:
         """
         try:
             video_id = self.extract_video_id(video_url)
-            full_url = f"https://www.youtube.com/watch?v={video_id}"
+            if settings.TRANSCRIPT_API_URL:
+                info = await self._fetch_from_api(f"/videos/{video_id}")
+                return {**info, "video_id": video_id, "embed_url": f"https://www.youtube.com/embed/{video_id}"}
 
-            yt = YouTube(full_url)
+            # Imported here so pytube is only loaded when video info is requested
+            from pytube import YouTube
 
-            return {
-                "video_id": video_id,
-                "title": yt.title,
-                "duration": yt.length,  # Duration in seconds
-                "author": yt.author,
-                "description": yt.description[:500] if yt.description else "",  # First 500 chars
-                "thumbnail_url": yt.thumbnail_url,
-                "embed_url": f"https://www.youtube.com/embed/{video_id}"
-            }
+            full_url = f"https://www.youtube.com/watch?v={video_id}"
+
+            # pytube fetches the watch page lazily, on first attribute access
+            with track_upstream("pytube"):
+                yt = YouTube(full_url)
+                info = {
+                    "video_id": video_id,
+                    "title": yt.title,
+                    "duration": yt.length,  # Duration in seconds
+                    "author": yt.author,
+                    "description": yt.description[:500] if yt.description else "",  # First 500 chars
+                    "thumbnail_url": yt.thumbnail_url,
+                    "embed_url": f"https://www.youtube.com/embed/{video_id}"
+                }
+            return info
 
         except Exception as e:
-            print(f"Error fetching YouTube video info: {str(e)}")
+            logger.error("Error fetching YouTube video info: %s", e)
             return {
                 "video_id": self.extract_video_id(video_url),
                 "title": "Unknown",
                 "duration": 0,
                 "embed_url": f"https://www.youtube.com/embed/{self.extract_video_id(video_url)}"
-            }
\ No newline at end of file
+            }
+
+    async def _fetch_from_api(self, path: str, params: Optional[Dict[str, str]] = None) -> Any:
+        """GET JSON from the TRANSCRIPT_API_URL service"""
+        import httpx
+
+        with track_upstream("transcript_api"):
+            async with httpx.AsyncClient(base_url=settings.TRANSCRIPT_API_URL, timeout=30.0) as client:
+                response = await client.get(path, params=params)
+                response.raise_for_status()
+                return response.json()
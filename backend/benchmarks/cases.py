@@ -0,0 +1,151 @@
+"""
+Benchmark cases. Each one takes an input size and does its setup, then
+returns the zero-argument callable that gets timed.
+
+Importing this module imports the app, so the runner points DATABASE_PATH at
+a scratch database first.
+"""
+from typing import Any, Callable, Dict
+
+from app.api.routes import prescription, videos
+from app.api.routes.transcribe import parse_transcription_to_segments
+from app.core.store import CachedCollection, store
+from app.services.engagement_service import engagement_aggregates
+from app.services.groq_service import GroqService
+from app.services.youtube_service import YouTubeService
+
+from benchmarks import data
+
+Case = Callable[[int], Callable[[], Any]]
+
+CASES: Dict[str, Case] = {}
+
+
+def case(name: str):
+    def register(setup: Case) -> Case:
+        CASES[name] = setup
+        return setup
+    return register
+
+
+def setup_store() -> None:
+    """Create the scratch database's tables, with the same write hooks the app runs"""
+    store.initialize()
+    engagement_aggregates.initialize()
+
+
+def reset_collection(collection: str) -> None:
+    store.delete_many(collection, [doc["id"] for doc in store.all(collection)])
+
+
+def groq_service() -> GroqService:
+    # Prompt assembly doesn't touch the API client, so skip creating one
+    return GroqService.__new__(GroqService)
+
+
+@case("groq.build_system_prompt")
+def build_system_prompt(size: int):
+    service = groq_service()
+    transcript = data.transcript_items(size)
+    # Paused halfway, so both the watched and upcoming portions are built
+    current_time = transcript[len(transcript) // 2].timestamp
+    duration = transcript[-1].timestamp + 4.0
+    return lambda: service.build_system_prompt(transcript, current_time, duration)
+
+
+@case("groq.format_time")
+def format_time(size: int):
+    service = groq_service()
+    values = data.seconds(size)
+    return lambda: [service._format_time(value) for value in values]
+
+
+@case("transcribe.parse_transcription_to_segments")
+def parse_segments(size: int):
+    text = data.transcription_text(size)
+    return lambda: parse_transcription_to_segments(text)
+
+
+@case("youtube.extract_video_id")
+def extract_video_id(size: int):
+    service = YouTubeService()
+    urls = data.youtube_urls(size)
+    return lambda: [service.extract_video_id(url) for url in urls]
+
+
+@case("videos.list_transform")
+def list_transform(size: int):
+    records = data.video_records(size)
+    return lambda: [videos.video_list_entry(video) for video in records]
+
+
+@case("videos.build_video_list")
+def build_video_list(size: int):
+    """Full /api/videos/list body from a warm cached snapshot"""
+    setup_store()
+    reset_collection("videos")
+    store.put_many("videos", data.video_records(size))
+    videos.build_video_list()
+    return videos.build_video_list
+
+
+@case("videos.load_video_storage")
+def load_video_storage(size: int):
+    """Cold read of every video record, as after another worker's write"""
+    setup_store()
+    reset_collection("videos")
+    store.put_many("videos", data.video_records(size))
+    return lambda: CachedCollection(store, "videos").items()
+
+
+@case("videos.save_video_storage")
+def save_video_storage(size: int):
+    setup_store()
+    reset_collection("videos")
+    records = data.video_records(size)
+    store.put_many("videos", records)
+    state = {"flip": False}
+
+    def save():
+        # Change every record so each write does the full update work
+        state["flip"] = not state["flip"]
+        status = "watched" if state["flip"] else "unwatched"
+        store.put_many("videos", [{**record, "status": status} for record in records])
+    return save
+
+
+def setup_prescriptions(size: int) -> None:
+    """Scratch prescriptions with the indexes the app creates at startup"""
+    setup_store()
+    store.create_index("prescriptions", ["patient_id", "created_at"])
+    store.create_index("prescriptions", ["created_at"])
+    reset_collection("prescriptions")
+    store.put_many("prescriptions", data.prescription_records(size))
+
+
+@case("prescriptions.find_prescriptions")
+def find_prescriptions(size: int):
+    """Every prescription newest first, as /api/prescription/list without a limit reads them"""
+    setup_prescriptions(size)
+    return prescription.find_prescriptions
+
+
+@case("prescriptions.find_prescriptions_page")
+def find_prescriptions_page(size: int):
+    """One patient's first page, as /api/prescription/list?patient_id=&limit=50 reads it"""
+    setup_prescriptions(size)
+    return lambda: prescription.find_prescriptions(patient_id=1, limit=51)
+
+
+@case("prescriptions.save_prescriptions")
+def save_prescriptions(size: int):
+    setup_store()
+    reset_collection("prescriptions")
+    records = data.prescription_records(size)
+    store.put_many("prescriptions", records)
+    state = {"read": False}
+
+    def save():
+        state["read"] = not state["read"]
+        store.put_many("prescriptions", [{**record, "read": state["read"]} for record in records])
+    return save
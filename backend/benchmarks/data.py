@@ -0,0 +1,105 @@
+"""Deterministic synthetic inputs for the benchmarks"""
+import random
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Dict, List
+
+from app.models.chat_models import TranscriptItem
+
+WORDS = (
+    "take your medication every morning with food and water remember to check "
+    "your blood pressure before breakfast call the clinic if you feel dizzy or "
+    "notice swelling in your ankles keep a list of questions for the next visit"
+).split()
+
+YOUTUBE_URL_FORMATS = [
+    "https://www.youtube.com/watch?v={id}",
+    "https://youtu.be/{id}",
+    "https://www.youtube.com/embed/{id}",
+    "https://www.youtube.com/watch?feature=share&v={id}",
+    "{id}",
+]
+
+VIDEO_ID_CHARS = "abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789_-"
+
+
+def sentence(rng: random.Random) -> str:
+    words = rng.choices(WORDS, k=rng.randint(6, 16))
+    return " ".join(words).capitalize() + rng.choice(".!?")
+
+
+def transcript_items(count: int, seed: int = 1) -> List[TranscriptItem]:
+    """Transcript entries roughly four seconds apart"""
+    rng = random.Random(seed)
+    return [TranscriptItem(timestamp=index * 4.0, text=sentence(rng)) for index in range(count)]
+
+
+def transcription_text(sentences: int, seed: int = 2) -> str:
+    rng = random.Random(seed)
+    return " ".join(sentence(rng) for _ in range(sentences))
+
+
+def seconds(count: int, seed: int = 3) -> List[float]:
+    rng = random.Random(seed)
+    return [rng.uniform(0, 4 * 60 * 60) for _ in range(count)]
+
+
+def youtube_urls(count: int, seed: int = 4) -> List[str]:
+    rng = random.Random(seed)
+    return [
+        rng.choice(YOUTUBE_URL_FORMATS).format(id="".join(rng.choices(VIDEO_ID_CHARS, k=11)))
+        for _ in range(count)
+    ]
+
+
+def _uuid(rng: random.Random) -> str:
+    return str(uuid.UUID(int=rng.getrandbits(128)))
+
+
+def video_records(count: int, seed: int = 5) -> List[Dict[str, Any]]:
+    """Video metadata shaped like create_video_record's, some of them transcoded"""
+    rng = random.Random(seed)
+    start = datetime(2024, 1, 1)
+    records = []
+    for index in range(count):
+        record = {
+            "id": _uuid(rng),
+            "title": sentence(rng)[:40],
+            "description": " ".join(sentence(rng) for _ in range(3)),
+            "filename": f"{rng.getrandbits(256):064x}.mp4",
+            "sha256": f"{rng.getrandbits(256):064x}",
+            "size": rng.randint(1_000_000, 200_000_000),
+            "content_type": "video/mp4",
+            "patient_id": rng.randint(1, 50),
+            "subtitle_count": rng.randint(0, 200),
+            "uploaded_at": (start + timedelta(minutes=17 * index)).isoformat(),
+            "status": rng.choice(["unwatched", "watched"]),
+            "type": "Doctor Instruction",
+        }
+        if rng.random() < 0.5:
+            record["transcode"] = {"status": "ready", "progress": 1.0}
+        records.append(record)
+    return records
+
+
+def prescription_records(count: int, seed: int = 6) -> List[Dict[str, Any]]:
+    """Prescriptions shaped like build_prescription_record's"""
+    rng = random.Random(seed)
+    start = datetime(2024, 1, 1)
+    return [
+        {
+            "id": _uuid(rng),
+            "patient_id": rng.randint(1, 50),
+            "patient_name": f"Patient {index % 50}",
+            "doctor_name": "Dr. Smith",
+            "medications": [
+                {"name": rng.choice(["Warfarin", "Clopidogrel", "Donepezil", "Simvastatin"]),
+                 "dosage": f"{rng.choice([5, 10, 20, 40])} mg", "frequency": "Once daily"}
+                for _ in range(rng.randint(1, 3))
+            ],
+            "created_at": (start + timedelta(minutes=11 * index)).isoformat(),
+            "status": "active",
+            "read": rng.random() < 0.5,
+        }
+        for index in range(count)
+    ]
@@ -0,0 +1,176 @@
+"""
+Micro-benchmarks for backend hot paths.
+
+    cd backend
+    python -m benchmarks.run                      # all cases, all sizes
+    python -m benchmarks.run -k videos --sizes 10,1000
+    python -m benchmarks.run --save-baseline      # record benchmarks/baseline.json
+    python -m benchmarks.run --compare            # compare with it
+    python -m benchmarks.run --compare other.json --output results.json
+
+Timings depend on the machine, so no baseline is committed: record one with
+--save-baseline (on main, say) and compare later runs on the same machine
+with --compare. A case more than its threshold slower than the baseline is
+a regression and the exit status is 1; the threshold is --threshold, or the
+one saved with the baseline. A missing baseline, or one that shares no case
+and size with the run, exits with status 2 so a broken comparison can't pass.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import timeit
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+BENCHMARKS_DIR = Path(__file__).resolve().parent
+DEFAULT_BASELINE = BENCHMARKS_DIR / "baseline.json"
+DEFAULT_SIZES = [10, 100, 1000, 10000]
+DEFAULT_THRESHOLD = 0.25
+
+
+def measure(func, min_time: float, repeat: int) -> Dict[str, Any]:
+    """Best-of-`repeat` time per call, with enough calls per round to fill `min_time`"""
+    timer = timeit.Timer(func)
+    number = 1
+    while True:
+        elapsed = timer.timeit(number)
+        if elapsed >= min_time or number >= 1_000_000:
+            break
+        number = max(number * 2, int(number * min_time / max(elapsed, 1e-9)))
+    best = min(timer.repeat(repeat=repeat, number=number)) / number
+    return {"seconds_per_call": best, "calls_per_round": number, "rounds": repeat}
+
+
+def run(names: List[str], sizes: List[int], min_time: float, repeat: int) -> List[Dict[str, Any]]:
+    from benchmarks.cases import CASES
+
+    results = []
+    for name in names:
+        for size in sizes:
+            func = CASES[name](size)
+            result = {"name": name, "size": size, **measure(func, min_time, repeat)}
+            results.append(result)
+            print(f"{name:<42} {size:>6}  {format_seconds(result['seconds_per_call']):>10}", file=sys.stderr)
+    return results
+
+
+def compare(results: List[Dict[str, Any]], baseline: Dict[str, Any], threshold: float) -> List[Dict[str, Any]]:
+    """Attach the baseline ratio to each result and flag those beyond the threshold"""
+    previous = {(item["name"], item["size"]): item["seconds_per_call"] for item in baseline.get("results", [])}
+    for result in results:
+        before = previous.get((result["name"], result["size"]))
+        if before is None:
+            continue
+        ratio = result["seconds_per_call"] / before
+        result["baseline_seconds_per_call"] = before
+        result["ratio"] = round(ratio, 4)
+        if ratio > 1 + threshold:
+            result["status"] = "regression"
+        elif ratio < 1 - threshold:
+            result["status"] = "improvement"
+        else:
+            result["status"] = "unchanged"
+    return results
+
+
+def format_seconds(value: float) -> str:
+    for unit, scale in (("s", 1), ("ms", 1e-3), ("us", 1e-6)):
+        if value >= scale:
+            return f"{value / scale:.2f} {unit}"
+    return f"{value / 1e-9:.0f} ns"
+
+
+def report(results: List[Dict[str, Any]]) -> None:
+    print(f"\n{'case':<42} {'size':>6} {'per call':>10} {'baseline':>10} {'ratio':>7}", file=sys.stderr)
+    for result in results:
+        baseline = result.get("baseline_seconds_per_call")
+        line = (
+            f"{result['name']:<42} {result['size']:>6} {format_seconds(result['seconds_per_call']):>10} "
+            f"{format_seconds(baseline) if baseline else '-':>10} "
+            f"{result['ratio'] if 'ratio' in result else '-':>7}"
+        )
+        if result.get("status") in ("regression", "improvement"):
+            line += f"  {result['status'].upper()}"
+        print(line, file=sys.stderr)
+
+
+def environment() -> Dict[str, Any]:
+    return {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "machine": platform.machine(),
+        "system": platform.system(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-k", dest="pattern", help="only run cases whose name contains this")
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)), help="comma-separated input sizes")
+    parser.add_argument("--min-time", type=float, default=0.05, help="seconds per timing round")
+    parser.add_argument("--repeat", type=int, default=5, help="timing rounds; the fastest is kept")
+    parser.add_argument("--output", type=Path, help="write JSON results here (default: stdout)")
+    parser.add_argument(
+        "--save-baseline", type=Path, nargs="?", const=DEFAULT_BASELINE, metavar="PATH",
+        help=f"store these results as the baseline (default: {DEFAULT_BASELINE.name})"
+    )
+    parser.add_argument(
+        "--compare", type=Path, nargs="?", const=DEFAULT_BASELINE, metavar="PATH",
+        help=f"compare with a saved baseline and fail on regressions (default: {DEFAULT_BASELINE.name})"
+    )
+    parser.add_argument(
+        "--threshold", type=float,
+        help=f"slowdown ratio flagged as a regression (default: the baseline's, else {DEFAULT_THRESHOLD})"
+    )
+    args = parser.parse_args(argv)
+
+    baseline = None
+    if args.compare:
+        if not args.compare.exists():
+            print(f"No baseline at {args.compare}; record one with --save-baseline", file=sys.stderr)
+            return 2
+        baseline = json.loads(args.compare.read_text())
+    threshold = args.threshold
+    if threshold is None:
+        threshold = baseline.get("threshold", DEFAULT_THRESHOLD) if baseline else DEFAULT_THRESHOLD
+
+    # The app's store opens DATABASE_PATH on import; keep benchmark data out of the real database
+    scratch = tempfile.TemporaryDirectory(prefix="healthhack-bench-")
+    os.environ["DATABASE_PATH"] = str(Path(scratch.name) / "bench.db")
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    sys.path.insert(0, str(BENCHMARKS_DIR.parent))
+
+    from benchmarks.cases import CASES
+
+    names = [name for name in CASES if not args.pattern or args.pattern in name]
+    sizes = [int(size) for size in args.sizes.split(",") if size]
+    results = run(names, sizes, args.min_time, args.repeat)
+
+    if baseline is not None:
+        compare(results, baseline, threshold)
+    report(results)
+
+    document = {"environment": environment(), "threshold": threshold, "results": results}
+    body = json.dumps(document, indent=2)
+    if args.save_baseline:
+        args.save_baseline.write_text(body + "\n")
+        print(f"\nBaseline saved to {args.save_baseline}", file=sys.stderr)
+    if args.output:
+        args.output.write_text(body + "\n")
+    elif not args.save_baseline:
+        print(body)
+
+    scratch.cleanup()
+    if baseline is not None and not any("status" in result for result in results):
+        print(f"\nNo case in {args.compare} matches this run; nothing was compared", file=sys.stderr)
+        return 2
+    return 1 if any(result.get("status") == "regression" for result in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,202 @@
+"""
+Local stand-ins for the Groq API (chat completions, streaming included, and
+Whisper transcriptions) and for the YouTube transcript service, with
+configurable latency and error rates.
+
+    cd backend
+    python -m loadtest.fake_upstreams --port 8090 --chat-latency 0.8 --error-rate 0.02
+
+Point the API at it with GROQ_BASE_URL=http://127.0.0.1:8090 and
+TRANSCRIPT_API_URL=http://127.0.0.1:8090 (and any non-empty GROQ_API_KEY).
+"""
+import argparse
+import asyncio
+import json
+import math
+import random
+import re
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+CHAT_REPLY = (
+    "Based on the video, your doctor recommends taking the medication every morning with food. "
+    "If you feel dizzy, sit down and call the clinic."
+)
+
+ANALYSIS_REPLY = {
+    "risk_level": "moderate",
+    "recommendation": "Consider a reduced starting dose and monitor closely",
+    "can_prescribe": True,
+    "evidence": "Reduced-function variant detected in the metabolizing enzyme.",
+    "alternatives": None,
+}
+
+TRANSCRIPT_LINES = [
+    "Hello, this is your doctor speaking.",
+    "Take one tablet every morning with breakfast.",
+    "Check your blood pressure before you take it.",
+    "Call the clinic if you feel dizzy or light-headed.",
+    "We will review how you are doing at your next visit.",
+]
+
+
+@dataclass
+class Upstream:
+    """Latency (median seconds, log-normal spread) and failure rates for one fake endpoint"""
+    latency: float
+    jitter: float
+    error_rate: float
+    rate_limit_rate: float
+
+    def delay(self) -> float:
+        if self.latency <= 0:
+            return 0.0
+        return random.lognormvariate(math.log(self.latency), self.jitter)
+
+    def failure(self) -> Optional[JSONResponse]:
+        roll = random.random()
+        if roll < self.rate_limit_rate:
+            return JSONResponse(
+                status_code=429,
+                content={"error": {"message": "Rate limit reached", "type": "requests", "code": "rate_limit_exceeded"}},
+                headers={"retry-after": "1", "x-ratelimit-remaining-requests": "0"}
+            )
+        if roll < self.rate_limit_rate + self.error_rate:
+            return JSONResponse(
+                status_code=500,
+                content={"error": {"message": "Internal server error", "type": "internal_server_error"}}
+            )
+        return None
+
+
+def create_app(chat: Upstream, whisper: Upstream, transcript: Upstream) -> FastAPI:
+    app = FastAPI(title="Fake upstreams")
+
+    def completion_text(body: dict) -> str:
+        # Prescription analyses ask for JSON; chat gets prose
+        messages = body.get("messages", [])
+        system = next((m.get("content", "") for m in messages if m.get("role") == "system"), "")
+        if not (body.get("response_format") or "JSON" in system):
+            return CHAT_REPLY
+        prompt = next((m.get("content", "") for m in messages if m.get("role") == "user"), "")
+        medication = re.search(r"for medication: (.+)", prompt)
+        return json.dumps({"medication": medication.group(1).strip() if medication else "unknown", **ANALYSIS_REPLY})
+
+    @app.post("/openai/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        failure = chat.failure()
+        if failure is not None:
+            await asyncio.sleep(chat.delay() / 4)
+            return failure
+
+        text = completion_text(body)
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        created = int(time.time())
+        model = body.get("model", "fake-model")
+        headers = {"x-ratelimit-remaining-requests": "1000", "x-ratelimit-remaining-tokens": "100000"}
+
+        if not body.get("stream"):
+            await asyncio.sleep(chat.delay())
+            return JSONResponse(headers=headers, content={
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+                "usage": {"prompt_tokens": 500, "completion_tokens": len(text) // 4, "total_tokens": 500 + len(text) // 4},
+            })
+
+        async def stream():
+            # Time to first token, then the rest spread over a few chunks
+            total = chat.delay()
+            await asyncio.sleep(total / 2)
+            pieces = [text[i:i + 24] for i in range(0, len(text), 24)]
+            for piece in pieces:
+                chunk = {
+                    "id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                    "choices": [{"index": 0, "delta": {"content": piece}, "finish_reason": None}],
+                }
+                yield f"data: {json.dumps(chunk)}\n\n"
+                await asyncio.sleep(total / 2 / len(pieces))
+            final = {
+                "id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+            }
+            yield f"data: {json.dumps(final)}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(stream(), media_type="text/event-stream", headers=headers)
+
+    @app.post("/openai/v1/audio/transcriptions")
+    async def transcriptions(request: Request):
+        form = await request.form()
+        upload = form.get("file")
+        size = len(await upload.read()) if upload is not None else 0
+        failure = whisper.failure()
+        if failure is not None:
+            return failure
+        # Longer recordings take longer to transcribe
+        await asyncio.sleep(whisper.delay() * (1 + size / 1_000_000))
+        segments = [
+            {"id": index, "start": index * 3.0, "end": index * 3.0 + 3.0, "text": line}
+            for index, line in enumerate(TRANSCRIPT_LINES)
+        ]
+        return {
+            "task": "transcribe",
+            "language": "english",
+            "duration": segments[-1]["end"],
+            "text": " ".join(TRANSCRIPT_LINES),
+            "segments": segments,
+        }
+
+    @app.get("/transcripts/{video_id}")
+    async def transcript_for(video_id: str):
+        failure = transcript.failure()
+        if failure is not None:
+            return failure
+        await asyncio.sleep(transcript.delay())
+        return [
+            {"start": index * 4.0, "duration": 4.0, "text": line}
+            for index, line in enumerate(TRANSCRIPT_LINES * 6)
+        ]
+
+    @app.get("/videos/{video_id}")
+    async def video_info(video_id: str):
+        failure = transcript.failure()
+        if failure is not None:
+            return failure
+        await asyncio.sleep(transcript.delay())
+        return {"title": f"Instructions {video_id}", "duration": 120, "author": "Clinic", "description": ""}
+
+    return app
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--chat-latency", type=float, default=0.8, help="median chat completion seconds")
+    parser.add_argument("--whisper-latency", type=float, default=1.5, help="median transcription seconds per MB")
+    parser.add_argument("--transcript-latency", type=float, default=0.3, help="median transcript API seconds")
+    parser.add_argument("--jitter", type=float, default=0.4, help="log-normal sigma of every latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of calls answered with a 500")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="share of calls answered with a 429")
+    args = parser.parse_args()
+
+    def upstream(latency: float) -> Upstream:
+        return Upstream(latency, args.jitter, args.error_rate, args.rate_limit_rate)
+
+    import uvicorn
+
+    app = create_app(upstream(args.chat_latency), upstream(args.whisper_latency), upstream(args.transcript_latency))
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
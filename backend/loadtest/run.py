@@ -0,0 +1,147 @@
+"""
+Drive scripted traffic at a running API and report throughput, latency
+percentiles and error rates per endpoint.
+
+    cd backend
+    python -m loadtest.run --users 20 --duration 60              # clinic mix
+    python -m loadtest.run --mix streaming --users 50 --output report.json
+
+Start loadtest.fake_upstreams first and point the API at it, so no real Groq
+quota or YouTube traffic is used. When the API has no videos yet, a few are
+uploaded before the run so playback and streaming have something to fetch.
+"""
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from loadtest.scenarios import MIXES, RANGE_SIZE, Recorder, Sample, Session, fake_video
+
+SEED_VIDEOS = 3
+
+
+async def seed_videos(client: httpx.AsyncClient, rng: random.Random) -> List[str]:
+    """IDs of the videos the API already has, uploading a few if there are none"""
+    response = await client.get("/api/videos/list")
+    response.raise_for_status()
+    video_ids = [video["id"] for video in response.json()["videos"]]
+    for index in range(max(0, SEED_VIDEOS - len(video_ids))):
+        response = await client.post(
+            "/api/videos/upload",
+            files={"video": (f"seed-{index}.mp4", fake_video(rng, 2 * RANGE_SIZE), "video/mp4")},
+            data={"title": f"Seed video {index}", "description": "Uploaded by the load test"}
+        )
+        response.raise_for_status()
+        video_ids.append(response.json()["video_id"])
+    return video_ids
+
+
+async def virtual_user(session: Session, mix: str, deadline: float) -> None:
+    scenarios, weights = zip(*MIXES[mix])
+    while time.monotonic() < deadline:
+        scenario = session.rng.choices(scenarios, weights)[0]
+        await scenario(session)
+
+
+async def run(target: str, users: int, duration: float, mix: str, seed: int) -> Dict[str, Any]:
+    recorder = Recorder()
+    limits = httpx.Limits(max_connections=users * 2, max_keepalive_connections=users * 2)
+    async with httpx.AsyncClient(base_url=target, timeout=60.0, limits=limits) as client:
+        video_ids = await seed_videos(client, random.Random(seed))
+        # Users share the video list, so uploads during the run get watched too
+        sessions = [Session(client, recorder, random.Random(seed + index), video_ids) for index in range(users)]
+
+        started = time.monotonic()
+        deadline = started + duration
+        # Stagger arrivals over the first few seconds rather than starting in lockstep
+        async def start(session: Session, delay: float) -> None:
+            await asyncio.sleep(delay)
+            await virtual_user(session, mix, deadline)
+
+        ramp = min(5.0, duration / 4)
+        await asyncio.gather(*(start(session, ramp * index / users) for index, session in enumerate(sessions)))
+        elapsed = time.monotonic() - started
+
+    return summarize(recorder.samples, elapsed, {"target": target, "users": users, "duration": duration, "mix": mix})
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of already sorted values"""
+    if not values:
+        return 0.0
+    index = min(len(values) - 1, max(0, int(round(fraction * len(values) + 0.5)) - 1))
+    return values[index]
+
+
+def endpoint_stats(samples: List[Sample], elapsed: float) -> Dict[str, Any]:
+    latencies = sorted(sample.seconds for sample in samples)
+    errors = [sample for sample in samples if sample.status == 0 or sample.status >= 500]
+    statuses: Dict[str, int] = defaultdict(int)
+    for sample in samples:
+        statuses[sample.error or str(sample.status)] += 1
+    return {
+        "requests": len(samples),
+        "throughput_rps": round(len(samples) / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 1),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 1),
+        "max_ms": round(latencies[-1] * 1000, 1) if latencies else 0.0,
+        "error_rate": round(len(errors) / len(samples), 4) if samples else 0.0,
+        "statuses": dict(sorted(statuses.items())),
+    }
+
+
+def summarize(samples: List[Sample], elapsed: float, config: Dict[str, Any]) -> Dict[str, Any]:
+    by_endpoint: Dict[str, List[Sample]] = defaultdict(list)
+    for sample in samples:
+        by_endpoint[sample.endpoint].append(sample)
+    return {
+        "config": config,
+        "elapsed_seconds": round(elapsed, 2),
+        "total": endpoint_stats(samples, elapsed),
+        "endpoints": {endpoint: endpoint_stats(group, elapsed) for endpoint, group in sorted(by_endpoint.items())},
+    }
+
+
+def report(summary: Dict[str, Any]) -> None:
+    """Human-readable table on stderr; errors count 5xx responses and failed connections"""
+    print(f"\n{'endpoint':<48} {'reqs':>6} {'rps':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7}", file=sys.stderr)
+    rows = list(summary["endpoints"].items()) + [("TOTAL", summary["total"])]
+    for endpoint, stats in rows:
+        print(
+            f"{endpoint:<48} {stats['requests']:>6} {stats['throughput_rps']:>7} {stats['p50_ms']:>8} "
+            f"{stats['p95_ms']:>8} {stats['p99_ms']:>8} {stats['error_rate']:>7.1%}",
+            file=sys.stderr
+        )
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--target", default="http://127.0.0.1:8000", help="base URL of the API under test")
+    parser.add_argument("--users", type=int, default=10, help="concurrent virtual users")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds of traffic")
+    parser.add_argument("--mix", choices=sorted(MIXES), default="clinic")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="write the JSON report here (default: stdout)")
+    args = parser.parse_args(argv)
+
+    summary = asyncio.run(run(args.target, args.users, args.duration, args.mix, args.seed))
+    report(summary)
+
+    body = json.dumps(summary, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(body + "\n")
+    else:
+        print(body)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
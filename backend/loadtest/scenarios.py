@@ -0,0 +1,171 @@
+"""
+Scripted user journeys. Each scenario runs one iteration of a user's
+session against the API and records every request it makes; the runner
+keeps calling scenarios, picked by the mix weights, until time runs out.
+"""
+import asyncio
+import json
+import random
+import time
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+TRANSCRIPT = [
+    {"timestamp": index * 4.0, "text": line}
+    for index, line in enumerate([
+        "Hello, this is your doctor speaking.",
+        "Take one tablet every morning with breakfast.",
+        "Check your blood pressure before you take it.",
+        "Call the clinic if you feel dizzy or light-headed.",
+        "We will review how you are doing at your next visit.",
+    ] * 6)
+]
+
+QUESTIONS = [
+    "When should I take this?",
+    "What if I miss a dose?",
+    "Can I take it with coffee?",
+    "What did the doctor say about dizziness?",
+]
+
+MEDICATIONS = ["Warfarin", "Clopidogrel", "Donepezil", "Simvastatin"]
+
+RANGE_SIZE = 1024 * 1024
+PLAYBACK_CHUNK = 256 * 1024
+
+
+@dataclass
+class Sample:
+    endpoint: str
+    status: int
+    seconds: float
+    error: Optional[str] = None
+
+
+@dataclass
+class Recorder:
+    """Collects one Sample per request, keyed by route template"""
+    samples: List[Sample] = field(default_factory=list)
+
+    async def request(self, client: httpx.AsyncClient, method: str, url: str, endpoint: str, **kwargs) -> Optional[httpx.Response]:
+        start = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+        except httpx.HTTPError as e:
+            self.samples.append(Sample(endpoint, 0, time.perf_counter() - start, type(e).__name__))
+            return None
+        self.samples.append(Sample(endpoint, response.status_code, time.perf_counter() - start))
+        return response
+
+
+@dataclass
+class Session:
+    """What a virtual user shares across iterations"""
+    client: httpx.AsyncClient
+    recorder: Recorder
+    rng: random.Random
+    video_ids: List[str]
+
+
+def fake_video(rng: random.Random, size: int) -> bytes:
+    # An MP4 `ftyp` box passes the upload sniffer; random bytes keep content dedup out of the picture
+    header = b"\x00\x00\x00\x18ftypmp42\x00\x00\x00\x00mp42isom"
+    return header + rng.randbytes(size - len(header))
+
+
+async def think(rng: random.Random, low: float = 0.5, high: float = 2.0) -> None:
+    await asyncio.sleep(rng.uniform(low, high))
+
+
+async def patient_playback(session: Session) -> None:
+    """Open the video list, watch a video in ranges with progress heartbeats and ask about it"""
+    client, recorder, rng = session.client, session.recorder, session.rng
+    await recorder.request(client, "GET", "/api/videos/list", "GET /api/videos/list")
+    if not session.video_ids:
+        return
+
+    video_id = rng.choice(session.video_ids)
+    duration = 120.0
+    position = 0.0
+    for _ in range(rng.randint(2, 4)):
+        # Uploaded videos are at least RANGE_SIZE long, so keep the playhead inside that
+        offset = int(position / duration * (RANGE_SIZE - PLAYBACK_CHUNK))
+        await recorder.request(
+            client, "GET", f"/api/videos/stream/{video_id}", "GET /api/videos/stream/{video_id}",
+            headers={"Range": f"bytes={offset}-{offset + PLAYBACK_CHUNK - 1}"}
+        )
+        played_from, position = position, min(duration, position + rng.uniform(10, 30))
+        await recorder.request(
+            client, "POST", f"/api/videos/{video_id}/progress", "POST /api/videos/{video_id}/progress",
+            json={"position": position, "played_from": played_from, "duration": duration}
+        )
+        if rng.random() < 0.5:
+            await recorder.request(client, "POST", "/api/chat/", "POST /api/chat/", json={
+                "message": rng.choice(QUESTIONS),
+                "transcript": TRANSCRIPT,
+                "current_time": position,
+                "video_duration": duration,
+            })
+        await think(rng)
+
+
+async def range_streaming(session: Session) -> None:
+    """Seek around a video the way a browser player does"""
+    client, recorder, rng = session.client, session.recorder, session.rng
+    if not session.video_ids:
+        return
+    video_id = rng.choice(session.video_ids)
+    response = await recorder.request(
+        client, "GET", f"/api/videos/stream/{video_id}", "GET /api/videos/stream/{video_id}",
+        headers={"Range": "bytes=0-1"}
+    )
+    total = RANGE_SIZE
+    if response is not None and "content-range" in response.headers:
+        total = int(response.headers["content-range"].rsplit("/", 1)[-1])
+    for _ in range(rng.randint(3, 8)):
+        start = rng.randrange(0, max(total - 1, 1))
+        end = min(total - 1, start + RANGE_SIZE - 1)
+        await recorder.request(
+            client, "GET", f"/api/videos/stream/{video_id}", "GET /api/videos/stream/{video_id}",
+            headers={"Range": f"bytes={start}-{end}"}
+        )
+        await think(rng, 0.1, 0.5)
+
+
+async def doctor_upload(session: Session) -> None:
+    """Record an instruction, transcribe it, upload the video and check a prescription"""
+    client, recorder, rng = session.client, session.recorder, session.rng
+    audio = rng.randbytes(rng.randint(50_000, 300_000))
+    await recorder.request(
+        client, "POST", "/api/transcribe/", "POST /api/transcribe/",
+        files={"audio": ("recording.webm", audio, "audio/webm")}
+    )
+
+    response = await recorder.request(
+        client, "POST", "/api/videos/upload", "POST /api/videos/upload",
+        files={"video": ("instruction.mp4", fake_video(rng, rng.randint(1, 4) * RANGE_SIZE), "video/mp4")},
+        data={"title": "Load test instruction", "description": "Uploaded by the load test", "subtitles": json.dumps(TRANSCRIPT)}
+    )
+    if response is not None and response.status_code == 200:
+        session.video_ids.append(response.json()["video_id"])
+
+    medication = rng.choice(MEDICATIONS)
+    await recorder.request(client, "POST", "/api/prescription/analyze-prescription", "POST /api/prescription/analyze-prescription", json={
+        "medication": medication,
+        # Vary the payload so the analysis cache doesn't answer every request
+        "api_response": {"gene": "CYP2C19", "phenotype": rng.choice(["poor", "intermediate", "normal", "rapid"]), "nonce": f"{rng.getrandbits(32):08x}"},
+    })
+    await think(rng, 1.0, 3.0)
+
+
+Scenario = Callable[[Session], Awaitable[None]]
+
+MIXES: Dict[str, List[Tuple[Scenario, float]]] = {
+    # Mostly patients watching, a few doctors recording
+    "clinic": [(patient_playback, 0.7), (range_streaming, 0.2), (doctor_upload, 0.1)],
+    "patients": [(patient_playback, 1.0)],
+    "streaming": [(range_streaming, 1.0)],
+    "doctors": [(doctor_upload, 1.0)],
+}
@@ -1,10 +1,33 @@
+import os
 import uvicorn
 from app.core.config import settings
 
+def _installed(module: str) -> bool:
+    try:
+        __import__(module)
+        return True
+    except ImportError:
+        return False
+
 if __name__ == "__main__":
-    uvicorn.run(
-        "app.main:app",
-        host=settings.HOST,
-        port=settings.PORT,
-        reload=True
-    )
\ No newline at end of file
+    if settings.RUN_PROFILE == "production":
+        # Worker processes share state through the SQLite store, so the API
+        # can use every core. uvloop and httptools ship with uvicorn[standard]
+        # (uvloop is unavailable on Windows).
+        uvicorn.run(
+            "app.main:app",
+            host=settings.HOST,
+            port=settings.PORT,
+            workers=settings.WORKERS or os.cpu_count() or 1,
+            loop="uvloop" if _installed("uvloop") else "asyncio",
+            http="httptools" if _installed("httptools") else "h11",
+            reload=False,
+            access_log=False
+        )
+    else:
+        uvicorn.run(
+            "app.main:app",
+            host=settings.HOST,
+            port=settings.PORT,
+            reload=True
+        )
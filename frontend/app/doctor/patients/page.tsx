@@ -36,6 +36,12 @@ interface VideoInstruction {
   completedAt?: string;
 }
 
+interface EngagementSummary {
+  videos: { total: number; by_status: Record<string, number> };
+  prescriptions: { total: number; unread: number };
+  last_activity: string | null;
+}
+
 interface Prescription {
   id: string;
   patient_name: string;
@@ -60,6 +66,7 @@ export default function PatientsPage() {
   const [videoDuration, setVideoDuration] = useState(0);
   const [videoInstructions, setVideoInstructions] = useState<VideoInstruction[]>([]);
   const [prescriptions, setPrescriptions] = useState<Prescription[]>([]);
+  const [engagement, setEngagement] = useState<EngagementSummary | null>(null);
 
   const videoRef = useRef<HTMLVideoElement>(null);
   const mediaRecorderRef = useRef<MediaRecorder | null>(null);
@@ -69,6 +76,7 @@ export default function PatientsPage() {
 
   // Current patient info (will be loaded from database later)
   const currentPatient = {
+    id: 1,
     name: "Current Patient",
     age: 0,
     diagnosis: "",
@@ -83,6 +91,34 @@ export default function PatientsPage() {
     fetchPrescriptions();
   }, []);
 
+  // Engagement belongs to the selected patient, so reload it when they change
+  useEffect(() => {
+    let cancelled = false;
+    setEngagement(null);
+    fetchEngagement(currentPatient.id).then((summary) => {
+      // Drop a late answer for a patient who is no longer selected
+      if (!cancelled && summary) {
+        setEngagement(summary);
+      }
+    });
+    return () => {
+      cancelled = true;
+    };
+  }, [currentPatient.id]);
+
+  const fetchEngagement = async (patientId: number): Promise<EngagementSummary | null> => {
+    try {
+      // Precomputed server-side counters, no need to scan every record here
+      const response = await fetch(`http://localhost:8000/api/dashboard/aggregates/${patientId}`);
+      if (response.ok) {
+        return await response.json();
+      }
+    } catch (error) {
+      console.error('Error fetching engagement summary:', error);
+    }
+    return null;
+  };
+
   const fetchVideos = async () => {
     try {
       const response = await fetch('http://localhost:8000/api/videos/list');
@@ -367,10 +403,17 @@ export default function PatientsPage() {
               <div>
                 <h2 className="text-xl font-semibold">{currentPatient.name}</h2>
                 <p className="text-sm text-muted-foreground mt-1">{currentPatient.diagnosis}</p>
+                {engagement && (
+                  <p className="text-sm text-muted-foreground mt-1">
+                    {engagement.videos.by_status.watched ?? 0} of {engagement.videos.total} videos watched
+                    {' · '}
+                    {engagement.prescriptions.unread} unread prescription{engagement.prescriptions.unread === 1 ? '' : 's'}
+                  </p>
+                )}
               </div>
               <div className="flex gap-2">
                 <Button
-                  onClick={fetchVideos}
+                  onClick={() => { fetchVideos(); fetchEngagement(); }}
                   variant="outline"
                   size="icon"
                   title="Refresh video list"
@@ -711,7 +754,7 @@ export default function PatientsPage() {
             fetchPrescriptions(); // Refresh prescription list after closing modal
           }}
           patientName={currentPatient.name}
-          patientId={1} // You can update this with actual patient ID
+          patientId={currentPatient.id}
         />
       </div>
     </DashboardLayout>
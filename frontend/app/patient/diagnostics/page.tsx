@@ -67,17 +67,11 @@ export default function DiagnosticsPage() {
       const response = await fetch('http://localhost:8000/api/videos/list');
       if (response.ok) {
         const data = await response.json();
-        // Transform the transcript format if needed
+        // Subtitles are fetched separately when a video is selected
         const videos = data.videos.map((video: any) => ({
           ...video,
           isLocalVideo: true,
-          // Convert transcript format from {start, end, text} to {timestamp, text} if needed
-          transcript: video.transcript?.map((item: any) => ({
-            timestamp: item.start || 0,
-            start: item.start,
-            end: item.end,
-            text: item.text
-          })) || []
+          transcript: []
         }));
         setDiagnosticHistory(videos);
       }
@@ -88,8 +82,30 @@ export default function DiagnosticsPage() {
     }
   };
 
+  const fetchSubtitles = async (videoId: string | number): Promise<TranscriptItem[]> => {
+    try {
+      const response = await fetch(`http://localhost:8000/api/videos/${videoId}/subtitles?format=json`);
+      if (response.ok) {
+        const data = await response.json();
+        // Convert transcript format from {start, end, text} to {timestamp, text}
+        return (data.subtitles || []).map((item: any) => ({
+          timestamp: item.start || 0,
+          start: item.start,
+          end: item.end,
+          text: item.text
+        }));
+      }
+    } catch (error) {
+      console.error('Error fetching subtitles:', error);
+    }
+    return [];
+  };
+
   // Handle diagnostic selection
-  const handleSelectDiagnostic = async (diagnostic: Diagnostic) => {
+  const handleSelectDiagnostic = async (selected: Diagnostic) => {
+    const diagnostic = selected.isLocalVideo && !selected.transcript?.length
+      ? { ...selected, transcript: await fetchSubtitles(selected.id) }
+      : selected;
     setSelectedDiagnostic(diagnostic);
     setCurrentTime(0);
     setIsPlaying(false);
@@ -128,6 +144,32 @@ export default function DiagnosticsPage() {
     ]);
   };
 
+  // Report playback progress every few seconds while a local video is playing
+  const currentTimeRef = useRef(0);
+  currentTimeRef.current = currentTime;
+  useEffect(() => {
+    if (!isPlaying || !selectedDiagnostic?.isLocalVideo) return;
+
+    let playedFrom = currentTimeRef.current;
+    const interval = setInterval(() => {
+      const position = currentTimeRef.current;
+      // Seeking backwards starts a new played range
+      const from = position >= playedFrom ? playedFrom : position;
+      fetch(`http://localhost:8000/api/videos/${selectedDiagnostic.id}/progress`, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({
+          position,
+          played_from: from,
+          duration: videoDuration || undefined
+        }),
+      }).catch(error => console.error('Error reporting progress:', error));
+      playedFrom = position;
+    }, 5000);
+
+    return () => clearInterval(interval);
+  }, [isPlaying, selectedDiagnostic, videoDuration]);
+
   // Scroll to bottom when new messages arrive
   useEffect(() => {
     messagesEndRef.current?.scrollIntoView({ behavior: 'smooth' });
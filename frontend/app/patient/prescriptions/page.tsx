@@ -1,6 +1,6 @@
 "use client";
 
-import { useState, useEffect } from 'react';
+import { useState, useEffect, useRef } from 'react';
 import DashboardLayout from '@/components/DashboardLayout';
 import { Card } from '@/components/Card';
 import { Badge } from '@/components/ui/badge';
@@ -31,9 +31,24 @@ interface Prescription {
 export default function PrescriptionsPage() {
   const [prescriptions, setPrescriptions] = useState<Prescription[]>([]);
   const [isLoading, setIsLoading] = useState(true);
+  // Change sequence the current list reflects, for incremental updates
+  const seqRef = useRef<number | null>(null);
 
   useEffect(() => {
     fetchPrescriptions();
+
+    // Server push instead of polling: fetch only the changes when notified
+    const events = new EventSource('http://localhost:8000/api/events/stream');
+    const onChange = (event: MessageEvent) => {
+      if (JSON.parse(event.data).collection === 'prescriptions') {
+        fetchChanges();
+      }
+    };
+    events.addEventListener('new_prescription', onChange);
+    events.addEventListener('status_changed', onChange);
+    // Sent when this client missed changes; reload the whole list
+    events.addEventListener('reset', () => fetchPrescriptions());
+    return () => events.close();
   }, []);
 
   const fetchPrescriptions = async () => {
@@ -42,6 +57,7 @@ export default function PrescriptionsPage() {
       if (response.ok) {
         const data = await response.json();
         setPrescriptions(data.prescriptions);
+        seqRef.current = data.seq;
       }
     } catch (error) {
       console.error('Error fetching prescriptions:', error);
@@ -50,6 +66,30 @@ export default function PrescriptionsPage() {
     }
   };
 
+  const fetchChanges = async () => {
+    if (seqRef.current === null) {
+      return fetchPrescriptions();
+    }
+    try {
+      const response = await fetch(`http://localhost:8000/api/prescription/list?since=${seqRef.current}`);
+      if (response.ok) {
+        const data = await response.json();
+        seqRef.current = data.seq;
+        if (data.reset) {
+          setPrescriptions(data.prescriptions);
+          return;
+        }
+        const replaced = new Set<string>([...data.deleted, ...data.prescriptions.map((p: Prescription) => p.id)]);
+        setPrescriptions(current =>
+          [...data.prescriptions, ...current.filter(p => !replaced.has(p.id))]
+            .sort((a, b) => b.created_at.localeCompare(a.created_at))
+        );
+      }
+    } catch (error) {
+      console.error('Error fetching prescription changes:', error);
+    }
+  };
+
   const markAsRead = async (prescriptionId: string) => {
     try {
       const response = await fetch(`http://localhost:8000/api/prescription/${prescriptionId}/read`, {